@@ -1,14 +1,28 @@
 """
 Flask API Server for Legal Advisor Bot
 """
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
-from src.core import LegalAdvisorBot
-from src.utils import setup_logger
+from src.core import LegalAdvisorBot, build_payload, is_enabled
+from src.utils import setup_logger, dumps, dumps_str, choose_encoding, compress
 import uuid
 
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through src.utils.dumps (orjson when it is installed)"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps_str(obj)
+    
+    def response(self, *args, **kwargs) -> Response:
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
 # Initialize logger
@@ -17,8 +31,35 @@ logger = setup_logger(__name__)
 # Initialize bot
 bot = LegalAdvisorBot()
 
-# Store sessions
-sessions = {}
+
+def payload_options(data: dict = None) -> dict:
+    """Opt-in payload fields, from the JSON body (or the query string if None)"""
+    source = data if data is not None else request.args
+    return {
+        'include_text': is_enabled(source.get('include_text', False)),
+        'include_enriched_query': is_enabled(source.get('include_enriched_query', False))
+    }
+
+
+def sse(events, options: dict):
+    for event in events:
+        yield f"event: {event['event']}\ndata: {dumps_str(build_payload(event['data'], **options))}\n\n"
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """Compress JSON bodies for clients that accept it (streams are sent as is)"""
+    if (response.is_streamed or response.direct_passthrough or response.mimetype != 'application/json'
+            or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'), len(body))
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
 
 
 @app.route('/api/v1/health', methods=['GET'])
@@ -33,7 +74,7 @@ def health_check():
 @app.route('/api/v1/ingest', methods=['POST'])
 def ingest_documents():
     """
-    Ingest legal documents
+    Queue legal documents for background ingestion
     
     Request:
     {
@@ -43,6 +84,13 @@ def ingest_documents():
             ...
         ]
     }
+    
+    Response (202):
+    {
+        "status": "accepted",
+        "job_id": "...",
+        "status_url": "/api/v1/ingest/<job_id>"
+    }
     """
     try:
         data = request.json
@@ -52,17 +100,40 @@ def ingest_documents():
         if not documents:
             return jsonify({'error': 'No documents provided'}), 400
         
-        bot.ingest_legal_documents(documents, metadata_list)
+        job = bot.submit_ingest_job(documents, metadata_list)
         
         return jsonify({
-            'status': 'success',
-            'documents_ingested': len(documents)
-        })
+            'status': 'accepted',
+            'job_id': job['job_id'],
+            'documents_submitted': len(documents),
+            'status_url': f"/api/v1/ingest/{job['job_id']}"
+        }), 202
     except Exception as e:
         logger.error(f"Error ingesting documents: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/v1/ingest/<job_id>', methods=['GET'])
+def get_ingest_job(job_id):
+    """
+    Get progress of an ingest job
+    
+    Response:
+    {
+        "job_id": "...",
+        "stage": "queued|preprocessing|embedding|indexing|completed|failed",
+        "documents_processed": 10,
+        "chunks_processed": 42,
+        "chunks_per_second": 120.5,
+        "errors": []
+    }
+    """
+    job = bot.get_ingest_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Ingest job not found'}), 404
+    return jsonify(job)
+
+
 @app.route('/api/v1/chat', methods=['POST'])
 def chat():
     """
@@ -71,7 +142,9 @@ def chat():
     Request:
     {
         "query": "Your legal question",
-        "session_id": "optional_session_id"
+        "session_id": "optional_session_id",
+        "include_text": false,            (add each source's chunk text)
+        "include_enriched_query": false
     }
     
     Response:
@@ -80,8 +153,14 @@ def chat():
         "response": "...",
         "category": "...",
         "confidence": 0.95,
-        "sources": [...]
+        "sources": [
+            {"id": "IPC_420", "title": "...", "chunk_key": "...", "chunk_id": 0,
+             "char_start": 0, "char_end": 512, "score": 0.87},
+            ...
+        ]
     }
+    
+    Responses are gzip (or br) compressed when the client accepts it.
     """
     try:
         data = request.json
@@ -92,22 +171,192 @@ def chat():
             return jsonify({'error': 'Query is required'}), 400
         
         # Start session if new
-        if session_id not in sessions:
+        if not bot.has_session(session_id):
             bot.start_session(session_id)
-            sessions[session_id] = True
         
         # Process query
         response = bot.query(query, session_id)
         
         return jsonify({
             'status': 'success',
-            **response
+            **build_payload(response, **payload_options(data))
         })
     except Exception as e:
         logger.error(f"Error processing query: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/v1/chat/stream', methods=['POST'])
+def chat_stream():
+    """
+    Process a legal query, streaming the answer as server-sent events
+    
+    Request:
+    {
+        "query": "Your legal question",
+        "session_id": "optional_session_id",
+        "include_text": false,
+        "include_enriched_query": false
+    }
+    
+    Events:
+        event: retrieval   data: {"category": "...", "sources": [...], ...}
+        event: preview     data: {"text": "..."}   (quoted sections, legal data queries only)
+        event: token       data: {"text": "..."}   (repeated)
+        event: done        data: {full chat response}
+        event: error       data: {"error": true, "error_message": "..."}
+    """
+    data = request.json or {}
+    query = data.get('query', '').strip()
+    session_id = data.get('session_id', str(uuid.uuid4()))
+    
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    if not bot.has_session(session_id):
+        bot.start_session(session_id)
+    
+    return Response(
+        stream_with_context(sse(bot.query_stream(query, session_id), payload_options(data))),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@app.route('/api/v1/chat/retrieve', methods=['POST'])
+def chat_retrieve():
+    """
+    Return category and sources at once; generate the answer in the background
+    
+    Request:
+    {
+        "query": "Your legal question",
+        "session_id": "optional_session_id",
+        "generate": true,
+        "include_text": false,
+        "include_enriched_query": false
+    }
+    
+    Response (202 with generation, 200 retrieval-only):
+    {
+        "query": "...",
+        "response": null,
+        "category": "...",
+        "sources": [...],
+        "generation_id": "...",
+        "status_url": "/api/v1/chat/generations/<generation_id>",
+        "stream_url": "/api/v1/chat/generations/<generation_id>/stream"
+    }
+    """
+    data = request.json or {}
+    query = data.get('query', '').strip()
+    session_id = data.get('session_id', str(uuid.uuid4()))
+    
+    if not query:
+        return jsonify({'error': 'Query is required'}), 400
+    
+    if not bot.has_session(session_id):
+        bot.start_session(session_id)
+    
+    options = payload_options(data)
+    if not data.get('generate', True):
+        return jsonify({'status': 'success', **build_payload(bot.retrieve(query, session_id), **options)})
+    
+    result = build_payload(bot.submit_query(query, session_id), **options)
+    if 'generation_id' not in result:
+        return jsonify({'status': 'success', **result})
+    return jsonify({
+        'status': 'accepted',
+        **result,
+        'status_url': f"/api/v1/chat/generations/{result['generation_id']}",
+        'stream_url': f"/api/v1/chat/generations/{result['generation_id']}/stream"
+    }), 202
+
+
+@app.route('/api/v1/chat/generations/<generation_id>', methods=['GET'])
+def get_generation(generation_id):
+    """
+    Poll a background generation
+    (?include_text=true / ?include_enriched_query=true as for /api/v1/chat)
+    
+    Response:
+    {
+        "generation_id": "...",
+        "stage": "queued|generating|completed|failed",
+        "response": "answer so far",
+        "result": {full chat response, once finished}
+    }
+    """
+    generation = bot.get_generation(generation_id)
+    if generation is None:
+        return jsonify({'error': 'Generation not found'}), 404
+    if 'result' in generation:
+        generation['result'] = build_payload(generation['result'], **payload_options())
+    return jsonify(generation)
+
+
+@app.route('/api/v1/chat/generations/<generation_id>/stream', methods=['GET'])
+def stream_generation(generation_id):
+    """
+    Follow a background generation as server-sent events
+    
+    Events are those of /api/v1/chat/stream after 'retrieval'; tokens
+    generated before the client connected are replayed first.
+    """
+    events = bot.stream_generation(generation_id)
+    if events is None:
+        return jsonify({'error': 'Generation not found'}), 404
+    
+    return Response(
+        stream_with_context(sse(events, payload_options())),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+# Upper bound on queries per batch request
+MAX_BATCH_SIZE = 32
+
+
+@app.route('/api/v1/chat/batch', methods=['POST'])
+def chat_batch():
+    """
+    Process several legal queries in one request
+    
+    Request:
+    {
+        "queries": ["First legal question", "Second legal question"],
+        "session_id": "optional_session_id",
+        "include_text": false,
+        "include_enriched_query": false
+    }
+    
+    Response (application/x-ndjson, one line per query as it completes in order):
+        {"index": 0, "query": "...", "response": "...", ...}
+        {"index": 1, "query": "...", "error": true, "error_message": "..."}
+    """
+    data = request.json or {}
+    queries = data.get('queries')
+    session_id = data.get('session_id', str(uuid.uuid4()))
+    
+    if not isinstance(queries, list) or not queries:
+        return jsonify({'error': 'queries must be a non-empty list'}), 400
+    if len(queries) > MAX_BATCH_SIZE:
+        return jsonify({'error': f'At most {MAX_BATCH_SIZE} queries per batch'}), 400
+    queries = [str(query).strip() for query in queries]
+    
+    if not bot.has_session(session_id):
+        bot.start_session(session_id)
+    
+    options = payload_options(data)
+    
+    def lines():
+        for result in bot.query_batch(queries, session_id):
+            yield dumps_str(build_payload(result, **options)) + "\n"
+    
+    return Response(stream_with_context(lines()), mimetype='application/x-ndjson')
+
+
 @app.route('/api/v1/history/<session_id>', methods=['GET'])
 def get_history(session_id):
     """
@@ -120,7 +369,7 @@ def get_history(session_id):
     ]
     """
     try:
-        history = bot.pipeline.stm.get_history()
+        history = bot.get_session_history(session_id)
         return jsonify({'history': history})
     except Exception as e:
         logger.error(f"Error retrieving history: {e}")
@@ -140,7 +389,6 @@ def create_session():
     try:
         session_id = str(uuid.uuid4())
         bot.start_session(session_id)
-        sessions[session_id] = True
         
         return jsonify({'session_id': session_id})
     except Exception as e:
@@ -153,8 +401,6 @@ def end_session(session_id):
     """End a session"""
     try:
         bot.end_session(session_id)
-        if session_id in sessions:
-            del sessions[session_id]
         
         return jsonify({'status': 'success', 'message': 'Session ended'})
     except Exception as e:
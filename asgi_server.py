@@ -0,0 +1,339 @@
+"""
+ASGI API Server for Legal Advisor Bot
+
+Same routes and payloads as api_server.py, served by an event loop
+instead of a thread per request. /api/v1/chat is fully async: retrieval
+runs on the pipeline's bounded CPU executor and the LLM call is awaited,
+so thousands of chats can wait on the provider in one process. The
+streaming and batch routes iterate the synchronous pipeline in the
+server's thread pool.
+
+Run with:
+    uvicorn asgi_server:app --host 0.0.0.0 --port 5000
+"""
+try:
+    from starlette.applications import Starlette
+    from starlette.concurrency import run_in_threadpool
+    from starlette.datastructures import Headers, MutableHeaders
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+except ImportError:
+    raise ImportError("Starlette not installed. Install with: pip install starlette uvicorn")
+
+from src.core import LegalAdvisorBot, build_payload, is_enabled
+from src.utils import setup_logger, dumps, dumps_str, choose_encoding, compress
+import uuid
+
+# Initialize logger
+logger = setup_logger(__name__)
+
+# Initialize bot
+bot = LegalAdvisorBot()
+
+# Upper bound on queries per batch request
+MAX_BATCH_SIZE = 32
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+class JSONDefaultResponse(JSONResponse):
+    """JSON response encoded like jsonify in api_server (orjson when installed)"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class CompressionMiddleware:
+    """Compress JSON bodies for clients that accept it (streams are sent as is)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = Headers(scope=scope).get('accept-encoding')
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message  # held until the first body part shows whether it streams
+                return
+            if start is not None:
+                headers = MutableHeaders(raw=list(start['headers']))
+                if (not message.get('more_body')
+                        and headers.get('content-type', '').startswith('application/json')
+                        and 'content-encoding' not in headers):
+                    headers.add_vary_header('Accept-Encoding')
+                    body = message.get('body', b'')
+                    encoding = choose_encoding(accept_encoding, len(body))
+                    if encoding:
+                        body = compress(body, encoding)
+                        headers['Content-Encoding'] = encoding
+                        headers['Content-Length'] = str(len(body))
+                        message = {**message, 'body': body}
+                await send({**start, 'headers': headers.raw})
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+
+async def read_json(request: Request) -> dict:
+    """Request body as a dict (empty if missing or not JSON)"""
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def payload_options(source) -> dict:
+    """Opt-in payload fields, from the JSON body or the query string"""
+    return {
+        'include_text': is_enabled(source.get('include_text', False)),
+        'include_enriched_query': is_enabled(source.get('include_enriched_query', False))
+    }
+
+
+def sse(events, options: dict):
+    for event in events:
+        yield f"event: {event['event']}\ndata: {dumps_str(build_payload(event['data'], **options))}\n\n"
+
+
+def ensure_session(session_id: str):
+    if not bot.has_session(session_id):
+        bot.start_session(session_id)
+
+
+async def health_check(request: Request):
+    """Health check endpoint"""
+    return JSONDefaultResponse({
+        'status': 'healthy',
+        'service': 'RAG-Based Legal Advisor Bot'
+    })
+
+
+async def ingest_documents(request: Request):
+    """Queue legal documents for background ingestion (see api_server.ingest_documents)"""
+    try:
+        data = await read_json(request)
+        documents = data.get('documents', [])
+        metadata_list = data.get('metadata', [])
+
+        if not documents:
+            return JSONDefaultResponse({'error': 'No documents provided'}, status_code=400)
+
+        job = bot.submit_ingest_job(documents, metadata_list)
+
+        return JSONDefaultResponse({
+            'status': 'accepted',
+            'job_id': job['job_id'],
+            'documents_submitted': len(documents),
+            'status_url': f"/api/v1/ingest/{job['job_id']}"
+        }, status_code=202)
+    except Exception as e:
+        logger.error(f"Error ingesting documents: {e}")
+        return JSONDefaultResponse({'error': str(e)}, status_code=500)
+
+
+async def get_ingest_job(request: Request):
+    """Get progress of an ingest job"""
+    job = bot.get_ingest_job(request.path_params['job_id'])
+    if job is None:
+        return JSONDefaultResponse({'error': 'Ingest job not found'}, status_code=404)
+    return JSONDefaultResponse(job)
+
+
+async def chat(request: Request):
+    """Process a legal query (see api_server.chat)"""
+    try:
+        data = await read_json(request)
+        query = data.get('query', '').strip()
+        session_id = data.get('session_id', str(uuid.uuid4()))
+
+        if not query:
+            return JSONDefaultResponse({'error': 'Query is required'}, status_code=400)
+
+        await run_in_threadpool(ensure_session, session_id)
+        response = await bot.aquery(query, session_id)
+
+        return JSONDefaultResponse({
+            'status': 'success',
+            **build_payload(response, **payload_options(data))
+        })
+    except Exception as e:
+        logger.error(f"Error processing query: {e}")
+        return JSONDefaultResponse({'error': str(e)}, status_code=500)
+
+
+async def chat_stream(request: Request):
+    """Process a legal query, streaming the answer as server-sent events"""
+    data = await read_json(request)
+    query = data.get('query', '').strip()
+    session_id = data.get('session_id', str(uuid.uuid4()))
+
+    if not query:
+        return JSONDefaultResponse({'error': 'Query is required'}, status_code=400)
+
+    await run_in_threadpool(ensure_session, session_id)
+    return StreamingResponse(sse(bot.query_stream(query, session_id), payload_options(data)),
+                             media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+async def chat_retrieve(request: Request):
+    """Return category and sources at once; generate the answer in the background"""
+    data = await read_json(request)
+    query = data.get('query', '').strip()
+    session_id = data.get('session_id', str(uuid.uuid4()))
+
+    if not query:
+        return JSONDefaultResponse({'error': 'Query is required'}, status_code=400)
+
+    await run_in_threadpool(ensure_session, session_id)
+
+    options = payload_options(data)
+    if not data.get('generate', True):
+        result = await run_in_threadpool(bot.retrieve, query, session_id)
+        return JSONDefaultResponse({'status': 'success', **build_payload(result, **options)})
+
+    result = build_payload(await run_in_threadpool(bot.submit_query, query, session_id), **options)
+    if 'generation_id' not in result:
+        return JSONDefaultResponse({'status': 'success', **result})
+    return JSONDefaultResponse({
+        'status': 'accepted',
+        **result,
+        'status_url': f"/api/v1/chat/generations/{result['generation_id']}",
+        'stream_url': f"/api/v1/chat/generations/{result['generation_id']}/stream"
+    }, status_code=202)
+
+
+async def get_generation(request: Request):
+    """Poll a background generation"""
+    generation = bot.get_generation(request.path_params['generation_id'])
+    if generation is None:
+        return JSONDefaultResponse({'error': 'Generation not found'}, status_code=404)
+    if 'result' in generation:
+        generation['result'] = build_payload(generation['result'],
+                                             **payload_options(request.query_params))
+    return JSONDefaultResponse(generation)
+
+
+async def stream_generation(request: Request):
+    """Follow a background generation as server-sent events"""
+    events = bot.stream_generation(request.path_params['generation_id'])
+    if events is None:
+        return JSONDefaultResponse({'error': 'Generation not found'}, status_code=404)
+    return StreamingResponse(sse(events, payload_options(request.query_params)),
+                             media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+async def chat_batch(request: Request):
+    """Process several legal queries in one request, answering as NDJSON"""
+    data = await read_json(request)
+    queries = data.get('queries')
+    session_id = data.get('session_id', str(uuid.uuid4()))
+
+    if not isinstance(queries, list) or not queries:
+        return JSONDefaultResponse({'error': 'queries must be a non-empty list'}, status_code=400)
+    if len(queries) > MAX_BATCH_SIZE:
+        return JSONDefaultResponse({'error': f'At most {MAX_BATCH_SIZE} queries per batch'},
+                                   status_code=400)
+    queries = [str(query).strip() for query in queries]
+
+    await run_in_threadpool(ensure_session, session_id)
+    options = payload_options(data)
+
+    def lines():
+        for result in bot.query_batch(queries, session_id):
+            yield dumps_str(build_payload(result, **options)) + "\n"
+
+    return StreamingResponse(lines(), media_type='application/x-ndjson')
+
+
+def get_history(request: Request):
+    """Get conversation history for a session"""
+    try:
+        history = bot.get_session_history(request.path_params['session_id'])
+        return JSONDefaultResponse({'history': history})
+    except Exception as e:
+        logger.error(f"Error retrieving history: {e}")
+        return JSONDefaultResponse({'error': str(e)}, status_code=500)
+
+
+def create_session(request: Request):
+    """Create a new session"""
+    try:
+        session_id = str(uuid.uuid4())
+        bot.start_session(session_id)
+
+        return JSONDefaultResponse({'session_id': session_id})
+    except Exception as e:
+        logger.error(f"Error creating session: {e}")
+        return JSONDefaultResponse({'error': str(e)}, status_code=500)
+
+
+def end_session(request: Request):
+    """End a session"""
+    try:
+        bot.end_session(request.path_params['session_id'])
+
+        return JSONDefaultResponse({'status': 'success', 'message': 'Session ended'})
+    except Exception as e:
+        logger.error(f"Error ending session: {e}")
+        return JSONDefaultResponse({'error': str(e)}, status_code=500)
+
+
+def get_stats(request: Request):
+    """Get system statistics"""
+    try:
+        stats = bot.get_stats()
+        return JSONDefaultResponse(stats)
+    except Exception as e:
+        logger.error(f"Error retrieving stats: {e}")
+        return JSONDefaultResponse({'error': str(e)}, status_code=500)
+
+
+async def not_found(request: Request, exc):
+    """Handle 404 errors"""
+    return JSONDefaultResponse({'error': 'Endpoint not found'}, status_code=404)
+
+
+async def internal_error(request: Request, exc):
+    """Handle 500 errors"""
+    return JSONDefaultResponse({'error': 'Internal server error'}, status_code=500)
+
+
+# Plain def endpoints (session backend I/O) run in Starlette's thread pool
+app = Starlette(
+    routes=[
+        Route('/api/v1/health', health_check, methods=['GET']),
+        Route('/api/v1/ingest', ingest_documents, methods=['POST']),
+        Route('/api/v1/ingest/{job_id}', get_ingest_job, methods=['GET']),
+        Route('/api/v1/chat', chat, methods=['POST']),
+        Route('/api/v1/chat/stream', chat_stream, methods=['POST']),
+        Route('/api/v1/chat/retrieve', chat_retrieve, methods=['POST']),
+        Route('/api/v1/chat/generations/{generation_id}', get_generation, methods=['GET']),
+        Route('/api/v1/chat/generations/{generation_id}/stream', stream_generation, methods=['GET']),
+        Route('/api/v1/chat/batch', chat_batch, methods=['POST']),
+        Route('/api/v1/history/{session_id}', get_history, methods=['GET']),
+        Route('/api/v1/session', create_session, methods=['POST']),
+        Route('/api/v1/session/{session_id}', end_session, methods=['DELETE']),
+        Route('/api/v1/stats', get_stats, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+                Middleware(CompressionMiddleware)],
+    exception_handlers={404: not_found, 500: internal_error}
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+    logger.info("Starting RAG-Based Legal Advisor Bot ASGI Server...")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -0,0 +1,89 @@
+"""
+Benchmark - Per-request overhead of the LLM HTTP client
+
+Compares opening a new connection for every request (what a client
+rebuilt per query does) with the shared keep-alive pool, against a
+local stub endpoint that answers immediately.
+
+Usage:
+    python benchmarks/bench_llm_client.py [--requests 2000] [--threads 8]
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.llm.http_pool import HTTPConnectionPool
+
+BODY = json.dumps({'prompt': 'What is Section 420 IPC?'}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every POST with a small JSON completion"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    reply = json.dumps({'choices': [{'message': {'content': 'stub answer'}}]}).encode()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.reply)))
+        self.end_headers()
+        self.wfile.write(self.reply)
+
+    def log_message(self, *args):
+        pass
+
+
+def fresh_connection(host, port):
+    conn = http.client.HTTPConnection(host, port, timeout=10)
+    conn.request('POST', '/v1/chat', body=BODY, headers={'Content-Type': 'application/json'})
+    conn.getresponse().read()
+    conn.close()
+
+
+def run(label, fn, requests, threads):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as executor:
+        list(executor.map(lambda _: fn(), range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed / requests * 1e6:8.1f} us/request  "
+          f"({requests / elapsed:,.0f} req/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+
+    pool = HTTPConnectionPool(f"http://{host}:{port}", max_connections=args.threads, timeout=10)
+
+    def pooled():
+        pool.request('POST', '/v1/chat', body=BODY, headers={'Content-Type': 'application/json'})
+
+    run("new connection per request", lambda: fresh_connection(host, port),
+        args.requests, args.threads)
+    run("keep-alive pool", pooled, args.requests, args.threads)
+    print(f"pool: {pool.stats()}")
+
+    pool.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
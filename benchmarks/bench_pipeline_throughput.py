@@ -0,0 +1,148 @@
+"""
+Benchmark - End-to-end query throughput against the local stub LLM
+
+Runs the full RAGPipeline (validation, retrieval, generation) with the
+OpenAI-compatible backend pointed at an in-process stub server, so
+throughput and latency can be tuned without network access.
+
+Usage:
+    python benchmarks/bench_pipeline_throughput.py --clients 16 --queries 400 \\
+        --ttft lognormal:0.3,0.4 --tokens-per-second normal:80,15
+    python benchmarks/bench_pipeline_throughput.py --clients 2 --batch 16
+    python benchmarks/bench_pipeline_throughput.py --async --clients 2000 --queries 4000
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.core import RAGPipeline
+from src.llm import LLMConfig, OpenAICompatibleBackend, ResponseGenerator
+from src.llm.stub_server import StubConfig, StubLLMServer
+
+QUERIES = [
+    "What is the punishment for murder under Section 302 IPC?",
+    "Explain the law on cheating under the Indian Penal Code",
+    "What are the essentials of a valid contract?",
+    "What does the Constitution say about the right to life?",
+    "When can the police arrest without a warrant?",
+    "What is the procedure for bail in a criminal case?",
+    "What evidence is admissible in court?",
+    "What are the rights of a tenant under property law?",
+]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--ttft', default='lognormal:0.05,0.3')
+    parser.add_argument('--tokens-per-second', default='fixed:0')
+    parser.add_argument('--output-tokens', default='uniform:50,150')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--stream', action='store_true', help='consume streamed responses')
+    parser.add_argument('--batch', type=int, default=1, help='queries per process_query_batch call')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='clients are asyncio tasks calling aprocess_query on one event loop')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    server = StubLLMServer(config=StubConfig(args.ttft, args.tokens_per_second,
+                                             args.output_tokens, args.error_rate)).start()
+    config = LLMConfig()
+    config.base_url = server.base_url
+    config.model = 'stub'
+
+    pipeline = RAGPipeline()
+    pipeline.generator = ResponseGenerator(OpenAICompatibleBackend(config))
+    sections = json.loads((Path(__file__).parent.parent / 'data' / 'legal_database'
+                           / 'legal_sections.json').read_text())
+    pipeline.ingest_documents([s['content'] for s in sections],
+                              [{k: v for k, v in s.items() if k != 'content'} for s in sections])
+
+    def make_query(i):
+        # A numbered suffix keeps every query out of the response cache
+        return f"{QUERIES[i % len(QUERIES)]} (case {i})"
+
+    def run_batch(b):
+        queries = [make_query(i) for i in range(b * args.batch, min(args.queries, (b + 1) * args.batch))]
+        start = time.perf_counter()
+        results = list(pipeline.process_query_batch(queries))
+        latency = time.perf_counter() - start
+        return [(latency, not isinstance(result, Exception)) for result in results]
+
+    def run_one(i):
+        query = make_query(i)
+        start = time.perf_counter()
+        try:
+            if args.stream:
+                events = list(pipeline.process_query_stream(query))
+                ok = events[-1]['event'] == 'done'
+            else:
+                pipeline.process_query(query)
+                ok = True
+        except Exception:
+            ok = False
+        return time.perf_counter() - start, ok
+
+    def run_threads():
+        with ThreadPoolExecutor(args.clients) as executor:
+            if args.batch > 1:
+                batches = executor.map(run_batch, range(-(-args.queries // args.batch)))
+                return [result for batch in batches for result in batch]
+            return list(executor.map(run_one, range(args.queries)))
+
+    async def run_async():
+        slots = asyncio.Semaphore(args.clients)
+        in_flight = peak = 0
+
+        async def ask(i):
+            nonlocal in_flight, peak
+            async with slots:
+                in_flight += 1
+                peak = max(peak, in_flight)
+                start = time.perf_counter()
+                try:
+                    await pipeline.aprocess_query(make_query(i))
+                    ok = True
+                except Exception:
+                    ok = False
+                in_flight -= 1
+                return time.perf_counter() - start, ok
+
+        results = await asyncio.gather(*(ask(i) for i in range(args.queries)))
+        print(f"peak in-flight {peak}, threads {threading.active_count()}")
+        return results
+
+    start = time.perf_counter()
+    results = asyncio.run(run_async()) if args.use_async else run_threads()
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, ok in results if ok]
+    print(f"clients={args.clients} queries={args.queries} batch={args.batch} "
+          f"async={args.use_async} max_concurrency={pipeline.generator.executor.max_concurrency}")
+    print(f"throughput   {len(latencies) / elapsed:8.1f} queries/s")
+    if latencies:
+        print(f"latency p50  {percentile(latencies, 0.50) * 1000:8.1f} ms")
+        print(f"latency p95  {percentile(latencies, 0.95) * 1000:8.1f} ms")
+        print(f"latency p99  {percentile(latencies, 0.99) * 1000:8.1f} ms")
+    print(f"failed       {len(results) - len(latencies):8d}")
+    print(f"llm          {pipeline.generator.executor.stats()}")
+    print(f"pool         {pipeline.generator.backend.pool.stats()}")
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
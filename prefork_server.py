@@ -0,0 +1,212 @@
+"""
+Pre-fork API Server for Legal Advisor Bot
+
+Loads the embedding model and a saved index snapshot once in a parent
+process, then forks worker processes that serve api_server.app on one
+shared listening socket. The snapshot is memory-mapped, so its texts,
+vectors and BM25 postings live in the page cache and every worker reads
+the same pages; the model weights and everything else loaded before the
+fork are shared copy-on-write. An extra worker costs its own heap, not a
+copy of the corpus.
+
+Build a snapshot, then serve it:
+    python prefork_server.py --index data/index --build data/legal_database/legal_sections.json
+    python prefork_server.py --index data/index --workers 4 --port 5000
+
+Signals to the parent:
+    SIGHUP            reload the snapshot in the parent and every worker
+    SIGTERM / SIGINT  stop the workers and exit
+
+POST /api/v1/ingest only reaches the worker that receives it; rebuild the
+snapshot with --build and send SIGHUP instead. The rebuild renames new files
+over the old ones, so workers keep serving the snapshot they mapped until
+they reload. Sessions are per worker unless SESSION_BACKEND_URL points at a
+shared backend.
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+from src.utils import setup_logger, process_memory
+
+logger = setup_logger(__name__)
+
+
+def build_index(index_dir: str, documents_file: str):
+    """Ingest a JSON list of legal sections and save the index snapshot"""
+    from src.core import RAGPipeline
+
+    with open(documents_file, encoding='utf-8') as f:
+        sections = json.load(f)
+    pipeline = RAGPipeline()
+    pipeline.ingest_documents(
+        [section['content'] for section in sections],
+        [{k: v for k, v in section.items() if k != 'content'} for section in sections]
+    )
+    pipeline.save_index(index_dir)
+    pipeline.sessions.close()
+
+
+def bind_socket(host: str, port: int, backlog: int = 1024) -> socket.socket:
+    """Listening socket every worker accepts on"""
+    sock = socket.socket(socket.AF_INET6 if ':' in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, host: str, port: int, index_dir: str):
+    """Serve requests in a forked worker until SIGTERM"""
+    from werkzeug.serving import make_server
+    import api_server
+
+    gc.enable()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent handles Ctrl+C
+    signal.signal(signal.SIGHUP, lambda *_: api_server.bot.pipeline.load_index(index_dir))
+
+    server = make_server(host, port, api_server.app, threaded=True, fd=sock.fileno())
+    server.daemon_threads = False  # server_close() waits for in-flight requests
+    # shutdown() blocks until serve_forever() returns, so it cannot run in
+    # the handler, which interrupts the serving thread itself
+    signal.signal(signal.SIGTERM,
+                  lambda *_: threading.Thread(target=server.shutdown, daemon=True).start())
+    server.serve_forever()
+    server.server_close()
+    # Workers leave with os._exit(), which skips atexit handlers
+    api_server.bot.pipeline.ltm.response_cache.close()
+
+
+def memory_report(workers: dict) -> str:
+    """Table of resident, proportional, shared and private memory per process"""
+    rows = [("parent", os.getpid())] + [(f"worker {slot}", pid) for slot, pid in sorted(workers.items())]
+    lines = [f"{'process':<10} {'pid':>7} {'rss_mb':>8} {'pss_mb':>8} {'shared_mb':>10} {'private_mb':>11}"]
+    for name, pid in rows:
+        mem = process_memory(pid)
+        lines.append(f"{name:<10} {pid:>7} {mem.get('rss_mb', 0):>8} {mem.get('pss_mb', 0):>8} "
+                     f"{mem.get('shared_mb', 0):>10} {mem.get('private_mb', 0):>11}")
+    return "\n".join(lines)
+
+
+class Supervisor:
+    """Forks the workers, restarts the ones that die and relays signals"""
+
+    def __init__(self, sock: socket.socket, args: argparse.Namespace):
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # slot -> pid
+        self.running = True
+        self.reload = False
+
+    def spawn(self, slot: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                run_worker(self.sock, self.args.host, self.args.port, self.args.index)
+            except BaseException as e:
+                logger.error(f"Worker {os.getpid()} failed: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.workers[slot] = pid
+
+    def signal_workers(self, signum: int):
+        for pid in self.workers.values():
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        import api_server
+
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGHUP, self._request_reload)
+
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+        logger.info(f"Serving on {self.args.host}:{self.args.port} with {self.args.workers} workers")
+
+        next_report = time.monotonic() + self.args.report_interval
+        while self.running:
+            if self.reload:
+                self.reload = False
+                api_server.bot.pipeline.load_index(self.args.index)
+                self.signal_workers(signal.SIGHUP)
+            self._reap(respawn=True)
+            if self.args.report_interval and time.monotonic() >= next_report:
+                logger.info("Memory per process:\n" + memory_report(self.workers))
+                next_report = time.monotonic() + self.args.report_interval
+            time.sleep(0.5)
+
+        self.signal_workers(signal.SIGTERM)
+        deadline = time.monotonic() + self.args.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self._reap(respawn=False)
+            time.sleep(0.1)
+        self.signal_workers(signal.SIGKILL)
+
+    def _reap(self, respawn: bool):
+        for slot, pid in list(self.workers.items()):
+            try:
+                done, status = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                done, status = pid, 0
+            if not done:
+                continue
+            del self.workers[slot]
+            if respawn and self.running:
+                logger.warning(f"Worker {pid} exited with status {status}; restarting")
+                self.spawn(slot)
+
+    def _stop(self, *_):
+        self.running = False
+
+    def _request_reload(self, *_):
+        self.reload = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-fork API server for Legal Advisor Bot")
+    parser.add_argument('--index', required=True, help='Index snapshot directory')
+    parser.add_argument('--build', metavar='JSON',
+                        help='Build the snapshot from a JSON list of sections and exit')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--report-interval', type=float, default=60.0,
+                        help='Seconds between memory reports (0 disables them)')
+    parser.add_argument('--graceful-timeout', type=float, default=10.0,
+                        help='Seconds workers get to finish requests on shutdown')
+    args = parser.parse_args()
+
+    if args.build:
+        # Built in a process that never forks: torch's thread pools must not
+        # be running in the parent the workers are forked from
+        build_index(args.index, args.build)
+        return
+
+    # Collections would touch every object's header and unshare the pages
+    # the workers inherit; freezing the startup heap keeps them shared
+    gc.disable()
+    import api_server
+    api_server.bot.pipeline.load_index(args.index, mmap=True)
+    sock = bind_socket(args.host, args.port)
+    gc.collect()
+    gc.freeze()
+
+    Supervisor(sock, args).run()
+    sock.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
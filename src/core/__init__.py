@@ -4,8 +4,27 @@ Core Module - Initialization
 
 from .rag_pipeline import RAGPipeline
 from .chatbot import LegalAdvisorBot
+from .jobs import IngestJob, IngestJobManager, JobStage
+from .generation_jobs import GenerationJob, GenerationJobManager, GenerationStage
+from .context_assembler import ContextAssembler, AssembledContext
+from .single_flight import SingleFlight
+from .index_snapshot import IndexSnapshot, MappedTexts
+from .payload import build_payload, is_enabled
 
 __all__ = [
     'RAGPipeline',
-    'LegalAdvisorBot'
+    'LegalAdvisorBot',
+    'IngestJob',
+    'IngestJobManager',
+    'JobStage',
+    'GenerationJob',
+    'GenerationJobManager',
+    'GenerationStage',
+    'ContextAssembler',
+    'AssembledContext',
+    'SingleFlight',
+    'IndexSnapshot',
+    'MappedTexts',
+    'build_payload',
+    'is_enabled'
 ]
@@ -1,6 +1,10 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterator
+from datetime import datetime
+import os
 from src.core.rag_pipeline import RAGPipeline
-from src.utils import setup_logger, InvalidQueryException
+from src.core.jobs import IngestJobManager
+from src.core.generation_jobs import GenerationJobManager
+from src.utils import setup_logger, process_memory, InvalidQueryException, LLMException
 
 logger = setup_logger(__name__)
 
@@ -13,21 +17,63 @@ class LegalAdvisorBot:
     def __init__(self):
         """Initialize the Legal Advisor Bot"""
         self.pipeline = RAGPipeline()
-        self.sessions = {}  # Store active sessions
+        self.ingest_jobs = IngestJobManager(self.ingest_legal_documents)
+        self.generation_jobs = GenerationJobManager()
         logger.info("Legal Advisor Bot initialized")
     
     def ingest_legal_documents(self, documents: List[str], 
-                               metadata_list: List[Dict[str, Any]] = None):
+                               metadata_list: List[Dict[str, Any]] = None,
+                               progress_callback: Optional[Callable[..., None]] = None):
         """
         Ingest legal documents
         
         Args:
             documents: List of document texts
             metadata_list: Optional metadata
+            progress_callback: Optional callable(stage, documents_processed, chunks_processed)
         """
-        self.pipeline.ingest_documents(documents, metadata_list)
+        self.pipeline.ingest_documents(documents, metadata_list, progress_callback)
         logger.info(f"Ingested {len(documents)} documents")
     
+    def submit_ingest_job(self, documents: List[str],
+                          metadata_list: List[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Queue legal documents for background ingestion
+        
+        Args:
+            documents: List of document texts
+            metadata_list: Optional metadata
+            
+        Returns:
+            Job status dictionary including the job id
+        """
+        return self.ingest_jobs.submit(documents, metadata_list).to_dict()
+    
+    def get_ingest_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get status of a background ingest job"""
+        job = self.ingest_jobs.get(job_id)
+        return job.to_dict() if job else None
+    
+    @staticmethod
+    def _error_response(query: str, error: Exception) -> Dict[str, Any]:
+        """Build the user-facing payload for a failed query"""
+        if isinstance(error, InvalidQueryException):
+            logger.warning(f"Invalid query: {error}")
+            message = ("I'm sorry, but your query doesn't appear to be related to legal matters. "
+                       "Please ask a legal question and I'll be happy to help.")
+        elif isinstance(error, LLMException):
+            logger.error(f"LLM unavailable: {error}")
+            message = "The answer service is temporarily unavailable. Please try again shortly."
+        else:
+            logger.error(f"Error processing query: {error}")
+            message = "I encountered an error processing your query. Please try again."
+        return {
+            'query': query,
+            'response': message,
+            'error': True,
+            'error_message': str(error)
+        }
+    
     def query(self, query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Process a legal query
@@ -40,54 +86,142 @@ class LegalAdvisorBot:
             Response dictionary
         """
         try:
-            response = self.pipeline.process_query(query, session_id)
-            return response
-        except InvalidQueryException as e:
-            logger.warning(f"Invalid query: {e}")
-            return {
-                'query': query,
-                'response': f"I'm sorry, but your query doesn't appear to be related to legal matters. "
-                           f"Please ask a legal question and I'll be happy to help.",
-                'error': True,
-                'error_message': str(e)
-            }
+            return self.pipeline.process_query(query, session_id)
+        except Exception as e:
+            return self._error_response(query, e)
+    
+    async def aquery(self, query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Awaitable query() for async servers"""
+        try:
+            return await self.pipeline.aprocess_query(query, session_id)
+        except Exception as e:
+            return self._error_response(query, e)
+    
+    def query_stream(self, query: str, session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a legal query, streaming the response
+        
+        Args:
+            query: User query
+            session_id: Optional session ID
+            
+        Yields:
+            Pipeline events ('retrieval', 'preview', 'token', 'done'); failures end the
+            stream with an 'error' event carrying the same payload as query()
+        """
+        try:
+            yield from self.pipeline.process_query_stream(query, session_id)
         except Exception as e:
-            logger.error(f"Error processing query: {e}")
-            return {
-                'query': query,
-                'response': "I encountered an error processing your query. Please try again.",
-                'error': True,
-                'error_message': str(e)
-            }
+            yield {'event': 'error', 'data': self._error_response(query, e)}
+    
+    def retrieve(self, query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Categorise a legal query and return its sources, without an answer
+        
+        Args:
+            query: User query
+            session_id: Optional session ID
+            
+        Returns:
+            Response dictionary with response None, or the query() error payload
+        """
+        try:
+            return self.pipeline.retrieve(query, session_id)
+        except Exception as e:
+            return self._error_response(query, e)
+    
+    def submit_query(self, query: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Retrieve now and generate the answer in the background
+        
+        Args:
+            query: User query
+            session_id: Optional session ID
+            
+        Returns:
+            The retrieval result with a 'generation_id' to poll or stream
+            the answer by, or the query() error payload
+        """
+        events = self.query_stream(query, session_id)
+        first = next(events)
+        if first['event'] != 'retrieval':
+            return first['data']
+        job = self.generation_jobs.submit(events)
+        return {**first['data'], 'generation_id': job.job_id}
+    
+    def get_generation(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        """Get status and answer so far of a background generation"""
+        job = self.generation_jobs.get(generation_id)
+        return job.to_dict() if job else None
+    
+    def stream_generation(self, generation_id: str) -> Optional[Iterator[Dict[str, Any]]]:
+        """
+        Follow a background generation
+        
+        Returns:
+            Iterator of 'token' events then 'done' or 'error' (tokens
+            generated before the call are replayed), or None if unknown
+        """
+        job = self.generation_jobs.get(generation_id)
+        return job.events() if job else None
+    
+    def query_batch(self, queries: List[str], session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process several legal queries together
+        
+        Args:
+            queries: User queries
+            session_id: Optional session ID
+            
+        Yields:
+            One response dictionary per query, in input order, with its
+            'index'; a failed query yields the same payload as query()
+        """
+        index = 0
+        try:
+            for result in self.pipeline.process_query_batch(queries, session_id):
+                if isinstance(result, Exception):
+                    result = self._error_response(queries[index], result)
+                yield {'index': index, **result}
+                index += 1
+        except Exception as e:
+            # The batch itself failed: every unanswered query gets the error
+            for index in range(index, len(queries)):
+                yield {'index': index, **self._error_response(queries[index], e)}
     
     def start_session(self, session_id: str):
         """Start a new session"""
-        self.sessions[session_id] = {
-            'created_at': __import__('datetime').datetime.now().isoformat(),
-            'queries': 0
-        }
+        self.pipeline.sessions.set_metadata(session_id, 'created_at', datetime.now().isoformat())
         logger.info(f"Started session: {session_id}")
     
     def end_session(self, session_id: str):
         """End a session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        if self.pipeline.sessions.delete(session_id):
             logger.info(f"Ended session: {session_id}")
     
+    def has_session(self, session_id: str) -> bool:
+        """Check whether a session is live"""
+        return session_id in self.pipeline.sessions
+    
     def get_session_context(self, session_id: str = None) -> str:
         """Get conversation context from session"""
-        return self.pipeline.stm.get_context()
+        return self.pipeline.get_session_context(session_id)
+    
+    def get_session_history(self, session_id: str = None) -> List[Dict[str, Any]]:
+        """Get conversation history of a session"""
+        return self.pipeline.get_session_history(session_id)
     
     def get_stats(self) -> Dict[str, Any]:
         """Get bot statistics"""
         stats = self.pipeline.get_pipeline_stats()
-        stats['active_sessions'] = len(self.sessions)
+        stats['active_sessions'] = stats['sessions']['active_sessions']
+        stats['process'] = {'pid': os.getpid(), **process_memory()}
         return stats
     
     def reset(self):
         """Reset the bot"""
+        self.pipeline.sessions.close()
         self.pipeline = RAGPipeline()
-        self.sessions = {}
         logger.info("Bot reset successfully")
 
 
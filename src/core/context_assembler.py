@@ -0,0 +1,187 @@
+"""
+Context Assembler - Builds the LLM context from retrieved chunks
+"""
+from typing import Callable, List, Optional, Sequence, Tuple
+import re
+
+from src.data_pipeline import ChunkMetadataStore
+from src.llm.backends import estimate_tokens
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class ContextBlock:
+    """A span of one document made of one or more retrieved chunks"""
+
+    __slots__ = ('rows', 'doc_id', 'chunk_ids', 'start', 'end', 'text', 'score', 'label', 'tokens')
+
+    def __init__(self, row: int, doc_id: Optional[int], chunk_id: Optional[int],
+                 start: int, end: int, text: str, score: float, label: Optional[str]):
+        self.rows = [row]
+        self.doc_id = doc_id
+        self.chunk_ids = [chunk_id]
+        self.start = start
+        self.end = end
+        self.text = text
+        self.score = score
+        self.label = label
+        self.tokens = 0
+
+    def can_merge(self, other: "ContextBlock") -> bool:
+        """Whether other overlaps or directly follows this block in the same document"""
+        if self.doc_id is None or other.doc_id != self.doc_id or self.start < 0 or other.start < 0:
+            return False
+        if other.start < self.end:
+            return True
+        last, first = self.chunk_ids[-1], other.chunk_ids[0]
+        return last is not None and first == last + 1
+
+    def merge(self, other: "ContextBlock"):
+        """Append a later block, dropping the text both chunks share"""
+        if other.start >= self.end:
+            self.text += " " + other.text
+        elif other.end > self.end:
+            self.text += other.text[self.end - other.start:]
+        self.end = max(self.end, other.end)
+        self.rows.extend(other.rows)
+        self.chunk_ids.extend(other.chunk_ids)
+        self.score = max(self.score, other.score)
+
+
+class AssembledContext:
+    """Packed context text and the blocks it was built from"""
+
+    __slots__ = ('text', 'blocks', 'tokens', 'dropped_rows', 'truncated')
+
+    def __init__(self, text: str, blocks: List[ContextBlock], tokens: int,
+                 dropped_rows: List[int], truncated: bool):
+        self.text = text
+        self.blocks = blocks
+        self.tokens = tokens
+        self.dropped_rows = dropped_rows
+        self.truncated = truncated
+
+
+class ContextAssembler:
+    """
+    Turns ranked chunk hits into a compact, budgeted context.
+    Overlapping or consecutive chunks of a document are stitched into one
+    span (the chunker's overlap is kept once), duplicate and contained
+    spans are dropped, and the remaining blocks are packed by score until
+    the token budget is spent. Every block keeps the chunk rows it came
+    from, so sources stay attributable.
+    """
+
+    def __init__(self, max_tokens: int = 2000,
+                 token_counter: Callable[[str], int] = estimate_tokens,
+                 separator: str = "\n\n", label_sources: bool = False):
+        """
+        Initialize context assembler
+
+        Args:
+            max_tokens: Token budget for the whole context
+            token_counter: Fast local token estimate
+            separator: Text placed between blocks
+            label_sources: Prefix each block with its document id in the prompt
+        """
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter
+        self.separator = separator
+        self.label_sources = label_sources
+
+    def _blocks(self, hits: Sequence[Tuple[int, float]], documents: Sequence[str],
+                store: Optional[ChunkMetadataStore]) -> List[ContextBlock]:
+        blocks = []
+        for row, score in hits:
+            if store is not None and row < len(store):
+                get = store.get_field
+                blocks.append(ContextBlock(
+                    row, get(row, 'doc_id'), get(row, 'chunk_id'),
+                    get(row, 'char_start', -1), get(row, 'char_end', -1),
+                    documents[row], float(score), get(row, 'id') or get(row, 'title')
+                ))
+            else:
+                blocks.append(ContextBlock(row, None, None, -1, -1, documents[row], float(score), None))
+        return blocks
+
+    @staticmethod
+    def _merge(blocks: List[ContextBlock]) -> List[ContextBlock]:
+        located = sorted((b for b in blocks if b.doc_id is not None and b.start >= 0),
+                         key=lambda b: (b.doc_id, b.start))
+        merged: List[ContextBlock] = []
+        for block in located:
+            if merged and merged[-1].can_merge(block):
+                merged[-1].merge(block)
+            else:
+                merged.append(block)
+        merged.extend(b for b in blocks if b.doc_id is None or b.start < 0)
+        return merged
+
+    @staticmethod
+    def _dedupe(blocks: List[ContextBlock]) -> Tuple[List[ContextBlock], List[int]]:
+        kept: List[ContextBlock] = []
+        normalised: List[str] = []
+        dropped: List[int] = []
+        for block in sorted(blocks, key=lambda b: b.score, reverse=True):
+            text = _WHITESPACE.sub(" ", block.text).strip()
+            if not text or any(text in other for other in normalised):
+                dropped.extend(block.rows)
+                continue
+            kept.append(block)
+            normalised.append(text)
+        return kept, dropped
+
+    def _render(self, block: ContextBlock) -> str:
+        if self.label_sources and block.label:
+            return f"[{block.label}]\n{block.text}"
+        return block.text
+
+    def _truncate(self, text: str, budget: int) -> str:
+        # Cut at the last sentence end that fits, else at a word boundary
+        chars = max(0, budget * len(text) // max(1, self.token_counter(text)))
+        cut = text[:chars]
+        for boundary in (cut.rfind(". "), cut.rfind(" ")):
+            if boundary > chars // 2:
+                return cut[:boundary + 1].rstrip()
+        return cut
+
+    def assemble(self, hits: Sequence[Tuple[int, float]], documents: Sequence[str],
+                 store: Optional[ChunkMetadataStore] = None) -> AssembledContext:
+        """
+        Build the context for a query
+
+        Args:
+            hits: (row, score) pairs, best first
+            documents: Chunk texts indexed by row
+            store: Chunk metadata with doc_id, chunk_id and char offsets
+
+        Returns:
+            AssembledContext
+        """
+        blocks, dropped = self._dedupe(self._merge(self._blocks(hits, documents, store)))
+
+        parts: List[str] = []
+        packed: List[ContextBlock] = []
+        used = 0
+        truncated = False
+        separator_tokens = self.token_counter(self.separator)
+
+        for block in blocks:
+            rendered = self._render(block)
+            cost = self.token_counter(rendered) + (separator_tokens if parts else 0)
+            if used + cost > self.max_tokens:
+                remaining = self.max_tokens - used - (separator_tokens if parts else 0)
+                if packed or remaining <= 0:
+                    dropped.extend(block.rows)
+                    continue
+                # The best block alone is over budget: keep its head
+                rendered = self._truncate(rendered, remaining)
+                cost = self.token_counter(rendered)
+                truncated = True
+            block.tokens = cost
+            parts.append(rendered)
+            packed.append(block)
+            used += cost
+
+        text = self.separator.join(parts)
+        return AssembledContext(text, packed, self.token_counter(text), dropped, truncated)
@@ -0,0 +1,41 @@
+"""
+Deadline - Per-request time budget shared by every pipeline stage
+"""
+from typing import Optional
+import time
+
+
+class Deadline:
+    """
+    Absolute point in time (time.monotonic) a request must answer by.
+    Stages ask how much budget is left before doing optional work; a
+    Deadline without a budget never expires.
+    """
+
+    __slots__ = ('at',)
+
+    def __init__(self, budget: Optional[float] = None):
+        """
+        Initialize deadline
+
+        Args:
+            budget: Seconds from now, or None for no deadline
+        """
+        self.at: Optional[float] = time.monotonic() + budget if budget is not None else None
+
+    def remaining(self) -> float:
+        """Seconds left (infinite without a budget, never negative)"""
+        if self.at is None:
+            return float('inf')
+        return max(0.0, self.at - time.monotonic())
+
+    def allows(self, seconds: float) -> bool:
+        """Whether at least this many seconds are left"""
+        return self.remaining() >= seconds
+
+    @property
+    def expired(self) -> bool:
+        return self.at is not None and time.monotonic() >= self.at
+
+    def __repr__(self) -> str:
+        return f"Deadline(remaining={self.remaining():.3f})"
@@ -0,0 +1,175 @@
+"""
+Generation Jobs - Background answer generation for two-phase queries
+"""
+from typing import List, Dict, Any, Optional, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+import uuid
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class GenerationStage:
+    """Lifecycle stages reported for a generation job"""
+    QUEUED = "queued"
+    GENERATING = "generating"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    FINISHED = (COMPLETED, FAILED)
+
+
+class GenerationJob:
+    """
+    Answer being generated for an already retrieved query.
+    Keeps the text produced so far, so a poll sees partial output and a
+    late stream subscriber replays it before following live tokens.
+    """
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.stage = GenerationStage.QUEUED
+        self.parts: List[str] = []
+        self.final_event: Optional[Dict[str, Any]] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cond = threading.Condition()
+
+    def add_text(self, text: str):
+        """Record a generated chunk"""
+        with self._cond:
+            if self.started_at is None:
+                self.started_at = time.time()
+            self.stage = GenerationStage.GENERATING
+            self.parts.append(text)
+            self._cond.notify_all()
+
+    def finish(self, event: Dict[str, Any]):
+        """Mark job finished with its 'done' or 'error' event"""
+        with self._cond:
+            self.finished_at = time.time()
+            if self.started_at is None:
+                self.started_at = self.finished_at
+            self.final_event = event
+            self.stage = GenerationStage.COMPLETED if event['event'] == 'done' else GenerationStage.FAILED
+            self._cond.notify_all()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.stage in GenerationStage.FINISHED
+
+    def events(self) -> Iterator[Dict[str, Any]]:
+        """
+        Follow the job from the start
+
+        Yields:
+            'token' events for the text generated so far and as it arrives,
+            then the final 'done' or 'error' event
+        """
+        sent = 0
+        while True:
+            with self._cond:
+                while sent == len(self.parts) and self.final_event is None:
+                    self._cond.wait()
+                parts = self.parts[sent:]
+                final_event = self.final_event
+            sent += len(parts)
+            for text in parts:
+                yield {'event': 'token', 'data': {'text': text}}
+            if final_event is not None:
+                yield final_event
+                return
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._cond:
+            end = self.finished_at or time.time()
+            status = {
+                'generation_id': self.job_id,
+                'stage': self.stage,
+                'response': "".join(self.parts),
+                'elapsed_seconds': round(end - self.started_at, 3) if self.started_at else 0.0,
+                'submitted_at': datetime.fromtimestamp(self.submitted_at).isoformat()
+            }
+            if self.final_event is not None:
+                status['result'] = self.final_event['data']
+                if self.stage == GenerationStage.COMPLETED:
+                    status['response'] = self.final_event['data']['response']
+            return status
+
+
+class GenerationJobManager:
+    """
+    Runs the generation half of two-phase queries on background workers.
+    The request thread returns as soon as retrieval is done; the rest of
+    the query's event stream is consumed here and kept for polling.
+    """
+
+    def __init__(self, max_workers: int = 16, max_retained_jobs: int = 1000):
+        """
+        Initialize job manager
+
+        Args:
+            max_workers: Number of concurrent generations
+            max_retained_jobs: Finished jobs kept for polling
+        """
+        self.max_retained_jobs = max_retained_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="generate")
+        self.jobs: "OrderedDict[str, GenerationJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, events: Iterator[Dict[str, Any]]) -> GenerationJob:
+        """
+        Consume the remaining events of a query in the background
+
+        Args:
+            events: Query event stream positioned after its 'retrieval' event
+                (see LegalAdvisorBot.query_stream)
+
+        Returns:
+            The queued GenerationJob
+        """
+        job = GenerationJob(uuid.uuid4().hex)
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._prune()
+        self.executor.submit(self._run, job, events)
+        return job
+
+    def _run(self, job: GenerationJob, events: Iterator[Dict[str, Any]]):
+        """Execute a generation job on a worker thread"""
+        try:
+            for event in events:
+                if event['event'] == 'token':
+                    job.add_text(event['data']['text'])
+                elif event['event'] in ('done', 'error'):
+                    job.finish(event)
+                    return
+            job.finish({'event': 'error', 'data': {'error': True,
+                                                   'error_message': "Generation ended without a result"}})
+        except Exception as e:
+            logger.error(f"Generation job {job.job_id} failed: {e}")
+            job.finish({'event': 'error', 'data': {'error': True, 'error_message': str(e)}})
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        """Get a job by id"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - self.max_retained_jobs
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self.jobs.items() if job.is_finished][:excess]:
+            del self.jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running ones"""
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,215 @@
+"""
+Index Snapshot - Immutable view of one built index
+"""
+from typing import Any, Dict, List, Sequence
+from collections.abc import Sequence as SequenceABC
+from pathlib import Path
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from src.retrieval import HybridRetriever, CitationIndex
+from src.data_pipeline import ChunkMetadataStore
+
+INDEX_FORMAT_VERSION = 1
+
+
+class MappedTexts(SequenceABC):
+    """
+    Read-only list of chunk texts stored as one UTF-8 buffer plus offsets.
+    Loaded with mmap, the texts stay in the page cache, shared by every
+    process that maps the same file, instead of living as str objects
+    on each process's heap.
+    """
+
+    def __init__(self, buffer: np.ndarray, offsets: np.ndarray):
+        self.buffer = buffer
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("text index out of range")
+        start, end = int(self.offsets[idx]), int(self.offsets[idx + 1])
+        return self.buffer[start:end].tobytes().decode('utf-8')
+
+    @staticmethod
+    def save(texts: Sequence[str], directory: str):
+        """Write texts as texts.bin and text_offsets.npy"""
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        with open(path / "texts.bin", 'wb') as f:
+            for idx, text in enumerate(texts):
+                data = text.encode('utf-8')
+                f.write(data)
+                offsets[idx + 1] = offsets[idx] + len(data)
+        np.save(path / "text_offsets.npy", offsets)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "MappedTexts":
+        """Read texts written by save()"""
+        path = Path(directory)
+        offsets = np.load(path / "text_offsets.npy", mmap_mode='r' if mmap else None)
+        if offsets[-1] == 0:
+            buffer = np.zeros(0, dtype=np.uint8)  # numpy cannot map an empty file
+        elif mmap:
+            buffer = np.memmap(path / "texts.bin", dtype=np.uint8, mode='r')
+        else:
+            buffer = np.fromfile(path / "texts.bin", dtype=np.uint8)
+        return cls(buffer, offsets)
+
+
+class IndexSnapshot:
+    """
+    Everything a query reads from the index, published as one object.
+    Ingest builds a new snapshot off to the side and swaps the pipeline's
+    reference to it in a single assignment, so queries take the reference
+    once and search it without locks: they see either the old index or
+    the new one, never a mix. A snapshot is never modified after it is
+    published.
+    """
+
+    __slots__ = ('retriever', 'citation_index', 'documents', 'metadata_store',
+                 'live_chunks', 'version', 'built_at')
+
+    def __init__(self, retriever: HybridRetriever, citation_index: CitationIndex,
+                 documents: Sequence[str], live_chunks: Dict[str, str], version: int = 0,
+                 built_at: float = None):
+        """
+        Initialize snapshot
+
+        Args:
+            retriever: Hybrid retriever over the snapshot's chunks
+            citation_index: Citation lookup over the same metadata store
+            documents: Chunk texts indexed by row
+            live_chunks: Mapping of chunk key to content fingerprint
+            version: Number of swaps before this snapshot
+            built_at: When the index was built (now if None)
+        """
+        set_field = super().__setattr__
+        set_field('retriever', retriever)
+        set_field('citation_index', citation_index)
+        set_field('documents', documents)
+        set_field('metadata_store', retriever.metadata_store)
+        set_field('live_chunks', live_chunks)
+        set_field('version', version)
+        set_field('built_at', built_at if built_at is not None else time.time())
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("IndexSnapshot is immutable; build a new one and swap it in")
+
+    @classmethod
+    def empty(cls, **retriever_kwargs) -> "IndexSnapshot":
+        """Snapshot of an empty index (retriever_kwargs go to HybridRetriever)"""
+        store = ChunkMetadataStore()
+        return cls(HybridRetriever(metadata_store=store, **retriever_kwargs),
+                   CitationIndex.from_metadata(store), [], {})
+
+    def save(self, directory: str):
+        """
+        Write the snapshot to disk
+
+        Layout of the snapshot directory:
+            texts/           chunk texts (one UTF-8 buffer plus offsets)
+            metadata/        columnar chunk metadata
+            index/           FAISS index and BM25 postings
+            manifest.json    written last; marks the snapshot complete
+
+        The files are written to a staging directory next to the target and
+        then renamed over the old ones. Processes still serving a snapshot
+        mapped from the directory keep reading the old files, which are never
+        truncated, until they load the new one.
+
+        Args:
+            directory: Snapshot directory
+        """
+        path = Path(directory)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{path.name}.", dir=path.parent))
+        try:
+            self._write(staging)
+            _replace_tree(staging, path)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _write(self, path: Path):
+        MappedTexts.save(self.documents, path / "texts")
+        self.metadata_store.save(path / "metadata")
+        self.retriever.save(path / "index")
+        manifest = {
+            'format_version': INDEX_FORMAT_VERSION,
+            'chunks': len(self.documents),
+            'embedding_dim': self.retriever.faiss_retriever.dimension,
+            'faiss_weight': self.retriever.faiss_weight,
+            'bm25_weight': self.retriever.bm25_weight,
+            'built_at': self.built_at,
+            'live_chunks': self.live_chunks
+        }
+        (path / "manifest.json").write_text(json.dumps(manifest), encoding='utf-8')
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, version: int = 0,
+             faiss_weight: float = None, bm25_weight: float = None) -> "IndexSnapshot":
+        """
+        Read a snapshot written by save()
+
+        Args:
+            directory: Snapshot directory
+            mmap: Memory-map texts, vectors and postings instead of reading
+                them, so processes loading the same snapshot share one copy
+            version: Version number of the loaded snapshot
+            faiss_weight: Hybrid weight for FAISS (the saved one if None)
+            bm25_weight: Hybrid weight for BM25 (the saved one if None)
+
+        Returns:
+            Loaded IndexSnapshot
+        """
+        path = Path(directory)
+        manifest = json.loads((path / "manifest.json").read_text(encoding='utf-8'))
+        if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index snapshot version: {manifest.get('format_version')}")
+
+        documents = MappedTexts.load(path / "texts", mmap=mmap)
+        store = ChunkMetadataStore.load(path / "metadata")
+        retriever = HybridRetriever.load(
+            path / "index", documents, mmap=mmap,
+            faiss_weight=manifest['faiss_weight'] if faiss_weight is None else faiss_weight,
+            bm25_weight=manifest['bm25_weight'] if bm25_weight is None else bm25_weight,
+            metadata_store=store
+        )
+        return cls(retriever, CitationIndex.from_metadata(store), documents,
+                   manifest['live_chunks'], version, manifest['built_at'])
+
+    def stats(self) -> Dict[str, Any]:
+        """Get snapshot statistics"""
+        return {
+            'version': self.version,
+            'chunks': len(self.documents),
+            'built_at': self.built_at
+        }
+
+
+def _replace_tree(source: Path, target: Path):
+    """Rename every file of source over the same path under target, manifest last"""
+    manifest = None
+    for root, _, files in os.walk(source):
+        destination = target / Path(root).relative_to(source)
+        destination.mkdir(parents=True, exist_ok=True)
+        for name in files:
+            if Path(root) == source and name == "manifest.json":
+                manifest = Path(root) / name
+                continue
+            os.replace(Path(root) / name, destination / name)
+    if manifest is not None:
+        os.replace(manifest, target / "manifest.json")
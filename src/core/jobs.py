@@ -0,0 +1,166 @@
+"""
+Ingest Jobs - Background document ingestion with progress tracking
+"""
+from typing import List, Dict, Any, Optional, Callable
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import time
+import uuid
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class JobStage:
+    """Lifecycle stages reported for an ingest job"""
+    QUEUED = "queued"
+    PREPROCESSING = "preprocessing"
+    EMBEDDING = "embedding"
+    INDEXING = "indexing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    FINISHED = (COMPLETED, FAILED)
+
+
+class IngestJob:
+    """Progress record for a single background ingest"""
+
+    def __init__(self, job_id: str, total_documents: int):
+        self.job_id = job_id
+        self.stage = JobStage.QUEUED
+        self.total_documents = total_documents
+        self.documents_processed = 0
+        self.chunks_processed = 0
+        self.errors: List[str] = []
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def update(self, stage: str, documents_processed: int = None, chunks_processed: int = None):
+        """
+        Record progress reported by the pipeline
+
+        Args:
+            stage: Current stage name
+            documents_processed: Documents handled so far
+            chunks_processed: Chunks produced so far
+        """
+        with self._lock:
+            if self.started_at is None:
+                self.started_at = time.time()
+            self.stage = stage
+            if documents_processed is not None:
+                self.documents_processed = documents_processed
+            if chunks_processed is not None:
+                self.chunks_processed = chunks_processed
+
+    def finish(self, error: str = None):
+        """Mark job as completed, or failed if an error is given"""
+        with self._lock:
+            self.finished_at = time.time()
+            if self.started_at is None:
+                self.started_at = self.finished_at
+            if error:
+                self.errors.append(error)
+                self.stage = JobStage.FAILED
+            else:
+                self.stage = JobStage.COMPLETED
+
+    @property
+    def is_finished(self) -> bool:
+        return self.stage in JobStage.FINISHED
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            throughput = self.chunks_processed / elapsed if elapsed > 0 else 0.0
+            return {
+                'job_id': self.job_id,
+                'stage': self.stage,
+                'total_documents': self.total_documents,
+                'documents_processed': self.documents_processed,
+                'chunks_processed': self.chunks_processed,
+                'elapsed_seconds': round(elapsed, 3),
+                'chunks_per_second': round(throughput, 2),
+                'errors': list(self.errors),
+                'submitted_at': datetime.fromtimestamp(self.submitted_at).isoformat()
+            }
+
+
+class IngestJobManager:
+    """
+    Runs ingest jobs on a background executor.
+    Jobs are serialised on a single worker so index builds never overlap,
+    while request threads stay free to serve chat traffic.
+    """
+
+    def __init__(self, ingest_fn: Callable[..., Any], max_workers: int = 1,
+                 max_retained_jobs: int = 100):
+        """
+        Initialize job manager
+
+        Args:
+            ingest_fn: Callable (documents, metadata_list, progress_callback)
+            max_workers: Number of concurrent ingest workers
+            max_retained_jobs: Finished jobs kept for status polling
+        """
+        self.ingest_fn = ingest_fn
+        self.max_retained_jobs = max_retained_jobs
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="ingest")
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, documents: List[str],
+               metadata_list: List[Dict[str, Any]] = None) -> IngestJob:
+        """
+        Queue documents for background ingestion
+
+        Args:
+            documents: List of document texts
+            metadata_list: Optional metadata for each document
+
+        Returns:
+            The queued IngestJob
+        """
+        job = IngestJob(uuid.uuid4().hex, len(documents))
+        with self._lock:
+            self.jobs[job.job_id] = job
+            self._prune()
+        self.executor.submit(self._run, job, documents, metadata_list)
+        logger.info(f"Queued ingest job {job.job_id} ({len(documents)} documents)")
+        return job
+
+    def _run(self, job: IngestJob, documents: List[str],
+             metadata_list: Optional[List[Dict[str, Any]]]):
+        """Execute an ingest job on the worker thread"""
+        try:
+            self.ingest_fn(documents, metadata_list, progress_callback=job.update)
+            job.finish()
+            logger.info(f"Ingest job {job.job_id} completed")
+        except Exception as e:
+            logger.error(f"Ingest job {job.job_id} failed: {e}")
+            job.finish(error=str(e))
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        """Get a job by id"""
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond the retention limit"""
+        excess = len(self.jobs) - self.max_retained_jobs
+        if excess <= 0:
+            return
+        for job_id in [jid for jid, job in self.jobs.items() if job.is_finished][:excess]:
+            del self.jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running ones"""
+        self.executor.shutdown(wait=wait)
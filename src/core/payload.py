@@ -0,0 +1,45 @@
+"""
+Response Payloads - What the API sends for a pipeline result
+"""
+from typing import Any, Dict
+
+# Fields of a pipeline result that are sent only on request
+_HEAVY_FIELDS = ('sources', 'source_refs', 'enriched_query')
+
+
+def build_payload(result: Dict[str, Any], include_text: bool = False,
+                  include_enriched_query: bool = False) -> Dict[str, Any]:
+    """
+    Lean copy of a pipeline result for the wire
+
+    Sources are sent as references (document id, title, chunk key, chunk
+    offsets and score). The chunk texts and the enriched query, most of
+    the size of a full result, are added only when asked for. Results
+    without sources (errors, token events) are returned unchanged.
+
+    Args:
+        result: Result of the pipeline or bot (or an event's data)
+        include_text: Add each source's chunk text as 'text'
+        include_enriched_query: Keep the 'enriched_query' field
+
+    Returns:
+        Payload dictionary
+    """
+    if 'source_refs' not in result:
+        return result
+
+    payload = {key: value for key, value in result.items() if key not in _HEAVY_FIELDS}
+    sources = result['source_refs']
+    if include_text:
+        sources = [{**ref, 'text': text} for ref, (text, _) in zip(sources, result['sources'])]
+    payload['sources'] = sources
+    if include_enriched_query:
+        payload['enriched_query'] = result['enriched_query']
+    return payload
+
+
+def is_enabled(value: Any) -> bool:
+    """Read an opt-in flag from a JSON body or query string"""
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
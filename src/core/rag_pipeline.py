@@ -1,19 +1,32 @@
 """
 RAG Pipeline - Orchestrates the RAG process
 """
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterator, Union
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import numpy as np
+import asyncio
 import hashlib
+import os
+import threading
 
-from src.query_processing import QueryValidator, QueryCategorizer, QueryEnricher
-from src.retrieval import HybridRetriever
-from src.data_pipeline import DocumentChunker, DocumentEmbedder, DataPreprocessor
-from src.llm import ResponseGenerator
-from src.memory import ShortTermMemory, LongTermMemory
-from src.utils import setup_logger, InvalidQueryException
+from src.query_processing import (QueryValidator, QueryCategorizer, CentroidCategorizer, QueryEnricher,
+                                  KeywordEngine)
+from src.retrieval import HybridRetriever, CitationIndex
+from src.data_pipeline import DocumentChunker, DocumentEmbedder, DataPreprocessor, ChunkMetadataStore
+from src.llm import ResponseGenerator, ExtractiveAnswerGenerator
+from src.memory import ShortTermMemory, LongTermMemory, create_session_backend, build_cache_key
+from src.utils import setup_logger, InvalidQueryException, LLMException
+from src.core.jobs import JobStage
+from src.core.context_assembler import ContextAssembler
+from src.core.single_flight import SingleFlight
+from src.core.deadline import Deadline
+from src.core.index_snapshot import IndexSnapshot
 
 logger = setup_logger(__name__)
 
+# Chunk metadata identifying a source in results, alongside its score
+SOURCE_REF_FIELDS = ('id', 'title', 'chunk_key', 'chunk_id', 'char_start', 'char_end')
+
 class RAGPipeline:
     """
     Retrieval-Augmented Generation Pipeline.
@@ -25,7 +38,15 @@ class RAGPipeline:
                  chunk_size: int = 512,
                  stm_max_size: int = 10,
                  faiss_weight: float = 0.6,
-                 bm25_weight: float = 0.4):
+                 bm25_weight: float = 0.4,
+                 semantic_cache_threshold: float = 0.92,
+                 context_max_tokens: int = 2000,
+                 batch_concurrency: int = 8,
+                 request_budget: Optional[float] = None,
+                 min_generation_budget: float = 1.0,
+                 llm_fallback: bool = True,
+                 preview_categories: Tuple[str, ...] = ('legal_data_retrieval',),
+                 cpu_workers: Optional[int] = None):
         """
         Initialize RAG Pipeline
         
@@ -35,188 +56,863 @@ class RAGPipeline:
             stm_max_size: Short-term memory size
             faiss_weight: Weight for FAISS in hybrid retrieval
             bm25_weight: Weight for BM25 in hybrid retrieval
+            semantic_cache_threshold: Similarity needed to reuse a cached answer
+                for a paraphrased query (None disables the semantic cache)
+            context_max_tokens: Token budget for the retrieved context in the prompt
+            batch_concurrency: Concurrent generations per process_query_batch call
+            request_budget: Default seconds a query may take (REQUEST_BUDGET_SECONDS
+                env var if None; no deadline if unset)
+            min_generation_budget: Seconds that must be left to embed the query or
+                call the LLM; with less, those stages are skipped
+            llm_fallback: Answer extractively from the retrieved sections when
+                the LLM fails (otherwise only when out of time)
+            preview_categories: Categories whose streams send an extractive
+                'preview' before the LLM answer
+            cpu_workers: Threads running the CPU-bound stages of async queries
+                (os.cpu_count() if None)
         """
-        # Query processing
-        self.validator = QueryValidator()
-        self.categorizer = QueryCategorizer()
-        self.enricher = QueryEnricher()
-        
         # Data pipeline
         self.chunker = DocumentChunker(chunk_size=chunk_size)
         self.embedder = DocumentEmbedder()
         self.preprocessor = DataPreprocessor()
         
+        # Query processing
+        self.validator = QueryValidator()
+        self.categorizer = CentroidCategorizer(self.embedder, fallback=QueryCategorizer())
+        self.enricher = QueryEnricher()
+        # One automaton over all three lexicons, matched once per query
+        self.keyword_engine = KeywordEngine({
+            **self.validator.lexicons(),
+            **self.categorizer.lexicons(),
+            **self.enricher.lexicons()
+        })
+        
         # Retrieval
-        self.retriever = HybridRetriever(
+        self.embedding_dim = embedding_dim
+        self.faiss_weight = faiss_weight
+        self.bm25_weight = bm25_weight
+        # Queries read the current snapshot without locks; ingests are
+        # serialised and publish a new one (see IndexSnapshot)
+        self._snapshot = IndexSnapshot.empty(
             embedding_dim=embedding_dim,
             faiss_weight=faiss_weight,
             bm25_weight=bm25_weight
         )
+        self._ingest_lock = threading.Lock()
+        # Orders cache writes against swaps, so no answer built on a replaced
+        # index is cached after that index's invalidation ran
+        self._swap_lock = threading.Lock()
         
         # LLM
         self.generator = ResponseGenerator()
+        self.extractive = ExtractiveAnswerGenerator(self.embedder)
+        self.llm_fallback = llm_fallback
+        self.preview_categories = set(preview_categories)
+        self.context_assembler = ContextAssembler(
+            max_tokens=context_max_tokens,
+            token_counter=self.generator.count_tokens
+        )
         
         # Memory
-        self.stm = ShortTermMemory(max_size=stm_max_size)
-        self.ltm = LongTermMemory()
+        self.stm = ShortTermMemory(max_size=stm_max_size)  # used when no session id is given
+        self.sessions = create_session_backend(
+            os.getenv('SESSION_BACKEND_URL') or None,
+            max_turns=stm_max_size
+        )
+        self.semantic_cache_threshold = semantic_cache_threshold
+        self.ltm = LongTermMemory(
+            cache_db_path=os.getenv('LTM_CACHE_DB_PATH') or None,
+            embedding_dim=embedding_dim,
+            semantic_threshold=semantic_cache_threshold or 0.92
+        )
+        
+        # Identical queries arriving together share one generation
+        self.single_flight = SingleFlight()
+        self.batch_concurrency = batch_concurrency
+        # Async queries run retrieval here and await the LLM on the event loop
+        self.cpu_executor = ThreadPoolExecutor(max_workers=cpu_workers or os.cpu_count(),
+                                               thread_name_prefix='rag-cpu')
+        
+        # Time budget: stages skip optional work when it runs short, and the
+        # answer degrades to the retrieved sections rather than run over
+        if request_budget is None:
+            request_budget = float(os.getenv('REQUEST_BUDGET_SECONDS') or 0) or None
+        self.request_budget = request_budget
+        self.min_generation_budget = min_generation_budget
         
-        # Document store
-        self.documents = []
+        # Cached responses are only valid for the index configuration that produced them
+        self.index_version = hashlib.md5(
+            f"{self.embedder.model_name}|{chunk_size}|{self.chunker.overlap}|"
+            f"{faiss_weight}|{bm25_weight}".encode()
+        ).hexdigest()[:12]
         
         logger.info("RAG Pipeline initialized successfully")
     
-    def ingest_documents(self, documents: List[str], metadata_list: List[Dict[str, Any]] = None):
+    def ingest_documents(self, documents: List[str], metadata_list: List[Dict[str, Any]] = None,
+                         progress_callback: Optional[Callable[..., None]] = None):
         """
-        Ingest documents into the pipeline
+        Ingest documents into the pipeline.
+        The index is built off to the side and swapped in once complete,
+        so queries keep being served from the previous index meanwhile.
+        Concurrent ingests run one after the other.
         
         Args:
             documents: List of document texts
             metadata_list: Optional list of metadata for each document
+            progress_callback: Optional callable(stage, documents_processed, chunks_processed)
         """
-        logger.info(f"Ingesting {len(documents)} documents...")
-        
-        all_chunks = []
-        all_embeddings = []
-        all_metadata = []
-        
-        for doc_idx, doc in enumerate(documents):
-            # Preprocess
-            cleaned_doc = self.preprocessor.clean_text(doc)
+        with self._ingest_lock:
+            logger.info(f"Ingesting {len(documents)} documents...")
+            
+            def report(stage: str, docs_done: int, chunks_done: int):
+                if progress_callback:
+                    progress_callback(stage, docs_done, chunks_done)
+            
+            all_chunks = []
+            all_embeddings = []
+            metadata_store = ChunkMetadataStore()
+            live_chunks = {}
             
-            # Chunk
-            chunks = self.chunker.chunk(cleaned_doc)
+            for doc_idx, doc in enumerate(documents):
+                # Preprocess
+                report(JobStage.PREPROCESSING, doc_idx, len(all_chunks))
+                cleaned_doc = self.preprocessor.clean_text(doc)
             
-            # Embed
-            embeddings = self.embedder.embed_texts(chunks)
+                # Chunk
+                chunks_with_offsets = self.chunker.chunk_with_offsets(cleaned_doc)
+                chunks = [chunk for chunk, _, _ in chunks_with_offsets]
             
-            # Store
-            for chunk_idx, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                all_chunks.append(chunk)
-                all_embeddings.append(embedding)
+                # Embed
+                report(JobStage.EMBEDDING, doc_idx, len(all_chunks))
+                embeddings = self.embedder.embed_texts(chunks)
+            
+                # Store
+                for chunk_idx, ((chunk, start, end), embedding) in enumerate(
+                        zip(chunks_with_offsets, embeddings)):
+                    all_chunks.append(chunk)
+                    all_embeddings.append(embedding)
                 
-                chunk_meta = {
-                    'doc_id': doc_idx,
-                    'chunk_id': chunk_idx,
-                    'original_doc_length': len(doc),
-                    'chunk_length': len(chunk)
-                }
+                    chunk_meta = {
+                        'doc_id': doc_idx,
+                        'chunk_id': chunk_idx,
+                        'original_doc_length': len(doc),
+                        'chunk_length': len(chunk),
+                        'char_start': start,
+                        'char_end': end
+                    }
                 
-                if metadata_list and doc_idx < len(metadata_list):
-                    chunk_meta.update(metadata_list[doc_idx])
+                    if metadata_list and doc_idx < len(metadata_list):
+                        chunk_meta.update(metadata_list[doc_idx])
                 
-                all_metadata.append(chunk_meta)
+                    # Stable chunk identity: prefer the source's own id over position
+                    doc_key = chunk_meta.get('id') or f"doc_{doc_idx}"
+                    chunk_key = f"{doc_key}_chunk_{chunk_idx}"
+                    fingerprint = hashlib.md5(chunk.encode()).hexdigest()[:16]
+                    chunk_meta['chunk_key'] = chunk_key
+                    chunk_meta['fingerprint'] = fingerprint
                 
-                # Store in LTM
-                self.ltm.store_document_metadata(
-                    f"doc_{doc_idx}_chunk_{chunk_idx}",
-                    chunk_meta
-                )
+                    # Row id in the shared metadata table == index position
+                    metadata_store.append(chunk_meta, key=chunk_key)
+                    live_chunks[chunk_key] = fingerprint
+            
+            # Build a fresh index and swap it in atomically
+            report(JobStage.INDEXING, len(documents), len(all_chunks))
+            retriever = HybridRetriever(
+                embedding_dim=self.embedding_dim,
+                faiss_weight=self.faiss_weight,
+                bm25_weight=self.bm25_weight,
+                metadata_store=metadata_store
+            )
+            embedding_matrix = np.asarray(all_embeddings, dtype=np.float32)
+            if all_chunks:
+                retriever.add_documents(all_chunks, embedding_matrix)
+            snapshot = IndexSnapshot(retriever, CitationIndex.from_metadata(metadata_store),
+                                     all_chunks, live_chunks, self._snapshot.version + 1)
+            invalidated = self._publish(snapshot)
+            
+            logger.info(f"Ingested {len(all_chunks)} chunks successfully "
+                        f"({invalidated} cached responses invalidated)")
+    
+    def _publish(self, snapshot: IndexSnapshot) -> int:
+        """
+        Swap in a new snapshot (caller holds the ingest lock)
         
-        # Add to retriever
-        self.retriever.add_documents(all_chunks, all_embeddings, all_metadata)
-        self.documents = all_chunks
+        Returns:
+            Number of cached responses invalidated
+        """
+        self.ltm.set_document_metadata_store(snapshot.metadata_store)
+        # A view of the index's own vectors, not a second copy
+        self.ltm.store_embeddings(list(snapshot.live_chunks),
+                                  snapshot.retriever.faiss_retriever.vectors(), replace=True)
         
-        logger.info(f"Ingested {len(all_chunks)} chunks successfully")
+        with self._swap_lock:
+            self._snapshot = snapshot
+            # Drop cached answers whose source chunks changed or disappeared
+            return self.ltm.invalidate_changed_chunks(snapshot.live_chunks)
     
-    def process_query(self, query: str, session_id: str = None) -> Dict[str, Any]:
+    def save_index(self, directory: str):
+        """
+        Write the current index to disk (see IndexSnapshot.save)
+        
+        Args:
+            directory: Snapshot directory
+        """
+        self._snapshot.save(directory)
+        logger.info(f"Saved index snapshot to {directory}")
+    
+    def load_index(self, directory: str, mmap: bool = True):
+        """
+        Replace the index with one written by save_index()
+        
+        Args:
+            directory: Snapshot directory
+            mmap: Memory-map the index instead of reading it into memory; pre-forked
+                workers then share a single copy through the page cache
+        """
+        with self._ingest_lock:
+            snapshot = IndexSnapshot.load(directory, mmap=mmap, version=self._snapshot.version + 1,
+                                          faiss_weight=self.faiss_weight, bm25_weight=self.bm25_weight)
+            if snapshot.retriever.faiss_retriever.dimension != self.embedding_dim:
+                raise ValueError(f"Index dimension {snapshot.retriever.faiss_retriever.dimension} "
+                                 f"does not match embedding_dim {self.embedding_dim}")
+            invalidated = self._publish(snapshot)
+        logger.info(f"Loaded {len(snapshot.documents)} chunks from {directory} "
+                    f"({invalidated} cached responses invalidated)")
+    
+    @property
+    def snapshot(self) -> IndexSnapshot:
+        """The index queries are currently served from"""
+        return self._snapshot
+    
+    @property
+    def retriever(self) -> HybridRetriever:
+        return self._snapshot.retriever
+    
+    @property
+    def citation_index(self) -> CitationIndex:
+        return self._snapshot.citation_index
+    
+    @property
+    def documents(self) -> List[str]:
+        return self._snapshot.documents
+    
+    def process_query(self, query: str, session_id: str = None,
+                      budget: Optional[float] = None) -> Dict[str, Any]:
         """
         Process a user query through the RAG pipeline
         
         Args:
             query: User query
             session_id: Optional session ID
+            budget: Seconds the query may take (request_budget if None)
             
         Returns:
-            Dictionary with response and metadata
+            Dictionary with response and metadata. If the LLM was out of time or
+            failed, the response quotes the retrieved sections and 'degraded'
+            gives the reason ('deadline' or 'llm_unavailable').
+            
+        Raises:
+            LLMException: If generation failed and llm_fallback is off; nothing
+                is cached or recorded
         """
-        logger.info(f"Processing query: {query}")
+        return self._generate(self._prepare_query(query, session_id, self._deadline(budget)))
+    
+    def _deadline(self, budget: Optional[float]) -> Deadline:
+        return Deadline(budget if budget is not None else self.request_budget)
+    
+    def retrieve(self, query: str, session_id: str = None,
+                 budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Categorise a query and retrieve its sources without generating
         
-        # 1. Validate query
-        if not self.validator.is_valid(query):
-            raise InvalidQueryException("Query is not a valid legal domain query")
+        Session memory is not updated. A cached answer, if any, is left out
+        of the result; cache_hit still reports it.
         
-        validity_score = self.validator.get_validity_score(query)
+        Args:
+            query: User query
+            session_id: Optional session ID (used for query enrichment)
+            budget: Seconds retrieval may take (request_budget if None)
+            
+        Returns:
+            The process_query result with response None
+            
+        Raises:
+            InvalidQueryException: If the query is not a legal query
+        """
+        return self._build_result(self._prepare_query(query, session_id, self._deadline(budget)), None)
+    
+    def process_query_batch(self, queries: List[str], session_id: str = None,
+                            max_workers: int = None,
+                            budget: Optional[float] = None) -> Iterator[Union[Dict[str, Any], Exception]]:
+        """
+        Process many queries at once
         
-        # 2. Categorize query
-        category, category_confidence = self.categorizer.categorize(query)
+        Validation, categorisation, embedding and retrieval run over the
+        whole batch; answers are then generated concurrently (identical
+        queries share one generation).
         
-        # 3. Enrich query
-        session_context = self.stm.session_metadata if session_id else {}
-        enriched_query = self.enricher.enrich(query, session_context)
+        Args:
+            queries: User queries
+            session_id: Optional session ID shared by the batch
+            max_workers: Concurrent generations (batch_concurrency if None)
+            budget: Seconds the whole batch may take (request_budget if None)
+            
+        Yields:
+            Per query, in input order: the result dict process_query would
+            return, or the exception it would raise
+        """
+        prepared_batch = self._prepare_batch(queries, session_id, self._deadline(budget))
+        workers = min(max_workers or self.batch_concurrency, max(1, len(queries)))
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='batch-generate')
+        try:
+            futures = [pool.submit(self._generate, prepared) if isinstance(prepared, dict) else prepared
+                       for prepared in prepared_batch]
+            for future in futures:
+                if isinstance(future, Exception):
+                    yield future
+                    continue
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield e
+        finally:
+            # A client that stops reading should not keep generating
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _generate(self, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """Generate the answer to a prepared query and record it"""
+        query = prepared['query']
+        deadline = prepared['deadline']
+        response = prepared['response']
+        if response is None and not deadline.allows(self.min_generation_budget):
+            response = self._degrade(prepared, 'deadline')
+        if response is not None:
+            return self._complete_query(prepared, response)
         
-        # 4. Check LTM cache
-        query_hash = hashlib.md5(query.encode()).hexdigest()
-        cached_response = self.ltm.retrieve_response(query_hash)
+        # 8. Generate response, or wait for an identical query already generating
+        flight, leader = self.single_flight.begin(prepared['query_hash'])
+        if not leader:
+            response = self._follow(prepared, flight)
+            if response is not None:
+                return self._complete_query(prepared, response)
         
-        if cached_response and cached_response['confidence'] > 0.8:
-            logger.info("Using cached response from LTM")
-            response = cached_response['response']
-            sources = cached_response['sources']
-        else:
-            # 5. Generate query embedding
-            query_embedding = self.embedder.embed_text(query)
-            
-            # 6. Retrieve relevant documents
-            retrieved_docs = self.retriever.search(
-                query, 
-                query_embedding, 
-                k=5
-            )
-            
-            if not retrieved_docs:
-                response = "No relevant legal documents found for your query."
-                sources = []
-            else:
-                # 7. Prepare context
-                context = "\n\n".join([doc for doc, _ in retrieved_docs])
-                sources = retrieved_docs
-                
-                # 8. Generate response
+        try:
+            try:
                 response = self.generator.generate_with_context(
                     query,
-                    context,
-                    query_type=category.value
+                    prepared['context'],
+                    query_type=prepared['category'],
+                    deadline=deadline.at
                 )
-                
-                # Cache in LTM
-                confidence_score = sum(score for _, score in retrieved_docs) / len(retrieved_docs)
-                self.ltm.store_response(
-                    query_hash,
-                    response,
-                    [doc for doc, _ in retrieved_docs],
-                    confidence_score
+            except LLMException as e:
+                response = self._fallback(prepared, e, flight if leader else None)
+                leader = False
+            result = self._complete_query(prepared, response)
+        except BaseException as e:
+            if leader:
+                self.single_flight.fail(prepared['query_hash'], flight, e)
+            raise
+        if leader:
+            # Published only once the answer is cached, so later arrivals hit LTM
+            self.single_flight.resolve(prepared['query_hash'], flight, response)
+        return result
+    
+    def _follow(self, prepared: Dict[str, Any], flight) -> Optional[str]:
+        """
+        Wait for the leader of an identical query
+        
+        Returns:
+            The leader's response, a degraded one if the deadline passes
+            first, or None if the leader abandoned the flight
+        """
+        deadline = prepared['deadline']
+        try:
+            response = flight.result(timeout=deadline.remaining() if deadline.at is not None else None)
+        except CancelledError:
+            return None
+        except FutureTimeoutError:
+            return self._degrade(prepared, 'deadline')
+        except LLMException:
+            if not self.llm_fallback:
+                raise
+            return self._degrade(prepared, 'llm_unavailable')
+        prepared['cache_hit'] = 'coalesced'
+        return response
+    
+    def _fallback(self, prepared: Dict[str, Any], error: LLMException, flight=None) -> str:
+        """
+        Answer extractively after the LLM call failed
+        
+        Args:
+            prepared: Prepared query state
+            error: The LLM failure
+            flight: The single-flight future, if this query leads it
+            
+        Raises:
+            LLMException: error, if the deadline has not passed and llm_fallback is off
+        """
+        deadline = prepared['deadline']
+        if not (deadline.expired or self.llm_fallback):
+            raise error
+        if flight is not None:
+            if deadline.expired:
+                # Followers with budget left generate for themselves
+                self.single_flight.cancel(prepared['query_hash'], flight)
+            else:
+                # Followers would hit the same outage; they fall back too
+                self.single_flight.fail(prepared['query_hash'], flight, error)
+        logger.warning(f"LLM unavailable ({error}), answering extractively")
+        return self._degrade(prepared, 'deadline' if deadline.expired else 'llm_unavailable')
+    
+    async def aprocess_query(self, query: str, session_id: str = None,
+                             budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Awaitable process_query for async servers
+        
+        Validation, embedding, retrieval and memory writes run on
+        cpu_executor; the LLM call is awaited, so a query waiting on the
+        provider holds no thread.
+        
+        Args:
+            query: User query
+            session_id: Optional session ID
+            budget: Seconds the query may take (request_budget if None)
+        
+        Returns:
+            The process_query result
+        """
+        prepared = await self._offload(self._prepare_query, query, session_id, self._deadline(budget))
+        return await self._agenerate(prepared)
+    
+    async def _offload(self, fn: Callable[..., Any], *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.cpu_executor, fn, *args)
+    
+    async def _agenerate(self, prepared: Dict[str, Any]) -> Dict[str, Any]:
+        """Awaitable _generate"""
+        deadline = prepared['deadline']
+        response = prepared['response']
+        if response is None and not deadline.allows(self.min_generation_budget):
+            response = await self._offload(self._degrade, prepared, 'deadline')
+        if response is not None:
+            return await self._offload(self._complete_query, prepared, response)
+        
+        flight, leader = self.single_flight.begin(prepared['query_hash'])
+        if not leader:
+            response = await self._afollow(prepared, flight)
+            if response is not None:
+                return await self._offload(self._complete_query, prepared, response)
+        
+        try:
+            try:
+                response = await self.generator.agenerate_with_context(
+                    prepared['query'],
+                    prepared['context'],
+                    query_type=prepared['category'],
+                    deadline=deadline.at
                 )
+            except LLMException as e:
+                response = await self._offload(self._fallback, prepared, e, flight if leader else None)
+                leader = False
+            result = await self._offload(self._complete_query, prepared, response)
+        except asyncio.CancelledError:
+            # Client went away; followers generate for themselves
+            if leader:
+                self.single_flight.cancel(prepared['query_hash'], flight)
+            raise
+        except BaseException as e:
+            if leader:
+                self.single_flight.fail(prepared['query_hash'], flight, e)
+            raise
+        if leader:
+            self.single_flight.resolve(prepared['query_hash'], flight, response)
+        return result
+    
+    async def _afollow(self, prepared: Dict[str, Any], flight) -> Optional[str]:
+        """Awaitable _follow"""
+        deadline = prepared['deadline']
+        try:
+            # Shielded: a follower timing out must not cancel the leader's flight
+            response = await asyncio.wait_for(
+                asyncio.shield(asyncio.wrap_future(flight)),
+                deadline.remaining() if deadline.at is not None else None
+            )
+        except asyncio.CancelledError:
+            if flight.cancelled():
+                return None
+            raise
+        except asyncio.TimeoutError:
+            return await self._offload(self._degrade, prepared, 'deadline')
+        except LLMException:
+            if not self.llm_fallback:
+                raise
+            return await self._offload(self._degrade, prepared, 'llm_unavailable')
+        prepared['cache_hit'] = 'coalesced'
+        return response
+    
+    def process_query_stream(self, query: str, session_id: str = None,
+                             budget: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process a user query, streaming the response as it is generated
+        
+        Yields events in order:
+            {'event': 'retrieval', 'data': {...}}  categorisation and sources
+            {'event': 'preview', 'data': {'text': ...}}  extractive answer to show
+                until the first token (preview_categories only)
+            {'event': 'token', 'data': {'text': ...}}  one per generated chunk
+            {'event': 'done', 'data': {...}}  the full result, as process_query returns
+        
+        Memory is only updated once the stream has been consumed to the end.
+        
+        Args:
+            query: User query
+            session_id: Optional session ID
+            budget: Seconds until the first token is due (request_budget if None)
+        """
+        prepared = self._prepare_query(query, session_id, self._deadline(budget))
+        yield {'event': 'retrieval', 'data': self._build_result(prepared, None)}
+        
+        deadline = prepared['deadline']
+        response = prepared['response']
+        if response is None and not deadline.allows(self.min_generation_budget):
+            response = self._degrade(prepared, 'deadline')
+        flight, leader = None, False
+        if response is None:
+            flight, leader = self.single_flight.begin(prepared['query_hash'])
+            if not leader:
+                response = self._follow(prepared, flight)
+        
+        if response is not None:
+            yield {'event': 'token', 'data': {'text': response}}
+            yield {'event': 'done', 'data': self._complete_query(prepared, response)}
+            return
+        
+        try:
+            if prepared['category'] in self.preview_categories:
+                yield {'event': 'preview', 'data': {'text': self._extractive_answer(prepared)}}
+            parts = []
+            try:
+                for chunk in self.generator.generate_stream_with_context(
+                        query, prepared['context'], query_type=prepared['category'],
+                        deadline=deadline.at):
+                    parts.append(chunk)
+                    yield {'event': 'token', 'data': {'text': chunk}}
+            except LLMException as e:
+                if parts:
+                    raise
+                parts.append(self._fallback(prepared, e, flight if leader else None))
+                leader = False
+                yield {'event': 'token', 'data': {'text': parts[0]}}
+            response = "".join(parts)
+            result = self._complete_query(prepared, response)
+        except GeneratorExit:
+            if leader:
+                self.single_flight.cancel(prepared['query_hash'], flight)
+            raise
+        except BaseException as e:
+            if leader:
+                self.single_flight.fail(prepared['query_hash'], flight, e)
+            raise
+        if leader:
+            self.single_flight.resolve(prepared['query_hash'], flight, response)
+        yield {'event': 'done', 'data': result}
+    
+    def _prepare_query(self, query: str, session_id: str = None,
+                       deadline: Deadline = None) -> Dict[str, Any]:
+        """
+        Run every stage before generation: validation, categorisation,
+        enrichment, cache lookups, retrieval and context assembly.
+        
+        Returns:
+            Prepared query state; 'response' is already set for cache hits
+            and empty retrievals, otherwise 'context' is ready for the LLM
+        """
+        prepared = self._prepare_batch([query], session_id, deadline)[0]
+        if isinstance(prepared, Exception):
+            raise prepared
+        return prepared
+    
+    def _prepare_batch(self, queries: List[str], session_id: str = None,
+                       deadline: Deadline = None) -> List[Union[Dict[str, Any], Exception]]:
+        """
+        Prepare several queries stage by stage, so that embedding,
+        categorisation and dense retrieval each run once for the batch.
+        Without min_generation_budget left, embedding is skipped: queries
+        are categorised by keyword and retrieved lexically.
+        
+        Returns:
+            Prepared state per query (see _prepare_query), or the
+            InvalidQueryException a query failed validation with
+        """
+        # One snapshot for the whole batch; a concurrent ingest swaps in a new
+        # one without affecting queries already running
+        snapshot = self._snapshot
+        retriever = snapshot.retriever
+        citation_index = snapshot.citation_index
+        deadline = deadline or Deadline()
+        results: List[Any] = [None] * len(queries)
+        
+        # 1. Validate queries
+        live, analyses, citations, citation_rows = [], {}, {}, {}
+        for i, query in enumerate(queries):
+            logger.info(f"Processing query: {query}")
+            analysis = self.keyword_engine.analyze(query)
+            if not self.validator.is_valid(query, analysis):
+                results[i] = InvalidQueryException("Query is not a valid legal domain query")
+                continue
+            live.append(i)
+            analyses[i] = analysis
+            
+            # 1b. Exact citations ("Section 420 IPC") resolve straight to their chunks
+            citations[i] = citation_index.extract(query)
+            rows = []
+            if citations[i]:
+                rows = citation_index.lookup(citations[i])
+            citation_rows[i] = rows
+        
+        # 2. Categorize queries (embedding first so the vectors are reused below)
+        embeddings: Dict[int, np.ndarray] = {}
+        dense = [i for i in live if not citation_rows[i]]
+        embed = bool(dense) and deadline.allows(self.min_generation_budget)
+        if embed and self.categorizer.uses_embeddings:
+            embeddings.update(self._embed_batch(queries, dense))
+        categories = {}
+        for i in live:
+            if citation_rows[i] or not embed:
+                # Fast path: no embedding needed at all
+                categories[i] = self.categorizer.fallback.categorize(queries[i], analyses[i])
+        if embed:
+            categorized = self.categorizer.categorize_batch(
+                [queries[i] for i in dense],
+                np.vstack([embeddings[i] for i in dense]) if embeddings else None,
+                [analyses[i] for i in dense]
+            )
+            categories.update(zip(dense, categorized))
+        
+        # 3. Enrich queries
+        session_context = self.sessions.get_metadata(session_id) if session_id else {}
+        for i in live:
+            query = queries[i]
+            category, category_confidence = categories[i]
+            enriched_query = self.enricher.enrich(query, session_context, analyses[i])
+            enriched_query['entities']['citations'] = citations[i]
+            
+            results[i] = {
+                'query': query,
+                'session_id': session_id,
+                'category': category.value,
+                'category_confidence': category_confidence,
+                'validity_score': self.validator.get_validity_score(query, analyses[i]),
+                'enriched_query': enriched_query,
+                'citation_lookup': bool(citation_rows[i]),
+                'query_hash': build_cache_key(query, category.value, self.index_version),
+                'query_embedding': None,
+                'snapshot': snapshot,
+                'retriever': retriever,
+                'hits': [],
+                'sources': [],
+                'context': None,
+                'context_tokens': 0,
+                'response': None,
+                'cache_hit': None,
+                'deadline': deadline,
+                'degraded': None,
+                'skipped_stages': [] if embed or citation_rows[i] else ['embedding']
+            }
+            
+            # 4. Check LTM cache
+            cached_response = self.ltm.retrieve_response(results[i]['query_hash'])
+            if cached_response and cached_response['confidence'] > 0.8:
+                logger.info("Using cached response from LTM")
+                self._use_cached(results[i], cached_response, 'exact')
+        
+        # 5. Generate query embeddings (skipped for exact citation lookups)
+        pending = [i for i in live if results[i]['response'] is None]
+        missing = [i for i in pending if not citation_rows[i] and i not in embeddings] if embed else []
+        if missing:
+            embeddings.update(self._embed_batch(queries, missing))
+        
+        for i in pending:
+            prepared = results[i]
+            query_embedding = prepared['query_embedding'] = embeddings.get(i)
+            
+            # 5b. Reuse the answer to a paraphrased query
+            if self.semantic_cache_threshold and query_embedding is not None:
+                similar = self.ltm.retrieve_similar_response(query_embedding, prepared['category'],
+                                                             index_version=self.index_version)
+                if similar and similar['confidence'] > 0.8:
+                    logger.info(f"Using semantically cached response "
+                                f"(similarity {similar['similarity']:.3f})")
+                    self._use_cached(prepared, similar, 'semantic')
+        
+        # 6. Retrieve relevant documents
+        pending = [i for i in pending if results[i]['response'] is None]
+        hits_by_query = {i: [(row, 1.0) for row in citation_rows[i][:5]]
+                         for i in pending if citation_rows[i]}
+        searched = [i for i in pending if not citation_rows[i]]
+        if searched:
+            batch_hits = retriever.search_ids_batch(
+                [queries[i] for i in searched],
+                np.vstack([embeddings[i] for i in searched]) if embed else None,
+                k=5
+            )
+            hits_by_query.update(zip(searched, batch_hits))
+        
+        # 7. Prepare context
+        for i in pending:
+            self._attach_context(results[i], hits_by_query[i], retriever)
+        
+        return results
+    
+    def _embed_batch(self, queries: List[str], indexes: List[int]) -> Dict[int, np.ndarray]:
+        vectors = self.embedder.embed_texts([queries[i] for i in indexes])
+        return dict(zip(indexes, vectors))
+    
+    @staticmethod
+    def _use_cached(prepared: Dict[str, Any], cached_response: Dict[str, Any], kind: str):
+        prepared['cache_hit'] = kind
+        prepared['response'] = cached_response['response']
+        # Cached sources are (chunk key, score) references; the texts come from
+        # the index (entries whose chunks changed were invalidated on ingest)
+        snapshot = prepared['snapshot']
+        hits = []
+        for ref in cached_response['sources']:
+            row = snapshot.metadata_store.row_for(ref[0]) if isinstance(ref, (list, tuple)) else None
+            if row is not None:
+                hits.append((row, ref[1]))
+        prepared['hits'] = hits
+        prepared['sources'] = [(snapshot.documents[row], score) for row, score in hits]
+    
+    def _attach_context(self, prepared: Dict[str, Any], hits: List[Tuple[int, float]],
+                        retriever: HybridRetriever):
+        retrieved_docs = [(retriever.documents[idx], score) for idx, score in hits]
+        if not retrieved_docs:
+            prepared['response'] = "No relevant legal documents found for your query."
+            return
+        
+        # Sources are the chunks that made it into the context
+        assembled = self.context_assembler.assemble(hits, retriever.documents, retriever.metadata_store)
+        if assembled.dropped_rows:
+            dropped = set(assembled.dropped_rows)
+            hits = [(idx, score) for idx, score in hits if idx not in dropped]
+            retrieved_docs = [(retriever.documents[idx], score) for idx, score in hits]
+        prepared['hits'] = hits
+        prepared['sources'] = retrieved_docs
+        prepared['context'] = assembled.text
+        prepared['context_tokens'] = assembled.tokens
+    
+    def _complete_query(self, prepared: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Write a generated response back to memory and build the result"""
+        query = prepared['query']
+        retriever = prepared['retriever']
+        hits = prepared['hits']
+        
+        # Cache in LTM, unless the index was swapped while generating, the
+        # answer was reused (cached, or coalesced with an identical query) or
+        # it was answered without the LLM
+        if hits and prepared['cache_hit'] is None and not prepared['degraded']:
+            retrieved_docs = prepared['sources']
+            confidence_score = sum(score for _, score in retrieved_docs) / len(retrieved_docs)
+            store = retriever.metadata_store
+            source_chunks = {
+                store.get_field(idx, 'chunk_key'): store.get_field(idx, 'fingerprint')
+                for idx, _ in hits if store.get_field(idx, 'chunk_key')
+            }
+            with self._swap_lock:
+                if prepared['snapshot'] is self._snapshot:
+                    self.ltm.store_response(
+                        prepared['query_hash'],
+                        response,
+                        [[store.get_field(idx, 'chunk_key'), score] for idx, score in hits
+                         if store.get_field(idx, 'chunk_key')],
+                        confidence_score,
+                        query_embedding=prepared['query_embedding'] if self.semantic_cache_threshold else None,
+                        category=prepared['category'],
+                        source_chunks=source_chunks,
+                        index_version=self.index_version
+                    )
         
         # 9. Store in STM
-        self.stm.add_turn(query, response, category.value)
+        session_id = prepared['session_id']
+        if session_id:
+            self.sessions.add_turn(session_id, query, response, prepared['category'])
+        else:
+            self.stm.add_turn(query, response, prepared['category'])
         
-        # Prepare result
-        result = {
-            'query': query,
+        return self._build_result(prepared, response)
+    
+    def _degrade(self, prepared: Dict[str, Any], reason: str) -> str:
+        """Mark a query as answered without the LLM and build its extractive answer"""
+        logger.warning(f"Answering without the LLM ({reason}): {prepared['query']}")
+        prepared['degraded'] = reason
+        prepared['skipped_stages'].append('generation')
+        return self._extractive_answer(prepared)
+    
+    def _extractive_answer(self, prepared: Dict[str, Any]) -> str:
+        store = prepared['retriever'].metadata_store
+        labels = [(store.get_field(row, 'id') or store.get_field(row, 'title')) if row < len(store) else None
+                  for row, _ in prepared['hits']]
+        return self.extractive.generate(prepared['query'], prepared['sources'], labels,
+                                        prepared['query_embedding'])
+    
+    @staticmethod
+    def _source_refs(prepared: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Identify each source by its chunk rather than its text (aligned with 'sources')"""
+        store = prepared['retriever'].metadata_store
+        refs = []
+        for row, score in prepared['hits']:
+            ref = {field: store.get_field(row, field) for field in SOURCE_REF_FIELDS}
+            ref['score'] = float(score)
+            refs.append(ref)
+        return refs
+    
+    @classmethod
+    def _build_result(cls, prepared: Dict[str, Any], response: Optional[str]) -> Dict[str, Any]:
+        return {
+            'query': prepared['query'],
             'response': response,
-            'category': category.value,
-            'category_confidence': category_confidence,
-            'validity_score': validity_score,
-            'sources': sources,
-            'enriched_query': enriched_query,
-            'session_id': session_id
+            'category': prepared['category'],
+            'category_confidence': prepared['category_confidence'],
+            'validity_score': prepared['validity_score'],
+            'sources': prepared['sources'],
+            'source_refs': cls._source_refs(prepared),
+            'enriched_query': prepared['enriched_query'],
+            'session_id': prepared['session_id'],
+            'cache_hit': prepared['cache_hit'],
+            'citation_lookup': prepared['citation_lookup'],
+            'context_tokens': prepared['context_tokens'],
+            'degraded': prepared['degraded'],
+            'skipped_stages': list(prepared['skipped_stages'])
         }
-        
-        return result
     
-    def get_session_history(self) -> List[Dict[str, Any]]:
-        """Get current session history"""
+    def get_session_context(self, session_id: str = None) -> str:
+        """Get recent conversation context of a session"""
+        if session_id:
+            return self.sessions.get_context(session_id)
+        return self.stm.get_context()
+    
+    def get_session_history(self, session_id: str = None) -> List[Dict[str, Any]]:
+        """Get session history"""
+        if session_id:
+            return self.sessions.get_history(session_id)
         return self.stm.get_history()
     
-    def clear_session(self):
-        """Clear current session"""
-        self.stm.clear()
+    def clear_session(self, session_id: str = None):
+        """Clear a session"""
+        if session_id:
+            self.sessions.delete(session_id)
+        else:
+            self.stm.clear()
     
     def get_pipeline_stats(self) -> Dict[str, Any]:
         """Get pipeline statistics"""
         return {
             'indexed_documents': self.retriever.get_document_count(),
+            'index': self._snapshot.stats(),
             'stm_size': len(self.stm.history),
+            'sessions': self.sessions.stats(),
+            'single_flight': self.single_flight.stats(),
             'ltm_embeddings': self.ltm.get_all_embeddings_count(),
-            'cached_responses': self.ltm.get_response_cache_size()
+            'cached_responses': self.ltm.get_response_cache_size(),
+            'semantic_cache_entries': self.ltm.get_semantic_cache_size(),
+            'response_cache': self.ltm.response_cache.stats()
         }
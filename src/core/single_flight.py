@@ -0,0 +1,93 @@
+"""
+Single Flight - Coalesces concurrent identical work
+"""
+from typing import Any, Callable, Dict, Tuple
+from concurrent.futures import Future
+import threading
+
+
+class SingleFlight:
+    """
+    At most one in-flight computation per key.
+    The first caller for a key becomes the leader and does the work;
+    callers arriving while it runs get the same future and wait for the
+    leader's result (or exception) instead of repeating the work.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def begin(self, key: str) -> Tuple[Future, bool]:
+        """
+        Join or start the flight for a key
+
+        Args:
+            key: Work key, e.g. the response cache key
+
+        Returns:
+            Tuple of (future, is_leader); the leader must call resolve(),
+            fail() or cancel() exactly once
+        """
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            future = Future()
+            self._flights[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def resolve(self, key: str, future: Future, result: Any):
+        """Publish the leader's result to every follower"""
+        self._finish(key, future)
+        future.set_result(result)
+
+    def fail(self, key: str, future: Future, error: BaseException):
+        """Publish the leader's exception to every follower"""
+        self._finish(key, future)
+        future.set_exception(error)
+
+    def cancel(self, key: str, future: Future):
+        """Abandon the flight; followers see CancelledError and do the work themselves"""
+        self._finish(key, future)
+        future.cancel()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Work key
+            fn: Work to run if this caller leads
+
+        Returns:
+            Tuple of (result, is_leader)
+        """
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result(), False
+        try:
+            result = fn()
+        except BaseException as e:
+            self.fail(key, future, e)
+            raise
+        self.resolve(key, future, result)
+        return result, True
+
+    def stats(self) -> Dict[str, int]:
+        """Get coalescing statistics"""
+        with self._lock:
+            return {'in_flight': len(self._flights), 'leaders': self.leaders,
+                    'followers': self.followers}
+
+    def __len__(self) -> int:
+        return len(self._flights)
@@ -5,9 +5,11 @@ Data Pipeline Module - Initialization
 from .chunker import DocumentChunker
 from .embedder import DocumentEmbedder
 from .preprocessor import DataPreprocessor
+from .metadata_store import ChunkMetadataStore
 
 __all__ = [
     'DocumentChunker',
     'DocumentEmbedder',
-    'DataPreprocessor'
+    'DataPreprocessor',
+    'ChunkMetadataStore'
 ]
@@ -1,7 +1,7 @@
 """
 Document Chunker - Splits documents into manageable chunks
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 import re
 
 class ChunkStrategy:
@@ -135,6 +135,28 @@ class DocumentChunker:
         """
         return self.chunker.chunk(document, self.chunk_size, self.overlap)
     
+    def chunk_with_offsets(self, document: str) -> List[Tuple[str, int, int]]:
+        """
+        Chunk a document and locate each chunk in it
+        
+        Args:
+            document: Document text
+            
+        Returns:
+            List of (chunk, char_start, char_end); offsets are -1 if not found
+        """
+        result = []
+        search_from = 0
+        for chunk in self.chunk(document):
+            start = document.find(chunk, search_from)
+            if start < 0:
+                result.append((chunk, -1, -1))
+                continue
+            result.append((chunk, start, start + len(chunk)))
+            # Overlapping chunks start inside the previous one
+            search_from = start + 1
+        return result
+    
     def chunk_with_metadata(self, document: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Chunk document and preserve metadata
@@ -0,0 +1,323 @@
+"""
+Chunk Metadata Store - Columnar metadata table shared by all components
+"""
+from typing import List, Dict, Any, Optional, Iterable
+from array import array
+from datetime import datetime
+from pathlib import Path
+import json
+import threading
+import time
+import numpy as np
+
+INT_NULL = -(2 ** 63)
+
+
+class StringHeap:
+    """Append-only string column stored as one UTF-8 buffer plus offsets"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.offsets = array('q', [0])
+        self.nulls = array('b')
+
+    def append(self, value: Optional[str]):
+        if value is not None:
+            self.buffer += value.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+        self.nulls.append(value is None)
+
+    def get(self, idx: int) -> Optional[str]:
+        if self.nulls[idx]:
+            return None
+        return self.buffer[self.offsets[idx]:self.offsets[idx + 1]].decode('utf-8')
+
+    def nbytes(self) -> int:
+        return len(self.buffer) + self.offsets.itemsize * len(self.offsets) + len(self.nulls)
+
+
+class CategoricalColumn:
+    """Dictionary-encoded column for low-cardinality strings"""
+
+    def __init__(self):
+        self.codes = array('i')
+        self.categories: List[str] = []
+        self._lookup: Dict[str, int] = {}
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self.codes.append(-1)
+            return
+        code = self._lookup.get(value)
+        if code is None:
+            code = len(self.categories)
+            self.categories.append(value)
+            self._lookup[value] = code
+        self.codes.append(code)
+
+    def get(self, idx: int) -> Optional[str]:
+        code = self.codes[idx]
+        return self.categories[code] if code >= 0 else None
+
+    def code_of(self, value: str) -> int:
+        return self._lookup.get(value, -2)
+
+    def nbytes(self) -> int:
+        return self.codes.itemsize * len(self.codes) + sum(len(c) for c in self.categories)
+
+
+class ChunkMetadataStore:
+    """
+    Columnar metadata table indexed by integer chunk id.
+    Integer fields live in typed arrays, low-cardinality strings are
+    dictionary-encoded and free-text strings share a single heap, so a row
+    costs tens of bytes instead of a Python dict. Fields outside the schema
+    are kept in a sparse overflow dict.
+    """
+
+    INT_COLUMNS = ('doc_id', 'chunk_id', 'original_doc_length', 'chunk_length',
+                   'year', 'char_start', 'char_end')
+    CATEGORICAL_COLUMNS = ('category', 'jurisdiction', 'source')
+    STRING_COLUMNS = ('id', 'title', 'chunk_key', 'fingerprint')
+
+    def __init__(self):
+        self.int_columns = {name: array('q') for name in self.INT_COLUMNS}
+        self.categorical_columns = {name: CategoricalColumn() for name in self.CATEGORICAL_COLUMNS}
+        self.string_columns = {name: StringHeap() for name in self.STRING_COLUMNS}
+        self.stored_at = array('d')
+        self.extras: Dict[int, Dict[str, Any]] = {}
+        self._key_index: Dict[str, int] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, metadata: Dict[str, Any], key: str = None) -> int:
+        """
+        Append a row
+
+        Args:
+            metadata: Metadata dictionary
+            key: Optional external key to look the row up by
+
+        Returns:
+            Integer row id
+        """
+        metadata = metadata or {}
+        extras = {}
+
+        with self._lock:
+            row = self._size
+
+            for name, column in self.int_columns.items():
+                value = metadata.get(name)
+                if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+                    column.append(int(value))
+                else:
+                    column.append(INT_NULL)
+                    if value is not None:
+                        extras[name] = value
+
+            for name, column in self.categorical_columns.items():
+                value = metadata.get(name)
+                if value is None or isinstance(value, str):
+                    column.append(value)
+                else:
+                    column.append(None)
+                    extras[name] = value
+
+            for name, column in self.string_columns.items():
+                value = metadata.get(name)
+                if value is None or isinstance(value, str):
+                    column.append(value)
+                else:
+                    column.append(None)
+                    extras[name] = value
+
+            stored_at = metadata.get('stored_at')
+            if isinstance(stored_at, str):
+                stored_at = datetime.fromisoformat(stored_at).timestamp()
+            elif not isinstance(stored_at, (int, float)):
+                stored_at = time.time()
+            self.stored_at.append(stored_at)
+
+            for name, value in metadata.items():
+                if (name not in self.int_columns and name not in self.categorical_columns
+                        and name not in self.string_columns and name != 'stored_at'):
+                    extras[name] = value
+            if extras:
+                self.extras[row] = extras
+
+            if key is not None:
+                self._key_index[key] = row
+            self._size += 1
+
+        return row
+
+    def extend(self, metadata_list: Iterable[Dict[str, Any]]) -> List[int]:
+        """Append several rows, returning their ids"""
+        return [self.append(metadata) for metadata in metadata_list]
+
+    def get(self, row: int) -> Dict[str, Any]:
+        """
+        Materialise a row as a dictionary
+
+        Args:
+            row: Integer row id
+
+        Returns:
+            Metadata dictionary (null fields omitted)
+        """
+        if row < 0 or row >= self._size:
+            raise IndexError(f"Row {row} out of range")
+
+        result = {}
+        for name, column in self.int_columns.items():
+            value = column[row]
+            if value != INT_NULL:
+                result[name] = value
+        for name, column in self.categorical_columns.items():
+            value = column.get(row)
+            if value is not None:
+                result[name] = value
+        for name, column in self.string_columns.items():
+            value = column.get(row)
+            if value is not None:
+                result[name] = value
+        result.update(self.extras.get(row, {}))
+        result['stored_at'] = datetime.fromtimestamp(self.stored_at[row]).isoformat()
+        return result
+
+    def get_field(self, row: int, name: str, default: Any = None) -> Any:
+        """Read a single field without materialising the row"""
+        if name in self.int_columns:
+            value = self.int_columns[name][row]
+            return default if value == INT_NULL else value
+        if name in self.categorical_columns:
+            value = self.categorical_columns[name].get(row)
+        elif name in self.string_columns:
+            value = self.string_columns[name].get(row)
+        else:
+            value = self.extras.get(row, {}).get(name)
+        return default if value is None else value
+
+    def row_for(self, key: str) -> Optional[int]:
+        """Get the row id registered for an external key"""
+        return self._key_index.get(key)
+
+    def get_by_key(self, key: str) -> Optional[Dict[str, Any]]:
+        """Materialise the row registered for an external key"""
+        row = self._key_index.get(key)
+        return self.get(row) if row is not None else None
+
+    def column(self, name: str) -> np.ndarray:
+        """
+        Get a numeric column as a numpy array.
+        A copy is returned so the underlying arrays can keep growing.
+
+        Args:
+            name: Integer or categorical column name (categoricals return codes)
+
+        Returns:
+            numpy array (int64 with INT_NULL for missing ints, int32 codes with -1 for missing)
+        """
+        if name in self.int_columns:
+            source, dtype = self.int_columns[name], np.int64
+        elif name in self.categorical_columns:
+            source, dtype = self.categorical_columns[name].codes, np.int32
+        elif name == 'stored_at':
+            source, dtype = self.stored_at, np.float64
+        else:
+            raise KeyError(f"{name} is not a numeric column")
+        return np.frombuffer(source, dtype=dtype, count=self._size).copy()
+
+    def mask(self, **equals: str) -> np.ndarray:
+        """
+        Boolean row mask for categorical equality filters
+
+        Example:
+            store.mask(category='Criminal Law', jurisdiction='India')
+        """
+        result = np.ones(self._size, dtype=bool)
+        for name, value in equals.items():
+            column = self.categorical_columns[name]
+            result &= self.column(name) == column.code_of(value)
+        return result
+
+    def keys(self) -> List[str]:
+        """External keys registered in the store"""
+        return list(self._key_index)
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the columns"""
+        total = sum(col.itemsize * len(col) for col in self.int_columns.values())
+        total += sum(col.nbytes() for col in self.categorical_columns.values())
+        total += sum(col.nbytes() for col in self.string_columns.values())
+        total += self.stored_at.itemsize * len(self.stored_at)
+        return total
+
+    def save(self, directory: str):
+        """
+        Write the table as raw column files
+
+        Args:
+            directory: Target directory (created if missing)
+        """
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            for name, column in self.int_columns.items():
+                np.save(path / f"int_{name}.npy", np.frombuffer(column, dtype=np.int64))
+            for name, column in self.categorical_columns.items():
+                np.save(path / f"cat_{name}.npy", np.frombuffer(column.codes, dtype=np.int32))
+            for name, heap in self.string_columns.items():
+                (path / f"str_{name}.bin").write_bytes(bytes(heap.buffer))
+                np.save(path / f"str_{name}_offsets.npy", np.frombuffer(heap.offsets, dtype=np.int64))
+                np.save(path / f"str_{name}_nulls.npy", np.frombuffer(heap.nulls, dtype=np.int8))
+            np.save(path / "stored_at.npy", np.frombuffer(self.stored_at, dtype=np.float64))
+            header = {
+                'size': self._size,
+                'categories': {name: col.categories for name, col in self.categorical_columns.items()},
+                'keys': self._key_index,
+                'extras': {str(row): extra for row, extra in self.extras.items()}
+            }
+        (path / "header.json").write_text(json.dumps(header, default=str), encoding='utf-8')
+
+    @classmethod
+    def load(cls, directory: str) -> "ChunkMetadataStore":
+        """
+        Read a table written by save()
+
+        Args:
+            directory: Directory containing the column files
+
+        Returns:
+            Loaded ChunkMetadataStore
+        """
+        path = Path(directory)
+        header = json.loads((path / "header.json").read_text(encoding='utf-8'))
+        store = cls()
+
+        def read(name: str, typecode: str) -> array:
+            column = array(typecode)
+            column.frombytes(np.load(path / name).tobytes())
+            return column
+
+        for name in cls.INT_COLUMNS:
+            store.int_columns[name] = read(f"int_{name}.npy", 'q')
+        for name in cls.CATEGORICAL_COLUMNS:
+            column = store.categorical_columns[name]
+            column.codes = read(f"cat_{name}.npy", 'i')
+            column.categories = list(header['categories'].get(name, []))
+            column._lookup = {value: code for code, value in enumerate(column.categories)}
+        for name in cls.STRING_COLUMNS:
+            heap = store.string_columns[name]
+            heap.buffer = bytearray((path / f"str_{name}.bin").read_bytes())
+            heap.offsets = read(f"str_{name}_offsets.npy", 'q')
+            heap.nulls = read(f"str_{name}_nulls.npy", 'b')
+        store.stored_at = read("stored_at.npy", 'd')
+        store.extras = {int(row): extra for row, extra in header['extras'].items()}
+        store._key_index = dict(header['keys'])
+        store._size = header['size']
+        return store
+
+    def __len__(self) -> int:
+        return self._size
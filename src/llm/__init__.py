@@ -4,9 +4,22 @@ LLM Module - Initialization
 
 from .config import LLMConfig, PromptTemplates
 from .generator import ResponseGenerator
+from .backends import LLMBackend, GeminiBackend, OpenAICompatibleBackend, create_backend
+from .http_pool import HTTPConnectionPool, PooledResponse
+from .executor import LLMExecutor, CircuitBreaker
+from .extractive import ExtractiveAnswerGenerator
 
 __all__ = [
     'LLMConfig',
     'PromptTemplates',
-    'ResponseGenerator'
+    'ResponseGenerator',
+    'LLMBackend',
+    'GeminiBackend',
+    'OpenAICompatibleBackend',
+    'create_backend',
+    'HTTPConnectionPool',
+    'PooledResponse',
+    'LLMExecutor',
+    'CircuitBreaker',
+    'ExtractiveAnswerGenerator'
 ]
@@ -0,0 +1,205 @@
+"""
+LLM Backends - Provider implementations behind one interface
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, Optional
+import json
+import threading
+
+from .config import LLMConfig
+from .http_pool import HTTPConnectionPool
+from src.utils import LLMException
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the token count of a text
+
+    About four characters per token for English; computed locally so that
+    context packing does not cost a provider round trip.
+    """
+    return (len(text) + 3) // 4 if text else 0
+
+
+class LLMBackend(ABC):
+    """
+    Interface every LLM provider implements.
+    Calls are blocking and take the timeout for this attempt; retries,
+    deadlines and concurrency limits are handled by LLMExecutor.
+    """
+
+    name = 'base'
+
+    @abstractmethod
+    def generate(self, prompt: str, timeout: float) -> str:
+        """Return the full completion for a prompt"""
+
+    @abstractmethod
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        """Yield completion text chunks as the provider produces them"""
+
+    def count_tokens(self, text: str) -> int:
+        """Token count of a text (a local estimate unless overridden)"""
+        return estimate_tokens(text)
+
+    def close(self):
+        """Release connections held by the backend"""
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through the google-generativeai SDK"""
+
+    name = 'gemini'
+
+    def __init__(self, config: LLMConfig, client=None):
+        """
+        Initialize Gemini backend
+
+        Args:
+            config: LLM configuration
+            client: google.generativeai module (imported if None)
+
+        Raises:
+            ImportError: If google-generativeai is not installed
+        """
+        if client is None:
+            import google.generativeai as client
+            client.configure(api_key=config.api_key)
+        self.client = client
+        self.config = config
+        self._model = None
+        self._model_lock = threading.Lock()
+
+    def _generation_config(self) -> Dict[str, Any]:
+        return {
+            'temperature': self.config.temperature,
+            'top_k': self.config.top_k,
+            'top_p': self.config.top_p,
+            'max_output_tokens': self.config.max_output_tokens,
+        }
+
+    def _get_model(self):
+        """
+        Get the shared model handle, building it on first use
+
+        The handle is safe to share across threads; the SDK keeps one
+        transport (and its keep-alive connections) behind it.
+        """
+        model = self._model
+        if model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self.client.GenerativeModel(
+                        self.config.model,
+                        generation_config=self._generation_config()
+                    )
+                model = self._model
+        return model
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        response = self._get_model().generate_content(
+            prompt,
+            request_options={'timeout': timeout}
+        )
+        return response.text
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        response = self._get_model().generate_content(
+            prompt,
+            stream=True,
+            request_options={'timeout': timeout}
+        )
+        return (chunk.text for chunk in response if chunk.text)
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    Any server exposing the OpenAI chat completions API (vLLM, llama.cpp,
+    TGI, the local stub server, hosted providers). Uses a keep-alive
+    connection pool and reads streamed responses as server-sent events.
+    """
+
+    name = 'openai'
+
+    def __init__(self, config: LLMConfig, pool: HTTPConnectionPool = None):
+        """
+        Initialize OpenAI-compatible backend
+
+        Args:
+            config: LLM configuration; base_url must be set
+            pool: Connection pool (one to config.base_url if None)
+        """
+        if not config.base_url:
+            raise ValueError("LLM_BASE_URL is required for the openai backend")
+        self.config = config
+        self.pool = pool or HTTPConnectionPool(config.base_url,
+                                               max_connections=config.max_connections,
+                                               timeout=config.request_timeout)
+        self._headers = {'Content-Type': 'application/json'}
+        if config.api_key:
+            self._headers['Authorization'] = f"Bearer {config.api_key}"
+
+    def _body(self, prompt: str, stream: bool) -> bytes:
+        return json.dumps({
+            'model': self.config.model,
+            'messages': [{'role': 'user', 'content': prompt}],
+            'temperature': self.config.temperature,
+            'top_p': self.config.top_p,
+            'max_tokens': self.config.max_output_tokens,
+            'stream': stream
+        }).encode()
+
+    @staticmethod
+    def _error(status: int, body: bytes) -> LLMException:
+        try:
+            message = json.loads(body)['error']['message']
+        except (ValueError, KeyError, TypeError):
+            message = body[:200].decode(errors='replace')
+        return LLMException(f"LLM server returned {status}: {message}", code=status)
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        response = self.pool.request('POST', '/chat/completions', body=self._body(prompt, False),
+                                     headers=self._headers, timeout=timeout)
+        if response.status != 200:
+            raise self._error(response.status, response.body)
+        return json.loads(response.body)['choices'][0]['message']['content'] or ""
+
+    def stream(self, prompt: str, timeout: float) -> Iterator[str]:
+        with self.pool.stream('POST', '/chat/completions', body=self._body(prompt, True),
+                              headers=self._headers, timeout=timeout) as response:
+            if response.status != 200:
+                raise self._error(response.status, response.read())
+            for line in response:
+                if not line.startswith(b"data:"):
+                    continue
+                data = line[5:].strip()
+                if data == b"[DONE]":
+                    response.read()
+                    return
+                delta = json.loads(data)['choices'][0].get('delta', {})
+                if delta.get('content'):
+                    yield delta['content']
+
+    def close(self):
+        self.pool.close()
+
+
+def create_backend(config: LLMConfig) -> Optional[LLMBackend]:
+    """
+    Build the backend selected by config.backend
+
+    Args:
+        config: LLM configuration
+
+    Returns:
+        LLMBackend, or None if its client library is not installed
+    """
+    if config.backend == 'openai':
+        return OpenAICompatibleBackend(config)
+    if config.backend != 'gemini':
+        raise ValueError(f"Unknown LLM backend: {config.backend!r}")
+    try:
+        return GeminiBackend(config)
+    except ImportError:
+        print("Warning: google-generativeai not installed")
+        return None
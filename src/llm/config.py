@@ -8,12 +8,18 @@ class LLMConfig:
     """Configuration for LLM"""
     
     def __init__(self):
-        self.api_key = os.getenv('google_api_key', '')
-        self.model = 'gemini-2.5-pro'
+        self.backend = os.getenv('LLM_BACKEND', 'gemini').lower()
+        self.base_url = os.getenv('LLM_BASE_URL', '')
+        self.api_key = os.getenv('LLM_API_KEY') or os.getenv('google_api_key', '')
+        self.model = os.getenv('LLM_MODEL', 'gemini-2.5-pro')
         self.temperature = 0.7
         self.max_output_tokens = 2048
         self.top_k = 40
         self.top_p = 0.95
+        self.request_timeout = float(os.getenv('LLM_REQUEST_TIMEOUT', '60'))
+        self.max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+        self.max_retries = int(os.getenv('LLM_MAX_RETRIES', '2'))
+        self.max_connections = int(os.getenv('LLM_MAX_CONNECTIONS', '10'))
 
 
 class PromptTemplates:
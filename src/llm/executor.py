@@ -0,0 +1,285 @@
+"""
+LLM Executor - Concurrency limits, retries, timeouts and circuit breaking
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+import random
+import threading
+import time
+
+from src.utils import LLMException
+
+# HTTP statuses (also used as `code` by google.api_core errors) worth retrying
+RETRYABLE_STATUS = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether an LLM call error is transient (timeouts, throttling, 5xx)"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, 'code', None) or getattr(error, 'status', None)
+    return code in RETRYABLE_STATUS
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated provider failures.
+    Opens after failure_threshold consecutive failures; after reset_timeout
+    one trial call is let through (half-open) and its outcome closes or
+    re-opens the circuit.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Initialize circuit breaker
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds to stay open before a trial call
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Whether a call may be attempted now"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class LLMExecutor:
+    """
+    Runs blocking LLM calls on a private asyncio loop.
+    A global semaphore caps in-flight provider calls (a call that outlives
+    its timeout keeps its slot until it returns), each attempt is
+    bounded by the per-call timeout and the caller's deadline, transient
+    errors are retried with jittered exponential backoff, and a circuit
+    breaker fails fast while the provider is down. Every failure surfaces
+    as LLMException.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_retries: int = 2,
+                 timeout: float = 60.0, base_delay: float = 0.5, max_delay: float = 8.0,
+                 breaker: CircuitBreaker = None):
+        """
+        Initialize executor
+
+        Args:
+            max_concurrency: Maximum concurrent provider requests
+            max_retries: Retries after the first attempt for transient errors
+            timeout: Per-attempt timeout in seconds
+            base_delay: First backoff delay in seconds
+            max_delay: Cap on a single backoff delay
+            breaker: Circuit breaker (a default one if None)
+        """
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = breaker or CircuitBreaker()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._start_lock = threading.Lock()
+        self.stats_counters = {'calls': 0, 'retries': 0, 'failures': 0, 'rejected': 0}
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            with self._start_lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._threads = ThreadPoolExecutor(self.max_concurrency,
+                                                       thread_name_prefix='llm-call')
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+                    threading.Thread(target=loop.run_forever, name='llm-executor',
+                                     daemon=True).start()
+                    self._loop = loop
+        return self._loop
+
+    def _submit(self, coro: Awaitable) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop()).result()
+
+    @staticmethod
+    def _remaining(deadline: Optional[float]) -> Optional[float]:
+        if deadline is None:
+            return None
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMException("LLM deadline exceeded")
+        return remaining
+
+    async def _acquire(self, deadline: Optional[float]):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self._remaining(deadline))
+        except asyncio.TimeoutError:
+            raise LLMException("LLM deadline exceeded waiting for a free slot") from None
+
+    def _release_when_done(self, future: Future):
+        # A timed-out call keeps running in its thread; it holds its slot until it returns
+        loop, semaphore = asyncio.get_running_loop(), self._semaphore
+        future.add_done_callback(lambda _: loop.call_soon_threadsafe(semaphore.release))
+
+    async def _call(self, fn: Callable[[float], Any], deadline: Optional[float],
+                    keep_slot: bool = False) -> Any:
+        attempt = 0
+        while True:
+            await self._acquire(deadline)
+            try:
+                if not self.breaker.allow():
+                    self.stats_counters['rejected'] += 1
+                    raise LLMException("LLM provider unavailable (circuit open)")
+                remaining = self._remaining(deadline)
+            except LLMException:
+                self._semaphore.release()
+                raise
+
+            timeout = self.timeout if remaining is None else min(self.timeout, remaining)
+            self.stats_counters['calls'] += 1
+            future = self._threads.submit(fn, timeout)
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except Exception as e:
+                self._release_when_done(future)
+                retryable = is_retryable(e)
+                if retryable:
+                    self.breaker.record_failure()
+                else:
+                    # The provider answered; the request itself was bad
+                    self.breaker.record_success()
+                self.stats_counters['failures'] += 1
+
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+                if not retryable or attempt >= self.max_retries or out_of_time:
+                    if isinstance(e, LLMException):
+                        raise
+                    reason = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+                    raise LLMException(f"LLM request failed: {reason}") from e
+
+                attempt += 1
+                self.stats_counters['retries'] += 1
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._release_when_done(future)
+                raise
+
+            if not keep_slot:
+                self._semaphore.release()
+            self.breaker.record_success()
+            return result
+
+    def run(self, fn: Callable[[float], Any], deadline: float = None) -> Any:
+        """
+        Run a blocking LLM call
+
+        Args:
+            fn: Callable taking the attempt timeout in seconds
+            deadline: Absolute time.monotonic() by which the call must finish
+
+        Returns:
+            Result of fn
+
+        Raises:
+            LLMException: If every attempt failed, the deadline passed or the circuit is open
+        """
+        return self._submit(self._call(fn, deadline))
+
+    async def arun(self, fn: Callable[[float], Any], deadline: float = None) -> Any:
+        """Awaitable run(); usable from any event loop"""
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self._call(fn, deadline), loop)
+        return await asyncio.wrap_future(future)
+
+    def stream(self, fn: Callable[[float], Iterator[str]], deadline: float = None) -> Iterator[str]:
+        """
+        Run a streaming LLM call, holding a slot until the stream ends
+
+        Opening the stream and its first chunk are retried like run();
+        once text has been yielded a failure ends the stream with
+        LLMException instead of repeating output.
+
+        Args:
+            fn: Callable taking the attempt timeout and returning a chunk iterator
+            deadline: Absolute time.monotonic() by which the first chunk must arrive
+
+        Yields:
+            Response text chunks
+        """
+        def open_stream(timeout: float) -> Tuple[Optional[str], Iterator[str]]:
+            chunks = iter(fn(timeout))
+            return next(chunks, None), chunks
+
+        loop = self._ensure_loop()  # close() may clear self._loop before the stream ends
+        first, chunks = self._submit(self._call(open_stream, deadline, keep_slot=True))
+        try:
+            if first is None:
+                return
+            yield first
+            try:
+                for chunk in chunks:
+                    yield chunk
+            except Exception as e:
+                if is_retryable(e):
+                    self.breaker.record_failure()
+                raise LLMException(f"LLM stream interrupted: {e}") from e
+        finally:
+            loop.call_soon_threadsafe(self._semaphore.release)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get executor statistics"""
+        return {
+            **self.stats_counters,
+            'max_concurrency': self.max_concurrency,
+            'circuit': self.breaker.state
+        }
+
+    def close(self):
+        """Stop the executor loop and worker threads"""
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._threads.shutdown(wait=False)
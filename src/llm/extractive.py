@@ -0,0 +1,167 @@
+"""
+Extractive Answers - Local no-LLM answers built from retrieved sections
+"""
+from typing import List, Optional, Sequence, Tuple
+from collections import OrderedDict
+import re
+import threading
+
+import numpy as np
+
+_SENTENCE_END = re.compile(r'(?<=[.!?;:])\s+(?=[A-Z0-9("\'])|\n\s*\n')
+_WORD = re.compile(r'[a-z0-9]+')
+_WHITESPACE = re.compile(r'\s+')
+
+# Words too common in legal text to say anything about relevance
+_STOPWORDS = frozenset(
+    "a an and any are as at be by can do does for from how i in is it law legal may "
+    "of on or shall that the this to under what when where which who whoever with".split()
+)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split a chunk into sentences, dropping fragments too short to stand alone"""
+    sentences = (_WHITESPACE.sub(' ', part).strip() for part in _SENTENCE_END.split(text))
+    return [sentence for sentence in sentences if len(sentence) >= 20]
+
+
+def _terms(text: str) -> set:
+    return {word for word in _WORD.findall(text.lower()) if word not in _STOPWORDS}
+
+
+class ExtractiveAnswerGenerator:
+    """
+    Answers from the retrieved chunks themselves: their sentences are
+    ranked against the query and the best few are quoted with the section
+    they came from. Runs locally in milliseconds, so it serves as the
+    fallback when the LLM is down or out of time.
+
+    Sentences are scored by cosine similarity to the query embedding
+    (one matrix product over every candidate sentence), or by term
+    overlap when no embedding model is loaded or no query embedding is
+    given; sentences are only embedded in the first case. Sentence splits
+    and embeddings are cached per chunk.
+    """
+
+    def __init__(self, embedder=None, max_sentences: int = 4, max_cached_chunks: int = 2048):
+        """
+        Initialize extractive generator
+
+        Args:
+            embedder: Object with embed_texts(texts), e.g. DocumentEmbedder;
+                None scores by term overlap only
+            max_sentences: Sentences quoted per answer
+            max_cached_chunks: Chunks whose sentences and embeddings are kept
+        """
+        self.embedder = embedder
+        self.max_sentences = max_sentences
+        self.max_cached_chunks = max_cached_chunks
+        self._cache: "OrderedDict[str, Tuple[List[str], Optional[np.ndarray]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sentences(self, text: str, embed: bool) -> Tuple[List[str], Optional[np.ndarray]]:
+        with self._lock:
+            cached = self._cache.get(text)
+            if cached is not None:
+                self._cache.move_to_end(text)
+                if cached[1] is not None or not embed:
+                    return cached
+
+        sentences = cached[0] if cached is not None else (
+            split_sentences(text) or [_WHITESPACE.sub(' ', text).strip()])
+        vectors = None
+        if embed:
+            vectors = np.asarray(self.embedder.embed_texts(sentences), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.maximum(norms, 1e-8)
+
+        with self._lock:
+            self._cache[text] = (sentences, vectors)
+            while len(self._cache) > self.max_cached_chunks:
+                self._cache.popitem(last=False)
+        return sentences, vectors
+
+    def select(self, query: str, sources: Sequence[Tuple[str, float]],
+               query_embedding: Optional[np.ndarray] = None) -> List[Tuple[int, str]]:
+        """
+        Pick the sentences that best answer a query
+
+        Args:
+            query: User query
+            sources: (chunk text, retrieval score) pairs, best first
+            query_embedding: Query embedding, if already computed
+
+        Returns:
+            (source index, sentence) pairs, in source order then text order
+        """
+        # Embedding sentences only pays off with a query embedding to compare to
+        embed = (query_embedding is not None and self.embedder is not None
+                 and getattr(self.embedder, 'model', None) is not None)
+
+        candidates = []
+        vectors = []
+        for source, (text, score) in enumerate(sources):
+            sentences, matrix = self._sentences(text, embed)
+            for position, sentence in enumerate(sentences):
+                candidates.append((source, position, sentence, float(score)))
+            vectors.append(matrix)
+        if not candidates:
+            return []
+
+        # Semantic scores when every chunk has embeddings and the query is non-zero
+        semantic = None
+        if embed and all(v is not None for v in vectors):
+            query_vector = np.asarray(query_embedding, dtype=np.float32).ravel()
+            norm = np.linalg.norm(query_vector)
+            if norm > 1e-8:
+                semantic = np.vstack(vectors) @ (query_vector / norm)
+
+        if semantic is None:
+            query_terms = _terms(query)
+            semantic = np.array([
+                len(query_terms & _terms(sentence)) / np.sqrt(len(_terms(sentence)) or 1)
+                for _, _, sentence, _ in candidates
+            ], dtype=np.float32)
+
+        # Retrieval score breaks ties between equally relevant sentences
+        retrieval = np.array([score for _, _, _, score in candidates], dtype=np.float32)
+        scores = semantic + 0.1 * retrieval
+
+        chosen, seen = [], set()
+        for idx in np.argsort(-scores, kind='stable'):
+            if chosen and semantic[idx] <= 0:
+                break  # only the retrieval score left; do not pad with unrelated text
+            source, position, sentence, _ = candidates[idx]
+            key = sentence.lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            chosen.append((source, position, sentence))
+            if len(chosen) == self.max_sentences:
+                break
+        return [(source, sentence) for source, _, sentence in sorted(chosen)]
+
+    def generate(self, query: str, sources: Sequence[Tuple[str, float]],
+                 labels: Optional[Sequence[Optional[str]]] = None,
+                 query_embedding: Optional[np.ndarray] = None) -> str:
+        """
+        Build an extractive answer with section citations
+
+        Args:
+            query: User query
+            sources: (chunk text, retrieval score) pairs, best first
+            labels: Citation label per source (section id or title)
+            query_embedding: Query embedding, if already computed
+
+        Returns:
+            Answer text quoting the retrieved sections
+        """
+        selected = self.select(query, sources, query_embedding)
+        if not selected:
+            return "No relevant legal documents found for your query."
+
+        lines = []
+        for source, sentence in selected:
+            label = labels[source] if labels and source < len(labels) else None
+            lines.append(f"- {sentence} [{label}]" if label else f"- {sentence}")
+        return "From the relevant legal provisions:\n\n" + "\n".join(lines)
@@ -1,62 +1,87 @@
 """
 LLM Response Generator
 """
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Iterator
 import hashlib
 from .config import LLMConfig, PromptTemplates
-import google.generativeai as genai
+from .backends import LLMBackend, create_backend, estimate_tokens
+from .executor import LLMExecutor
+from src.utils import LLMException
 from dotenv import load_dotenv
 load_dotenv()
 
 class ResponseGenerator:
     """Generates responses using LLM"""
     
-    def __init__(self):
+    def __init__(self, backend: Optional[LLMBackend] = None):
+        """
+        Initialize generator
+        
+        Args:
+            backend: LLM backend (built from LLMConfig / LLM_BACKEND if None)
+        """
         self.config = LLMConfig()
-        self.client = None
-        self._initialize_client()
+        self.backend = backend if backend is not None else create_backend(self.config)
+        self.executor = LLMExecutor(
+            max_concurrency=self.config.max_concurrency,
+            max_retries=self.config.max_retries,
+            timeout=self.config.request_timeout
+        )
+    
+    def _require_backend(self) -> LLMBackend:
+        if self.backend is None:
+            raise LLMException("LLM client not initialized")
+        return self.backend
     
-    def _initialize_client(self):
-        """Initialize Google Generative AI client"""
-        try:
-            import google.generativeai as genai
-            genai.configure(api_key=self.config.api_key)
-            self.client = genai
-        except ImportError:
-            print("Warning: google-generativeai not installed")
+    def count_tokens(self, text: str) -> int:
+        """Token count of a text as the configured backend sees it"""
+        if self.backend is None:
+            return estimate_tokens(text)
+        return self.backend.count_tokens(text)
     
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, deadline: Optional[float] = None) -> str:
         """
         Generate response using LLM
         
         Args:
             prompt: Input prompt
+            deadline: Optional time.monotonic() by which the answer is needed
             
         Returns:
             Generated response
+            
+        Raises:
+            LLMException: If the LLM is unavailable or the request failed
         """
-        if not self.client:
-            return "LLM client not initialized"
+        backend = self._require_backend()
+        return self.executor.run(lambda timeout: backend.generate(prompt, timeout), deadline)
+    
+    async def agenerate(self, prompt: str, deadline: Optional[float] = None) -> str:
+        """Awaitable generate()"""
+        backend = self._require_backend()
+        return await self.executor.arun(lambda timeout: backend.generate(prompt, timeout), deadline)
+    
+    def generate_stream(self, prompt: str, deadline: Optional[float] = None) -> Iterator[str]:
+        """
+        Generate a response, yielding text chunks as the LLM produces them
         
-        try:
-            model = self.client.GenerativeModel(self.config.model)
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    'temperature': self.config.temperature,
-                    'top_k': self.config.top_k,
-                    'top_p': self.config.top_p,
-                    'max_output_tokens': self.config.max_output_tokens,
-                }
-            )
-            return response.text
-        except Exception as e:
-            return f"Error generating response: {str(e)}"
+        Args:
+            prompt: Input prompt
+            deadline: Optional time.monotonic() by which the first chunk is needed
+            
+        Yields:
+            Response text chunks
+            
+        Raises:
+            LLMException: If the LLM is unavailable or the stream failed
+        """
+        backend = self._require_backend()
+        yield from self.executor.stream(lambda timeout: backend.stream(prompt, timeout), deadline)
     
-    def generate_with_context(self, query: str, context: str, 
-                             query_type: str = "qa") -> str:
+    @staticmethod
+    def build_prompt(query: str, context: str, query_type: str = "qa") -> str:
         """
-        Generate response with context
+        Build the prompt for a query type
         
         Args:
             query: User query
@@ -64,7 +89,7 @@ class ResponseGenerator:
             query_type: Type of query (qa, comparison, summary, advice)
             
         Returns:
-            Generated response
+            Prompt text
         """
         if query_type == "qa":
             prompt = PromptTemplates.get_qa_prompt(query, context)
@@ -77,7 +102,46 @@ class ResponseGenerator:
         else:
             prompt = PromptTemplates.get_qa_prompt(query, context)
         
-        return self.generate(prompt)
+        return prompt
+    
+    def generate_with_context(self, query: str, context: str, 
+                             query_type: str = "qa", deadline: Optional[float] = None) -> str:
+        """
+        Generate response with context
+        
+        Args:
+            query: User query
+            context: Retrieved context
+            query_type: Type of query (qa, comparison, summary, advice)
+            deadline: Optional time.monotonic() by which the answer is needed
+            
+        Returns:
+            Generated response
+        """
+        return self.generate(self.build_prompt(query, context, query_type), deadline)
+    
+    async def agenerate_with_context(self, query: str, context: str,
+                                     query_type: str = "qa",
+                                     deadline: Optional[float] = None) -> str:
+        """Awaitable generate_with_context()"""
+        return await self.agenerate(self.build_prompt(query, context, query_type), deadline)
+    
+    def generate_stream_with_context(self, query: str, context: str,
+                                     query_type: str = "qa",
+                                     deadline: Optional[float] = None) -> Iterator[str]:
+        """
+        Stream a response with context
+        
+        Args:
+            query: User query
+            context: Retrieved context
+            query_type: Type of query (qa, comparison, summary, advice)
+            deadline: Optional time.monotonic() by which the first chunk is needed
+            
+        Yields:
+            Response text chunks
+        """
+        return self.generate_stream(self.build_prompt(query, context, query_type), deadline)
     
     @staticmethod
     def create_query_hash(query: str) -> str:
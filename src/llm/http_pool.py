@@ -0,0 +1,190 @@
+"""
+HTTP Connection Pool - Bounded keep-alive connections to one LLM endpoint
+"""
+from typing import Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import http.client
+import ssl
+import threading
+
+# Errors raised when the server has already closed an idle keep-alive connection
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 ConnectionResetError, BrokenPipeError)
+
+
+class PooledResponse:
+    """Fully read HTTP response"""
+
+    __slots__ = ('status', 'headers', 'body')
+
+    def __init__(self, status: int, headers: Dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+class HTTPConnectionPool:
+    """
+    Bounded pool of persistent HTTP(S) connections to a single host.
+    Connections are kept alive between requests, so the TCP and TLS
+    handshakes are paid once per connection instead of once per query.
+    At most max_connections requests are in flight; further callers wait
+    for a free connection up to their timeout.
+    """
+
+    def __init__(self, base_url: str, max_connections: int = 10,
+                 timeout: float = 60.0, ssl_context: ssl.SSLContext = None):
+        """
+        Initialize connection pool
+
+        Args:
+            base_url: Endpoint root, e.g. https://api.example.com/v1
+            max_connections: Maximum open connections
+            timeout: Default per-request timeout in seconds
+            ssl_context: TLS context for https (built once and shared)
+        """
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"Unsupported URL scheme: {parts.scheme!r}")
+
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.scheme == 'https' else 80)
+        self.base_path = parts.path.rstrip('/')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        if self.scheme == 'https' and self.ssl_context is None:
+            self.ssl_context = ssl.create_default_context()
+
+        self._idle: List[http.client.HTTPConnection] = []
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.connections_created = 0
+        self.requests_sent = 0
+
+    def _new_connection(self, timeout: float) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_created += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout,
+                                               context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _acquire(self, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No free connection to {self.host} within {timeout}s")
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            return self._new_connection(timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return conn, True
+
+    def _release(self, conn: http.client.HTTPConnection, reusable: bool):
+        try:
+            if reusable and not self._closed:
+                with self._lock:
+                    self._idle.append(conn)
+            else:
+                conn.close()
+        finally:
+            self._slots.release()
+
+    def _send(self, method: str, path: str, body: Optional[bytes],
+              headers: Optional[Dict[str, str]], timeout: Optional[float]):
+        timeout = self.timeout if timeout is None else timeout
+        url = self.base_path + path
+        headers = dict(headers or {})
+        headers.setdefault('Connection', 'keep-alive')
+
+        conn, reused = self._acquire(timeout)
+        try:
+            conn.request(method, url, body=body, headers=headers)
+            response = conn.getresponse()
+        except _STALE_ERRORS:
+            conn.close()
+            if not reused:
+                self._slots.release()
+                raise
+            # The server dropped the idle connection; retry once on a fresh one
+            conn = self._new_connection(timeout)
+            try:
+                conn.request(method, url, body=body, headers=headers)
+                response = conn.getresponse()
+            except BaseException:
+                self._release(conn, False)
+                raise
+        except BaseException:
+            self._release(conn, False)
+            raise
+
+        with self._lock:
+            self.requests_sent += 1
+        return conn, response
+
+    def request(self, method: str, path: str, body: bytes = None,
+                headers: Dict[str, str] = None, timeout: float = None) -> PooledResponse:
+        """
+        Send a request and read the whole response
+
+        Args:
+            method: HTTP method
+            path: Path relative to the base URL
+            body: Request body
+            headers: Request headers
+            timeout: Per-request timeout in seconds (pool default if None)
+
+        Returns:
+            PooledResponse
+        """
+        conn, response = self._send(method, path, body, headers, timeout)
+        try:
+            data = response.read()
+        except BaseException:
+            self._release(conn, False)
+            raise
+        self._release(conn, not response.will_close)
+        return PooledResponse(response.status, dict(response.getheaders()), data)
+
+    @contextmanager
+    def stream(self, method: str, path: str, body: bytes = None,
+               headers: Dict[str, str] = None,
+               timeout: float = None) -> Iterator[http.client.HTTPResponse]:
+        """
+        Send a request and yield the unread response for incremental reads
+
+        The connection goes back to the pool only if the body was read to
+        the end; an abandoned stream closes it.
+        """
+        conn, response = self._send(method, path, body, headers, timeout)
+        reusable = False
+        try:
+            yield response
+            reusable = response.isclosed() and not response.will_close
+        finally:
+            self._release(conn, reusable)
+
+    def close(self):
+        """Close all idle connections; in-flight ones close when released"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Get pool statistics"""
+        with self._lock:
+            return {
+                'max_connections': self.max_connections,
+                'idle_connections': len(self._idle),
+                'connections_created': self.connections_created,
+                'requests_sent': self.requests_sent
+            }
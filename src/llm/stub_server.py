@@ -0,0 +1,243 @@
+"""
+Stub LLM Server - Deterministic OpenAI-compatible endpoint for load testing
+
+Answers /v1/chat/completions (streamed or not) with text derived from a
+hash of the prompt, after latencies drawn from configurable distributions,
+so the whole pipeline can be measured offline.
+
+Usage:
+    python -m src.llm.stub_server --port 8088 --ttft lognormal:0.4,0.5 \\
+        --tokens-per-second normal:60,10 --output-tokens uniform:80,200
+    LLM_BACKEND=openai LLM_BASE_URL=http://127.0.0.1:8088/v1 python api_server.py
+"""
+from typing import Callable, Dict, List, Optional
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+
+Distribution = Callable[[random.Random], float]
+
+VOCABULARY = (
+    "the court held that section act provision liability offence accused contract party "
+    "evidence punishment appeal judgment rights duty breach consideration property tenant "
+    "employer remedy damages bail procedure jurisdiction constitution article statute "
+    "reasonable intention dishonestly shall may under of and to in a is be"
+).split()
+
+
+def parse_distribution(spec: str) -> Distribution:
+    """
+    Parse a distribution spec into a sampler
+
+    Specs: "fixed:V", "uniform:LO,HI", "normal:MEAN,STD", "exp:MEAN" and
+    "lognormal:MEDIAN,SIGMA". Samples are clamped at zero.
+
+    Args:
+        spec: Distribution spec string
+
+    Returns:
+        Callable drawing one sample from a random.Random
+    """
+    kind, _, args = spec.partition(':')
+    try:
+        params = [float(value) for value in args.split(',')] if args else []
+    except ValueError:
+        raise ValueError(f"Invalid distribution parameters: {spec!r}") from None
+
+    samplers = {
+        'fixed': (1, lambda rng, v: v),
+        'uniform': (2, lambda rng, lo, hi: rng.uniform(lo, hi)),
+        'normal': (2, lambda rng, mean, std: rng.gauss(mean, std)),
+        'exp': (1, lambda rng, mean: rng.expovariate(1.0 / mean) if mean > 0 else 0.0),
+        'lognormal': (2, lambda rng, median, sigma: rng.lognormvariate(math.log(median), sigma)),
+    }
+    if kind not in samplers or len(params) != samplers[kind][0]:
+        raise ValueError(f"Invalid distribution spec: {spec!r}")
+    sample = samplers[kind][1]
+    return lambda rng: max(0.0, sample(rng, *params))
+
+
+class StubConfig:
+    """Latency, throughput and failure behaviour of the stub server"""
+
+    def __init__(self, ttft: str = "fixed:0", tokens_per_second: str = "fixed:0",
+                 output_tokens: str = "fixed:64", error_rate: float = 0.0, seed: int = 0):
+        """
+        Initialize stub config
+
+        Args:
+            ttft: Time to first token distribution (seconds)
+            tokens_per_second: Decode speed distribution; 0 means instant
+            output_tokens: Completion length distribution (words)
+            error_rate: Fraction of requests answered with 503
+            seed: Seed for latency sampling and response text
+        """
+        self.ttft = parse_distribution(ttft)
+        self.tokens_per_second = parse_distribution(tokens_per_second)
+        self.output_tokens = parse_distribution(output_tokens)
+        self.error_rate = error_rate
+        self.seed = seed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> Dict[str, float]:
+        """Draw latencies and length for one request"""
+        with self._lock:
+            return {
+                'failed': self._rng.random() < self.error_rate,
+                'ttft': self.ttft(self._rng),
+                'tokens_per_second': self.tokens_per_second(self._rng),
+                'output_tokens': max(1, int(self.output_tokens(self._rng)))
+            }
+
+    def completion(self, prompt: str, length: int) -> List[str]:
+        """Deterministic completion words for a prompt"""
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode()).digest()
+        rng = random.Random(digest)
+        return [rng.choice(VOCABULARY) for _ in range(length)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI chat completions handler"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    server_version = 'StubLLM/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') in ('/health', '/v1/health'):
+            self._send_json(200, {'status': 'ok'})
+        elif self.path.rstrip('/') == '/v1/models':
+            self._send_json(200, {'object': 'list', 'data': [{'id': 'stub', 'object': 'model'}]})
+        else:
+            self._send_json(404, {'error': {'message': 'Not found'}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json(404, {'error': {'message': 'Not found'}})
+            return
+        try:
+            request = json.loads(body)
+            prompt = "\n".join(str(m.get('content', '')) for m in request['messages'])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_json(400, {'error': {'message': 'Invalid request body'}})
+            return
+
+        config: StubConfig = self.server.config
+        plan = config.sample()
+        self.server.count_request()
+        if plan['failed']:
+            self._send_json(503, {'error': {'message': 'Stub overloaded'}})
+            return
+
+        length = min(plan['output_tokens'], int(request.get('max_tokens') or plan['output_tokens']))
+        words = config.completion(prompt, length)
+        delay = 1.0 / plan['tokens_per_second'] if plan['tokens_per_second'] > 0 else 0.0
+        time.sleep(plan['ttft'])
+
+        if request.get('stream'):
+            self._stream(words, delay, request.get('model', 'stub'))
+            return
+
+        time.sleep(delay * max(0, len(words) - 1))
+        self._send_json(200, {
+            'id': 'stub-completion',
+            'object': 'chat.completion',
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': " ".join(words)}}],
+            'usage': {'prompt_tokens': len(prompt.split()), 'completion_tokens': len(words),
+                      'total_tokens': len(prompt.split()) + len(words)}
+        })
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def _stream(self, words: List[str], delay: float, model: str):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(delay)
+            event = {'object': 'chat.completion.chunk', 'model': model,
+                     'choices': [{'index': 0, 'delta': {'content': word if i == 0 else " " + word}}]}
+            self._write_chunk(b"data: " + json.dumps(event).encode() + b"\n\n")
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Threaded stub server; start() runs it in the background"""
+
+    daemon_threads = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, config: StubConfig = None):
+        super().__init__((host, port), StubHandler)
+        self.config = config or StubConfig()
+        self.requests_served = 0
+        self._count_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_request(self):
+        with self._count_lock:
+            self.requests_served += 1
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deterministic OpenAI-compatible stub LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8088)
+    parser.add_argument('--ttft', default='fixed:0', help='time to first token, e.g. lognormal:0.4,0.5')
+    parser.add_argument('--tokens-per-second', default='fixed:0', help='decode speed, 0 = instant')
+    parser.add_argument('--output-tokens', default='fixed:64', help='completion length in words')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(args.ttft, args.tokens_per_second, args.output_tokens,
+                        args.error_rate, args.seed)
+    server = StubLLMServer(args.host, args.port, config)
+    print(f"Stub LLM server on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,9 +4,21 @@ Memory Management Module - Initialization
 
 from .short_term_memory import ShortTermMemory, ConversationTurn
 from .long_term_memory import LongTermMemory
+from .response_cache import ResponseCache, build_cache_key, normalize_query
+from .semantic_cache import SemanticCache
+from .session_backend import SessionBackend, RedisSessionBackend, create_session_backend
+from .session_store import SessionStore
 
 __all__ = [
     'ShortTermMemory',
     'LongTermMemory',
-    'ConversationTurn'
+    'ConversationTurn',
+    'ResponseCache',
+    'SemanticCache',
+    'SessionStore',
+    'SessionBackend',
+    'RedisSessionBackend',
+    'create_session_backend',
+    'build_cache_key',
+    'normalize_query'
 ]
@@ -1,10 +1,25 @@
 """
 Long-Term Memory - Persistent vector database storage
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Set, Tuple
 import numpy as np
 from datetime import datetime
+from pathlib import Path
 import json
+import threading
+import time
+
+try:
+    import msgpack
+except ImportError:  # Snapshots fall back to JSON for the non-vector state
+    msgpack = None
+
+from src.data_pipeline.metadata_store import ChunkMetadataStore
+from .response_cache import ResponseCache
+from .semantic_cache import SemanticCache
+
+SNAPSHOT_FORMAT_VERSION = 1
+
 
 class LongTermMemory:
     """
@@ -12,17 +27,48 @@ class LongTermMemory:
     Stores document embeddings, past responses, and legal insights.
     """
     
-    def __init__(self, vector_db_path: str = "./data/embeddings"):
+    def __init__(self, vector_db_path: str = "./data/embeddings",
+                 cache_max_entries: int = 10000,
+                 cache_max_bytes: int = 64 * 1024 * 1024,
+                 cache_ttl_seconds: float = 30 * 24 * 3600,
+                 cache_db_path: str = None,
+                 embedding_dim: int = 384,
+                 semantic_threshold: float = 0.92):
         """
         Initialize LTM
         
         Args:
             vector_db_path: Path to vector database
+            cache_max_entries: Maximum number of cached responses
+            cache_max_bytes: Memory budget for cached responses
+            cache_ttl_seconds: Time-to-live for cached responses
+            cache_db_path: Optional SQLite file to persist the response cache
+            embedding_dim: Dimension of query embeddings for the semantic cache
+            semantic_threshold: Minimum similarity for a semantic cache hit
         """
         self.vector_db_path = vector_db_path
         self.embeddings_store = {}  # In-memory store (can be replaced with persistent DB)
-        self.response_cache = {}    # Cache of past responses
-        self.document_metadata = {} # Metadata about documents
+        self.chunk_references: Dict[str, Set[str]] = {}  # chunk id -> cache keys
+        # Guards chunk_references. Taken inside the response cache lock (eviction
+        # callback), so it is never held while calling into the response cache.
+        self._references_lock = threading.Lock()
+        self.semantic_cache = SemanticCache(
+            dimension=embedding_dim,
+            max_entries=cache_max_entries,
+            threshold=semantic_threshold
+        )
+        self.response_cache = ResponseCache(
+            max_entries=cache_max_entries,
+            max_bytes=cache_max_bytes,
+            ttl_seconds=cache_ttl_seconds,
+            db_path=cache_db_path,
+            on_evict=self._on_response_evicted
+        )
+        self.document_metadata = ChunkMetadataStore()  # Metadata about documents
+        
+        # Re-index responses restored from the persistent cache
+        for key, value in self.response_cache.items():
+            self._index_cached_response(key, value)
     
     def store_embedding(self, doc_id: str, embedding: np.ndarray, metadata: Dict[str, Any] = None):
         """
@@ -39,23 +85,62 @@ class LongTermMemory:
             'timestamp': datetime.now().isoformat()
         }
     
-    def store_response(self, query_hash: str, response: str, sources: List[str] = None, 
-                       confidence: float = 0.0):
+    def store_embeddings(self, doc_ids: List[str], embeddings, replace: bool = False):
+        """
+        Store many document embeddings backed by a single matrix
+        
+        Args:
+            doc_ids: Unique document identifiers
+            embeddings: Matrix or list of vectors, one per id
+            replace: Drop previously stored embeddings first
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        timestamp = datetime.now().isoformat()
+        # Built aside and swapped in, so readers never see a half-filled store
+        store = {} if replace else dict(self.embeddings_store)
+        for row, doc_id in enumerate(doc_ids):
+            store[doc_id] = {
+                'embedding': matrix[row],
+                'metadata': {},
+                'timestamp': timestamp
+            }
+        self.embeddings_store = store
+    
+    def store_response(self, query_hash: str, response: str, sources: List[List[Any]] = None, 
+                       confidence: float = 0.0, query_embedding: np.ndarray = None,
+                       category: str = None, source_chunks: Dict[str, str] = None,
+                       index_version: str = None):
         """
         Cache a past response
         
         Args:
             query_hash: Hash of the query
             response: Generated response
-            sources: List of source documents
+            sources: [chunk key, score] references to the source chunks; the
+                texts stay in the index rather than being copied into the cache
             confidence: Confidence score of response
+            query_embedding: Optional query embedding for semantic matching
+            category: Optional query category for semantic matching
+            source_chunks: Optional mapping of source chunk id to content fingerprint,
+                used to invalidate the response when those chunks change
+            index_version: Fingerprint of the index configuration that produced the
+                response; semantic matches are limited to the same version
         """
-        self.response_cache[query_hash] = {
+        value = {
             'response': response,
             'sources': sources or [],
             'confidence': confidence,
+            'category': category,
+            'source_chunks': source_chunks or {},
+            'index_version': index_version,
             'timestamp': datetime.now().isoformat()
         }
+        if query_embedding is not None:
+            value['query_embedding'] = SemanticCache.encode_embedding(query_embedding)
+        
+        self.response_cache.put(query_hash, value)
+        if query_hash in self.response_cache:
+            self._index_cached_response(query_hash, value, query_embedding)
     
     def retrieve_embedding(self, doc_id: str) -> Optional[np.ndarray]:
         """Retrieve stored embedding"""
@@ -67,16 +152,109 @@ class LongTermMemory:
         """Retrieve cached response"""
         return self.response_cache.get(query_hash)
     
+    def retrieve_similar_response(self, query_embedding: np.ndarray, category: str = None,
+                                  threshold: float = None,
+                                  index_version: str = None) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve a cached response for a semantically similar query
+        
+        Args:
+            query_embedding: Embedding of the incoming query
+            category: Only match cached queries of this category
+            threshold: Optional override of the similarity threshold
+            index_version: Only match responses built from this index version,
+                as exact-key lookups do
+            
+        Returns:
+            Cached response with its 'similarity', or None
+        """
+        match = self.semantic_cache.lookup(query_embedding, category, threshold, index_version)
+        if match is None:
+            return None
+        
+        key, similarity = match
+        cached = self.response_cache.get(key)
+        if cached is None:
+            self.semantic_cache.remove(key)
+            return None
+        if index_version is not None and cached.get('index_version') != index_version:
+            return None
+        return {**cached, 'similarity': similarity, 'cache_key': key}
+    
+    def invalidate_changed_chunks(self, live_chunks: Dict[str, str]) -> int:
+        """
+        Drop cached responses built from chunks that changed or disappeared
+        
+        Args:
+            live_chunks: Mapping of chunk id to content fingerprint for the current corpus
+            
+        Returns:
+            Number of cached responses invalidated
+        """
+        with self._references_lock:
+            references = [(chunk_id, list(keys)) for chunk_id, keys in self.chunk_references.items()]
+        
+        stale_keys = set()
+        dangling = []
+        for chunk_id, keys in references:
+            fingerprint = live_chunks.get(chunk_id)
+            for key in keys:
+                cached = self.response_cache.peek(key)
+                recorded = (cached or {}).get('source_chunks') or {}
+                if chunk_id not in recorded:
+                    # Reference left behind by a replaced entry
+                    dangling.append((chunk_id, key))
+                elif recorded[chunk_id] != fingerprint:
+                    stale_keys.add(key)
+        
+        self._drop_references(dangling)
+        for key in stale_keys:
+            self.response_cache.delete(key)
+        return len(stale_keys)
+    
+    def _index_cached_response(self, key: str, value: Dict[str, Any],
+                               query_embedding: np.ndarray = None):
+        """Add a cached response to the semantic and chunk reverse indexes"""
+        with self._references_lock:
+            for chunk_id in value.get('source_chunks') or {}:
+                self.chunk_references.setdefault(chunk_id, set()).add(key)
+        
+        if query_embedding is None:
+            encoded = value.get('query_embedding')
+            if not encoded:
+                return
+            query_embedding = SemanticCache.decode_embedding(encoded)
+        self.semantic_cache.add(key, query_embedding, value.get('category'),
+                                value.get('index_version'))
+    
+    def _on_response_evicted(self, key: str, value: Dict[str, Any]):
+        """Keep the semantic and chunk indexes in step with the response cache"""
+        self.semantic_cache.remove(key)
+        self._drop_references([(chunk_id, key) for chunk_id in value.get('source_chunks') or {}])
+    
+    def _drop_references(self, references: List[Tuple[str, str]]):
+        """Remove (chunk id, cache key) pairs from the chunk reverse index"""
+        if not references:
+            return
+        with self._references_lock:
+            for chunk_id, key in references:
+                keys = self.chunk_references.get(chunk_id)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.chunk_references[chunk_id]
+    
     def store_document_metadata(self, doc_id: str, metadata: Dict[str, Any]):
         """Store document metadata"""
-        self.document_metadata[doc_id] = {
-            **metadata,
-            'stored_at': datetime.now().isoformat()
-        }
+        self.document_metadata.append(metadata, key=doc_id)
+    
+    def set_document_metadata_store(self, store: ChunkMetadataStore):
+        """Share the metadata table built for the current index"""
+        self.document_metadata = store
     
     def get_document_metadata(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Get document metadata"""
-        return self.document_metadata.get(doc_id)
+        return self.document_metadata.get_by_key(doc_id)
     
     def get_all_embeddings_count(self) -> int:
         """Get count of stored embeddings"""
@@ -86,6 +264,10 @@ class LongTermMemory:
         """Get size of response cache"""
         return len(self.response_cache)
     
+    def get_semantic_cache_size(self) -> int:
+        """Get number of queries in the semantic index"""
+        return len(self.semantic_cache)
+    
     def clear_old_cache(self, days: int = 30):
         """
         Clear cached responses older than specified days
@@ -93,20 +275,10 @@ class LongTermMemory:
         Args:
             days: Number of days to keep cache
         """
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now() - timedelta(days=days)
-        
-        keys_to_remove = []
-        for key, value in self.response_cache.items():
-            cached_time = datetime.fromisoformat(value['timestamp'])
-            if cached_time < cutoff_date:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.response_cache[key]
+        self.response_cache.evict_older_than(time.time() - days * 24 * 3600)
     
     def export_state(self) -> Dict[str, Any]:
-        """Export LTM state for persistence"""
+        """Export LTM state as JSON-compatible data (embeddings excluded; see save())"""
         return {
             'embeddings_store': {
                 k: {
@@ -114,12 +286,117 @@ class LongTermMemory:
                     'timestamp': v['timestamp']
                 } for k, v in self.embeddings_store.items()
             },
-            'response_cache': self.response_cache,
-            'document_metadata': self.document_metadata
+            'response_cache': self.response_cache.to_dict(),
+            'document_metadata': {
+                key: self.document_metadata.get_by_key(key)
+                for key in self.document_metadata.keys()
+            }
         }
     
     def import_state(self, state: Dict[str, Any]):
         """Import LTM state from persistence"""
         self.embeddings_store = state.get('embeddings_store', {})
-        self.response_cache = state.get('response_cache', {})
-        self.document_metadata = state.get('document_metadata', {})
+        self.response_cache.clear()
+        cached = state.get('response_cache', {})
+        # Insert oldest first so LRU order follows recency
+        for key, value in sorted(cached.items(), key=lambda kv: kv[1].get('timestamp', '')):
+            stored_at = (datetime.fromisoformat(value['timestamp']).timestamp()
+                         if value.get('timestamp') else None)
+            self.response_cache.put(key, value, stored_at=stored_at)
+            if key in self.response_cache:
+                self._index_cached_response(key, value)
+        self.document_metadata = ChunkMetadataStore()
+        for key, metadata in state.get('document_metadata', {}).items():
+            self.document_metadata.append(metadata, key=key)
+    
+    def save(self, path: str):
+        """
+        Write a binary snapshot of the LTM
+        
+        Layout of the snapshot directory:
+            embeddings.npy   float32 matrix, one row per stored embedding
+            state.msgpack    keys, embedding metadata and response cache
+                             (state.json when msgpack is not installed)
+            metadata/        columnar document metadata
+            manifest.json    written last; marks the snapshot complete
+        
+        Args:
+            path: Snapshot directory
+        """
+        target = Path(path)
+        target.mkdir(parents=True, exist_ok=True)
+        
+        keys = list(self.embeddings_store)
+        if keys:
+            matrix = np.vstack([
+                np.asarray(self.embeddings_store[k]['embedding'], dtype=np.float32).ravel()
+                for k in keys
+            ])
+        else:
+            matrix = np.zeros((0, self.semantic_cache.dimension), dtype=np.float32)
+        np.save(target / "embeddings.npy", matrix)
+        
+        state = {
+            'embedding_keys': keys,
+            'embedding_metadata': [self.embeddings_store[k]['metadata'] for k in keys],
+            'embedding_timestamps': [self.embeddings_store[k]['timestamp'] for k in keys],
+            'response_cache': [[k, v, ts] for k, v, ts in self.response_cache.entries()]
+        }
+        if msgpack is not None:
+            serializer = 'msgpack'
+            (target / "state.msgpack").write_bytes(
+                msgpack.packb(state, use_bin_type=True, default=str))
+        else:
+            serializer = 'json'
+            (target / "state.json").write_text(json.dumps(state, default=str), encoding='utf-8')
+        
+        self.document_metadata.save(target / "metadata")
+        
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'serializer': serializer,
+            'embeddings': len(keys),
+            'embedding_dim': int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            'created_at': datetime.now().isoformat()
+        }
+        (target / "manifest.json").write_text(json.dumps(manifest), encoding='utf-8')
+    
+    def load(self, path: str, mmap: bool = True):
+        """
+        Restore a snapshot written by save()
+        
+        Args:
+            path: Snapshot directory
+            mmap: Memory-map the embedding matrix instead of reading it,
+                so vectors are paged in lazily on first access
+        """
+        source = Path(path)
+        manifest = json.loads((source / "manifest.json").read_text(encoding='utf-8'))
+        if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported LTM snapshot version: {manifest.get('format_version')}")
+        
+        if manifest['serializer'] == 'msgpack':
+            if msgpack is None:
+                raise ImportError("msgpack is required to load this snapshot. "
+                                  "Install with: pip install msgpack")
+            state = msgpack.unpackb((source / "state.msgpack").read_bytes(), raw=False)
+        else:
+            state = json.loads((source / "state.json").read_text(encoding='utf-8'))
+        
+        matrix = np.load(source / "embeddings.npy", mmap_mode='r' if mmap else None)
+        self.embeddings_store = {
+            key: {'embedding': matrix[row], 'metadata': metadata, 'timestamp': timestamp}
+            for row, (key, metadata, timestamp) in enumerate(zip(
+                state['embedding_keys'],
+                state['embedding_metadata'],
+                state['embedding_timestamps']
+            ))
+        }
+        
+        self.response_cache.clear()
+        for key, value, stored_at in state['response_cache']:
+            self.response_cache.put(key, value, stored_at=stored_at)
+            if key in self.response_cache:
+                self._index_cached_response(key, value)
+        
+        self.document_metadata = ChunkMetadataStore.load(source / "metadata")
@@ -0,0 +1,402 @@
+"""
+Response Cache - Bounded LRU/TTL cache with optional SQLite persistence
+"""
+from typing import Dict, List, Any, Optional, Callable, Iterator, Tuple
+from collections import OrderedDict
+import hashlib
+import heapq
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import atexit
+import weakref
+from functools import partial
+
+from src.utils import setup_logger
+
+logger = setup_logger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?.!]+$')
+
+# Seconds a write waits on another process's lock (pre-forked workers share the file)
+SQLITE_BUSY_TIMEOUT = 5.0
+
+
+def normalize_query(query: str) -> str:
+    """Normalise a query for cache lookups (case, whitespace, trailing punctuation)"""
+    query = _WHITESPACE.sub(' ', query.strip().lower())
+    return _TRAILING_PUNCTUATION.sub('', query)
+
+
+def build_cache_key(query: str, category: str = None, index_version: str = None) -> str:
+    """
+    Build a response cache key
+
+    Args:
+        query: User query
+        category: Query category
+        index_version: Fingerprint of the index configuration
+
+    Returns:
+        Hex digest identifying the cached response
+    """
+    raw = f"{index_version or ''}|{category or ''}|{normalize_query(query)}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+class CacheEntry:
+    """A single cached value with its accounting data"""
+
+    __slots__ = ('value', 'size', 'stored_at')
+
+    def __init__(self, value: Dict[str, Any], size: int, stored_at: float):
+        self.value = value
+        self.size = size
+        self.stored_at = stored_at
+
+
+class ResponseCache:
+    """
+    Bounded response cache.
+    Entries are evicted least-recently-used once either the entry count or
+    the byte budget is exceeded, and expire after a fixed TTL. Expiry is
+    driven by a min-heap ordered on store time, so purging old entries only
+    touches the entries that actually expire.
+
+    When a database path is given, writes are queued and flushed to SQLite
+    by a background thread, and the most recent entries are reloaded on start.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024,
+                 ttl_seconds: float = 30 * 24 * 3600, db_path: str = None,
+                 flush_interval: float = 1.0,
+                 on_evict: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Initialize response cache
+
+        Args:
+            max_entries: Maximum number of cached entries
+            max_bytes: Approximate memory budget for cached payloads
+            ttl_seconds: Time-to-live for each entry
+            db_path: Optional SQLite file for write-behind persistence
+            flush_interval: Seconds between background flushes to SQLite
+            on_evict: Optional callback(key, value) invoked when an entry is removed
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.on_evict = on_evict
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._expiry = []  # heap of (stored_at, key)
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Write-behind state
+        self._db = None
+        self._pending: Dict[str, Optional[Tuple[str, float]]] = {}
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+
+        if db_path:
+            self._open_db()
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached value, refreshing its LRU position
+
+        Args:
+            key: Cache key
+
+        Returns:
+            Cached value or None if missing/expired
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.time() - entry.stored_at > self.ttl_seconds:
+                self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get a cached value without touching LRU order or hit statistics"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.value if entry is not None else None
+
+    def put(self, key: str, value: Dict[str, Any], stored_at: float = None):
+        """
+        Insert or replace a cached value
+
+        Args:
+            key: Cache key
+            value: JSON-serialisable value
+            stored_at: Optional epoch timestamp (defaults to now)
+        """
+        stored_at = time.time() if stored_at is None else stored_at
+        payload = json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+        with self._lock:
+            if self._insert(key, value, payload, stored_at):
+                self._mark_dirty(key, (payload, stored_at))
+
+    def delete(self, key: str) -> bool:
+        """Remove an entry; returns True if it existed"""
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def evict_older_than(self, cutoff: float) -> int:
+        """
+        Remove entries stored before the cutoff
+
+        Args:
+            cutoff: Epoch timestamp
+
+        Returns:
+            Number of entries removed
+        """
+        removed = 0
+        with self._lock:
+            while self._expiry and self._expiry[0][0] < cutoff:
+                stored_at, key = heapq.heappop(self._expiry)
+                entry = self._entries.get(key)
+                # Heap items for replaced or evicted entries are stale
+                if entry is not None and entry.stored_at == stored_at:
+                    self._remove(key)
+                    removed += 1
+        return removed
+
+    def purge_expired(self) -> int:
+        """Remove all entries past their TTL"""
+        return self.evict_older_than(time.time() - self.ttl_seconds)
+
+    def items(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Iterate over (key, value) pairs, least recently used first"""
+        with self._lock:
+            snapshot = [(k, e.value) for k, e in self._entries.items()]
+        return iter(snapshot)
+
+    def entries(self) -> List[Tuple[str, Dict[str, Any], float]]:
+        """Snapshot of (key, value, stored_at), least recently used first"""
+        with self._lock:
+            return [(k, e.value, e.stored_at) for k, e in self._entries.items()]
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Export cached values as a plain dictionary"""
+        return dict(self.items())
+
+    def clear(self):
+        """Remove all entries"""
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+            self._expiry.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'persistent': self._db is not None
+            }
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    # ------------------------------------------------------------------
+    # Internal bookkeeping (caller holds the lock)
+    # ------------------------------------------------------------------
+
+    def _insert(self, key: str, value: Dict[str, Any], payload: str, stored_at: float) -> bool:
+        # Budgeted in UTF-8 bytes: Devanagari text is three bytes per character
+        size = len(payload.encode('utf-8')) + len(key.encode('utf-8'))
+        if size > self.max_bytes:
+            # Too big to cache, but the value it replaces is stale all the same
+            if key in self._entries:
+                self._remove(key)
+            return False
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._total_bytes -= old.size
+
+        self._entries[key] = CacheEntry(value, size, stored_at)
+        self._total_bytes += size
+        heapq.heappush(self._expiry, (stored_at, key))
+
+        while len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes:
+            lru_key = next(iter(self._entries))
+            self._remove(lru_key)
+            self.evictions += 1
+
+        # Rebuild the heap when stale items dominate it
+        if len(self._expiry) > 2 * len(self._entries) + 64:
+            self._expiry = [(e.stored_at, k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry)
+        return True
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+        self._mark_dirty(key, None)
+        if self.on_evict:
+            self.on_evict(key, entry.value)
+
+    # ------------------------------------------------------------------
+    # SQLite write-behind
+    # ------------------------------------------------------------------
+
+    def _open_db(self):
+        """Open the backing database and warm the cache from it"""
+        self._db = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT,
+                                   check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_stored_at "
+            "ON response_cache(stored_at)"
+        )
+        self._db.commit()
+        self._warm_from_db()
+
+        self._start_flusher()
+        atexit.register(self.close)
+        # A forked worker gets its own connection and flusher
+        os.register_at_fork(after_in_child=partial(_after_fork, weakref.ref(self)))
+
+    def _start_flusher(self):
+        self._flusher = threading.Thread(target=self._flush_loop, name="response-cache-flush",
+                                         daemon=True)
+        self._flusher.start()
+
+    def _after_fork(self):
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        if self._db is None:
+            return
+        # SQLite connections must not be shared across fork; the parent
+        # still owns the inherited one and its pending writes
+        self._pending = {}
+        self._db = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT,
+                                   check_same_thread=False)
+        self._start_flusher()
+
+    def _warm_from_db(self):
+        """Load the most recent unexpired entries from SQLite"""
+        cutoff = time.time() - self.ttl_seconds
+        rows = self._db.execute(
+            "SELECT key, payload, stored_at FROM response_cache "
+            "WHERE stored_at >= ? ORDER BY stored_at DESC LIMIT ?",
+            (cutoff, self.max_entries)
+        ).fetchall()
+        with self._lock:
+            # Oldest first so the newest end up most recently used
+            for key, payload, stored_at in reversed(rows):
+                self._insert(key, json.loads(payload), payload, stored_at)
+            # Entries dropped while warming should not be deleted from disk
+            self._pending.clear()
+
+    def _mark_dirty(self, key: str, record: Optional[Tuple[str, float]]):
+        if self._db is not None:
+            self._pending[key] = record
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                logger.warning(f"Response cache flush failed, retrying: {e}")
+
+    def flush(self):
+        """
+        Write pending changes to SQLite
+
+        Raises:
+            sqlite3.Error: If the write failed; the changes stay pending for the next flush
+        """
+        with self._flush_lock:
+            if self._db is None:
+                return
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            upserts = [(k, rec[0], rec[1]) for k, rec in pending.items() if rec is not None]
+            deletes = [(k,) for k, rec in pending.items() if rec is None]
+            try:
+                with self._db:
+                    if upserts:
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO response_cache (key, payload, stored_at) "
+                            "VALUES (?, ?, ?)", upserts
+                        )
+                    if deletes:
+                        self._db.executemany("DELETE FROM response_cache WHERE key = ?", deletes)
+                    self._db.execute("DELETE FROM response_cache WHERE stored_at < ?",
+                                     (time.time() - self.ttl_seconds,))
+            except sqlite3.Error:
+                with self._lock:
+                    # Changes made since the swap are newer and win
+                    for key, record in pending.items():
+                        self._pending.setdefault(key, record)
+                raise
+
+    def close(self):
+        """Flush pending writes and close the backing database"""
+        if self._db is None:
+            return
+        self._stop.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=self.flush_interval + 1)
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            logger.error(f"Response cache lost {len(self._pending)} unflushed changes: {e}")
+        with self._flush_lock:
+            self._db.close()
+            self._db = None
+
+
+def _after_fork(ref: weakref.ref):
+    cache = ref()
+    if cache is not None:
+        cache._after_fork()
@@ -0,0 +1,177 @@
+"""
+Semantic Cache - Matches paraphrased queries by embedding similarity
+"""
+from typing import Dict, List, Optional, Tuple
+import base64
+import threading
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Similarity index over the query embeddings of cached responses.
+    Vectors live in a preallocated, L2-normalised matrix so a lookup is a
+    single matrix-vector product over the occupied slots; removed slots are
+    recycled, keeping memory bounded by max_entries. Each query is indexed
+    with its category and the index version its answer was built from, and
+    lookups only match within both.
+    """
+
+    def __init__(self, dimension: int = 384, max_entries: int = 10000,
+                 threshold: float = 0.92):
+        """
+        Initialize semantic cache
+
+        Args:
+            dimension: Embedding dimension
+            max_entries: Maximum number of indexed queries
+            threshold: Minimum cosine similarity for a hit
+        """
+        self.dimension = dimension
+        self.max_entries = max_entries
+        self.threshold = threshold
+
+        self._vectors = np.zeros((max_entries, dimension), dtype=np.float32)
+        self._active = np.zeros(max_entries, dtype=bool)
+        self._category_codes = np.full(max_entries, -1, dtype=np.int16)
+        self._version_codes = np.full(max_entries, -1, dtype=np.int16)
+        self._keys: List[Optional[str]] = [None] * max_entries
+        self._slot_by_key: Dict[str, int] = {}
+        self._categories: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._high_water = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm < 1e-8:
+            # Placeholder embeddings (no model loaded) carry no meaning
+            return None
+        return vector / norm
+
+    @staticmethod
+    def _code(codes: Dict[str, int], value: Optional[str]) -> int:
+        if value is None:
+            return -1
+        if value not in codes:
+            codes[value] = len(codes)
+        return codes[value]
+
+    def add(self, key: str, embedding: np.ndarray, category: str = None,
+            index_version: str = None) -> bool:
+        """
+        Index a cached query
+
+        Args:
+            key: Response cache key
+            embedding: Query embedding
+            category: Query category
+            index_version: Version of the index the cached answer was built from
+
+        Returns:
+            True if the query was indexed
+        """
+        vector = self._normalize(embedding)
+        if vector is None or vector.shape[0] != self.dimension:
+            return False
+
+        with self._lock:
+            slot = self._slot_by_key.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                elif self._high_water < self.max_entries:
+                    slot = self._high_water
+                    self._high_water += 1
+                else:
+                    return False
+                self._slot_by_key[key] = slot
+                self._keys[slot] = key
+
+            self._vectors[slot] = vector
+            self._category_codes[slot] = self._code(self._categories, category)
+            self._version_codes[slot] = self._code(self._versions, index_version)
+            self._active[slot] = True
+        return True
+
+    def remove(self, key: str):
+        """Remove a query from the index"""
+        with self._lock:
+            slot = self._slot_by_key.pop(key, None)
+            if slot is None:
+                return
+            self._active[slot] = False
+            self._keys[slot] = None
+            self._free.append(slot)
+
+    def lookup(self, embedding: np.ndarray, category: str = None,
+               threshold: float = None, index_version: str = None) -> Optional[Tuple[str, float]]:
+        """
+        Find the most similar cached query
+
+        Args:
+            embedding: Query embedding
+            category: Only match queries of this category if given
+            threshold: Override the similarity threshold
+            index_version: Only match queries answered from this index version if given
+
+        Returns:
+            (cache_key, similarity) or None if nothing passes the threshold
+        """
+        vector = self._normalize(embedding)
+        if vector is None or vector.shape[0] != self.dimension:
+            return None
+        threshold = self.threshold if threshold is None else threshold
+
+        with self._lock:
+            n = self._high_water
+            if n == 0:
+                return None
+            mask = self._active[:n]
+            if category is not None:
+                code = self._categories.get(category)
+                if code is None:
+                    return None
+                mask = mask & (self._category_codes[:n] == code)
+            if index_version is not None:
+                code = self._versions.get(index_version)
+                if code is None:
+                    return None
+                mask = mask & (self._version_codes[:n] == code)
+            if not mask.any():
+                return None
+
+            similarities = self._vectors[:n] @ vector
+            similarities[~mask] = -np.inf
+            best = int(np.argmax(similarities))
+            score = float(similarities[best])
+            key = self._keys[best]
+
+        if score < threshold:
+            return None
+        return key, score
+
+    def clear(self):
+        """Remove all indexed queries"""
+        with self._lock:
+            self._active[:] = False
+            self._keys = [None] * self.max_entries
+            self._slot_by_key.clear()
+            self._free.clear()
+            self._high_water = 0
+
+    def __len__(self) -> int:
+        return len(self._slot_by_key)
+
+    @staticmethod
+    def encode_embedding(embedding: np.ndarray) -> str:
+        """Compactly encode an embedding (float16, base64) for cache payloads"""
+        return base64.b64encode(np.asarray(embedding, dtype=np.float16).tobytes()).decode('ascii')
+
+    @staticmethod
+    def decode_embedding(encoded: str) -> np.ndarray:
+        """Decode an embedding produced by encode_embedding"""
+        return np.frombuffer(base64.b64decode(encoded), dtype=np.float16).astype(np.float32)
@@ -0,0 +1,365 @@
+"""
+Session Backends - Where per-session conversation state lives
+"""
+from typing import Dict, List, Any, Optional, Tuple
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse, unquote
+from functools import partial
+import json
+import os
+import select
+import socket
+import threading
+import time
+import weakref
+
+from src.memory.short_term_memory import ConversationTurn
+from src.utils import SessionBackendException
+
+
+class SessionBackend(ABC):
+    """
+    Interface for session state shared by the API and the pipeline.
+    The in-process store suits a single worker; a shared backend keeps
+    conversations intact when requests land on different workers.
+    """
+
+    @abstractmethod
+    def add_turn(self, session_id: str, query: str, response: str, category: str = None):
+        """Record a conversation turn for a session"""
+
+    @abstractmethod
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get the history of a session (empty if unknown)"""
+
+    @abstractmethod
+    def get_metadata(self, session_id: str) -> Dict[str, Any]:
+        """Get the metadata of a session (empty if unknown)"""
+
+    @abstractmethod
+    def set_metadata(self, session_id: str, key: str, value: Any):
+        """Set a metadata field, creating the session if needed"""
+
+    @abstractmethod
+    def exists(self, session_id: str) -> bool:
+        """Check whether a session is live"""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Remove a session, returning True if it existed"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, Any]:
+        """Get backend statistics"""
+
+    def get_context(self, session_id: str, lookback: int = 5) -> str:
+        """
+        Get recent conversation context of a session
+
+        Args:
+            session_id: Session identifier
+            lookback: Number of turns to include
+
+        Returns:
+            Formatted context string
+        """
+        context = []
+        for turn in self.get_history(session_id)[-lookback:]:
+            context.append(f"User: {turn['query']}")
+            context.append(f"Assistant: {turn['response']}")
+        return "\n".join(context)
+
+    def close(self):
+        """Release background threads and connections"""
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.exists(session_id)
+
+
+class RespClient:
+    """
+    Minimal client for the Redis serialisation protocol (RESP2).
+    Holds one connection guarded by a lock; pipeline() writes a batch of
+    commands in one send and then reads the replies, so a batch costs a
+    single network round trip. A batch is never resent once writing it
+    has started, since the server may already have applied it.
+    """
+
+    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0,
+                 password: str = None, timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._reader = None
+        self._lock = threading.Lock()
+        # A forked worker must not share the parent's socket
+        os.register_at_fork(after_in_child=partial(_after_fork, weakref.ref(self)))
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._disconnect()
+
+    @staticmethod
+    def _encode(args: Tuple[Any, ...]) -> bytes:
+        parts = [b"*%d\r\n" % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+        return b"".join(parts)
+
+    def _connect(self):
+        self._sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._reader = self._sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            self._send_batch(setup)
+
+    def _read_reply(self) -> Any:
+        line = self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode('utf-8')
+        if prefix == b"-":
+            return SessionBackendException(payload.decode('utf-8'))
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b"*":
+            count = int(payload)
+            if count < 0:
+                return None
+            return [self._read_reply() for _ in range(count)]
+        raise SessionBackendException(f"Unexpected RESP reply: {line!r}")
+
+    def _send_batch(self, commands: List[Tuple[Any, ...]]) -> List[Any]:
+        self._sock.sendall(b"".join(self._encode(cmd) for cmd in commands))
+        replies = [self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, SessionBackendException):
+                raise reply
+        return replies
+
+    def _is_stale(self) -> bool:
+        # An idle connection has nothing to read; readable means the server closed it
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def pipeline(self, commands: List[Tuple[Any, ...]]) -> List[Any]:
+        """
+        Execute several commands in one round trip
+
+        A pooled connection the server has closed is replaced before the
+        batch is sent. Failures while sending or reading are not retried.
+
+        Args:
+            commands: List of command tuples, e.g. ("LRANGE", key, 0, -1)
+
+        Returns:
+            Replies in command order
+        """
+        with self._lock:
+            if self._sock is not None and self._is_stale():
+                self._disconnect()
+            try:
+                if self._sock is None:
+                    self._connect()
+                return self._send_batch(commands)
+            except (OSError, ConnectionError) as e:
+                self._disconnect()
+                raise SessionBackendException(
+                    f"Session backend {self.host}:{self.port} unavailable: {e}") from e
+
+    def execute(self, *args: Any) -> Any:
+        """Execute a single command"""
+        return self.pipeline([args])[0]
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def close(self):
+        """Close the connection"""
+        with self._lock:
+            self._disconnect()
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Session backend on any server speaking the Redis protocol.
+    Each session is a capped list of turns plus a metadata hash, both
+    expiring after the session TTL. Turns are stored as compact JSON
+    arrays and every turn write is a single pipelined round trip. A sorted
+    set of session ids scored by last activity gives the live session
+    count without scanning the keyspace.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", max_turns: int = 10,
+                 ttl_seconds: int = 3600, key_prefix: str = "legal:session:"):
+        """
+        Initialize Redis session backend
+
+        Args:
+            url: redis://[:password@]host[:port][/db]
+            max_turns: Turns kept per session
+            ttl_seconds: Idle time after which a session expires
+            key_prefix: Prefix for all keys written by the backend
+        """
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", ""):
+            raise ValueError(f"Unsupported session backend URL: {url}")
+        db = parsed.path.strip("/")
+        self.client = RespClient(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None
+        )
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.key_prefix = key_prefix
+        self._active_key = f"{key_prefix}active"
+
+    def _keys(self, session_id: str) -> Tuple[str, str]:
+        base = f"{self.key_prefix}{session_id}"
+        return f"{base}:turns", f"{base}:meta"
+
+    @staticmethod
+    def _encode_turn(query: str, response: str, category: Optional[str]) -> str:
+        return json.dumps([query, response, category, round(time.time(), 3)],
+                          separators=(',', ':'), ensure_ascii=False)
+
+    @staticmethod
+    def _decode_turn(payload: bytes) -> Dict[str, Any]:
+        query, response, category, created_at = json.loads(payload)
+        return ConversationTurn(query, response, category, created_at).to_dict()
+
+    def add_turn(self, session_id: str, query: str, response: str, category: str = None):
+        turns_key, meta_key = self._keys(session_id)
+        now = time.time()
+        self.client.pipeline([
+            ("RPUSH", turns_key, self._encode_turn(query, response, category)),
+            ("LTRIM", turns_key, -self.max_turns, -1),
+            ("HSET", meta_key, "last_active", now),
+            ("EXPIRE", turns_key, self.ttl_seconds),
+            ("EXPIRE", meta_key, self.ttl_seconds),
+            ("ZADD", self._active_key, now, session_id)
+        ])
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        turns_key, _ = self._keys(session_id)
+        return [self._decode_turn(item) for item in self.client.execute("LRANGE", turns_key, 0, -1)]
+
+    def get_session(self, session_id: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Read metadata and history of a session in one round trip
+
+        Returns:
+            (metadata, history)
+        """
+        turns_key, meta_key = self._keys(session_id)
+        raw_meta, raw_turns = self.client.pipeline([
+            ("HGETALL", meta_key),
+            ("LRANGE", turns_key, 0, -1)
+        ])
+        return self._decode_metadata(raw_meta), [self._decode_turn(item) for item in raw_turns]
+
+    @staticmethod
+    def _decode_metadata(raw: List[bytes]) -> Dict[str, Any]:
+        metadata = {}
+        for field, value in zip(raw[::2], raw[1::2]):
+            name = field.decode('utf-8')
+            if name == "last_active":
+                continue
+            metadata[name] = json.loads(value)
+        return metadata
+
+    def get_metadata(self, session_id: str) -> Dict[str, Any]:
+        _, meta_key = self._keys(session_id)
+        return self._decode_metadata(self.client.execute("HGETALL", meta_key))
+
+    def set_metadata(self, session_id: str, key: str, value: Any):
+        _, meta_key = self._keys(session_id)
+        now = time.time()
+        self.client.pipeline([
+            ("HSET", meta_key, key, json.dumps(value, separators=(',', ':'), default=str)),
+            ("HSET", meta_key, "last_active", now),
+            ("EXPIRE", meta_key, self.ttl_seconds),
+            ("ZADD", self._active_key, now, session_id)
+        ])
+
+    def exists(self, session_id: str) -> bool:
+        return bool(self.client.execute("EXISTS", *self._keys(session_id)))
+
+    def delete(self, session_id: str) -> bool:
+        deleted, _ = self.client.pipeline([
+            ("DEL", *self._keys(session_id)),
+            ("ZREM", self._active_key, session_id)
+        ])
+        return bool(deleted)
+
+    def stats(self) -> Dict[str, Any]:
+        # Sessions idle past the TTL have expired; drop them from the set first
+        _, active = self.client.pipeline([
+            ("ZREMRANGEBYSCORE", self._active_key, "-inf", time.time() - self.ttl_seconds),
+            ("ZCARD", self._active_key)
+        ])
+        return {
+            'backend': 'redis',
+            'host': f"{self.client.host}:{self.client.port}",
+            'active_sessions': active,
+            'max_turns': self.max_turns,
+            'ttl_seconds': self.ttl_seconds
+        }
+
+    def close(self):
+        self.client.close()
+
+
+def create_session_backend(url: str = None, max_turns: int = 10,
+                           ttl_seconds: int = 3600) -> SessionBackend:
+    """
+    Build the session backend for a URL
+
+    Args:
+        url: None for in-process sessions, or a redis:// URL for a shared backend
+        max_turns: Turns kept per session
+        ttl_seconds: Idle time after which a session expires
+
+    Returns:
+        SessionBackend instance
+    """
+    if not url:
+        from src.memory.session_store import SessionStore
+        return SessionStore(stm_max_size=max_turns, ttl_seconds=ttl_seconds)
+    return RedisSessionBackend(url, max_turns=max_turns, ttl_seconds=ttl_seconds)
+
+
+def _after_fork(ref: weakref.ref):
+    client = ref()
+    if client is not None:
+        client._after_fork()
@@ -0,0 +1,175 @@
+"""
+Session Store - Per-session short-term memory with bounded size
+"""
+from typing import Dict, List, Any, Optional
+from collections import OrderedDict
+import os
+import threading
+import weakref
+from functools import partial
+
+from src.memory.short_term_memory import ShortTermMemory
+from src.memory.session_backend import SessionBackend
+
+
+class SessionStore(SessionBackend):
+    """
+    In-process session backend mapping session ids to their own ShortTermMemory.
+    Sessions are kept in LRU order and the least recently used one is
+    evicted once max_sessions is reached; a background thread sweeps
+    sessions idle for longer than the TTL, counted from their last turn or,
+    for sessions without turns, from their creation.
+    """
+
+    def __init__(self, max_sessions: int = 10000, stm_max_size: int = 10,
+                 ttl_seconds: int = 3600, sweep_interval: float = 60.0):
+        """
+        Initialize session store
+
+        Args:
+            max_sessions: Maximum number of live sessions
+            stm_max_size: Turns kept per session
+            ttl_seconds: Idle time after which a session expires
+            sweep_interval: Seconds between expiry sweeps (0 disables the sweeper)
+        """
+        self.max_sessions = max_sessions
+        self.stm_max_size = stm_max_size
+        self.ttl_seconds = ttl_seconds
+        self.sweep_interval = sweep_interval
+
+        self._sessions: "OrderedDict[str, ShortTermMemory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+        self._stop = threading.Event()
+        self._sweeper = None
+        if sweep_interval:
+            self._start_sweeper()
+            # Threads do not survive fork(); a pre-forked worker restarts its own
+            os.register_at_fork(after_in_child=partial(_after_fork, weakref.ref(self)))
+
+    def _start_sweeper(self):
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="session-sweeper",
+                                         daemon=True)
+        self._sweeper.start()
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        if not self._stop.is_set():
+            self._start_sweeper()
+
+    def get(self, session_id: str, create: bool = True) -> Optional[ShortTermMemory]:
+        """
+        Get the memory of a session, marking it as recently used
+
+        Args:
+            session_id: Session identifier
+            create: Create the session if it does not exist
+
+        Returns:
+            ShortTermMemory or None if missing and create is False
+        """
+        with self._lock:
+            memory = self._sessions.get(session_id)
+            if memory is not None and memory.is_expired():
+                # Past its TTL but not swept yet; its turns must not come back
+                del self._sessions[session_id]
+                self.expirations += 1
+                memory = None
+            if memory is not None:
+                self._sessions.move_to_end(session_id)
+                return memory
+            if not create:
+                return None
+
+            memory = ShortTermMemory(max_size=self.stm_max_size, ttl_seconds=self.ttl_seconds)
+            self._sessions[session_id] = memory
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+            return memory
+
+    def add_turn(self, session_id: str, query: str, response: str, category: str = None):
+        """Record a conversation turn for a session"""
+        self.get(session_id).add_turn(query, response, category)
+
+    def get_history(self, session_id: str) -> List[Dict[str, Any]]:
+        """Get the history of a session (empty if unknown)"""
+        memory = self.get(session_id, create=False)
+        return memory.get_history() if memory else []
+
+    def get_context(self, session_id: str, lookback: int = 5) -> str:
+        """Get recent conversation context of a session"""
+        memory = self.get(session_id, create=False)
+        return memory.get_context(lookback) if memory else ""
+
+    def get_metadata(self, session_id: str) -> Dict[str, Any]:
+        """Get the metadata of a session (empty if unknown)"""
+        memory = self.get(session_id, create=False)
+        return memory.get_all_metadata() if memory else {}
+
+    def set_metadata(self, session_id: str, key: str, value: Any):
+        """Set a metadata field, creating the session if needed"""
+        self.get(session_id).set_metadata(key, value)
+
+    def exists(self, session_id: str) -> bool:
+        """Check whether a session is live"""
+        return session_id in self._sessions
+
+    def delete(self, session_id: str) -> bool:
+        """
+        Remove a session
+
+        Returns:
+            True if the session existed
+        """
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def sweep(self) -> int:
+        """
+        Remove expired sessions
+
+        Returns:
+            Number of sessions removed
+        """
+        with self._lock:
+            expired = [sid for sid, memory in self._sessions.items() if memory.is_expired()]
+            for session_id in expired:
+                del self._sessions[session_id]
+            self.expirations += len(expired)
+        return len(expired)
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    def close(self):
+        """Stop the background sweeper"""
+        self._stop.set()
+        if self._sweeper is not None and self._sweeper is not threading.current_thread():
+            self._sweeper.join(timeout=1)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get session statistics"""
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'active_sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+
+def _after_fork(ref: weakref.ref):
+    store = ref()
+    if store is not None:
+        store._after_fork()
@@ -1,18 +1,31 @@
 """
 Short-Term Memory - Session-based conversation context
 """
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional, Union
+from collections import deque
+from datetime import datetime
+from itertools import islice
 import json
+import threading
+import time
 
 class ConversationTurn:
     """Represents a single turn in conversation"""
     
-    def __init__(self, query: str, response: str, category: str = None, timestamp: datetime = None):
+    __slots__ = ('query', 'response', 'category', 'created_at')
+    
+    def __init__(self, query: str, response: str, category: str = None,
+                 timestamp: Union[datetime, float, None] = None):
         self.query = query
         self.response = response
         self.category = category
-        self.timestamp = timestamp or datetime.now()
+        if isinstance(timestamp, datetime):
+            timestamp = timestamp.timestamp()
+        self.created_at = time.time() if timestamp is None else float(timestamp)  # epoch seconds
+    
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.created_at)
     
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -26,7 +39,8 @@ class ConversationTurn:
 class ShortTermMemory:
     """
     Short-Term Memory (STM) for session context.
-    Maintains conversation history with TTL expiration.
+    Maintains conversation history with TTL expiration. Safe to share
+    between request threads; readers get copies taken under a lock.
     """
     
     def __init__(self, max_size: int = 10, ttl_seconds: int = 3600):
@@ -39,8 +53,10 @@ class ShortTermMemory:
         """
         self.max_size = max_size
         self.ttl_seconds = ttl_seconds
-        self.history: List[ConversationTurn] = []
+        self.history: deque = deque(maxlen=max_size)  # oldest turns fall off the left
         self.session_metadata: Dict[str, Any] = {}
+        self.created_at = time.time()  # epoch seconds; idle time of a session without turns
+        self._lock = threading.Lock()
     
     def add_turn(self, query: str, response: str, category: str = None):
         """
@@ -52,11 +68,8 @@ class ShortTermMemory:
             category: Query category
         """
         turn = ConversationTurn(query, response, category)
-        self.history.append(turn)
-        
-        # Maintain max size
-        if len(self.history) > self.max_size:
-            self.history.pop(0)
+        with self._lock:
+            self.history.append(turn)
     
     def get_context(self, lookback: int = 5) -> str:
         """
@@ -68,7 +81,8 @@ class ShortTermMemory:
         Returns:
             Formatted context string
         """
-        recent_turns = self.history[-lookback:] if len(self.history) > lookback else self.history
+        with self._lock:
+            recent_turns = list(islice(self.history, max(len(self.history) - lookback, 0), None))
         
         context = []
         for turn in recent_turns:
@@ -79,27 +93,32 @@ class ShortTermMemory:
     
     def get_history(self) -> List[Dict[str, Any]]:
         """Get full conversation history"""
-        return [turn.to_dict() for turn in self.history]
+        with self._lock:
+            turns = list(self.history)
+        return [turn.to_dict() for turn in turns]
     
     def clear(self):
         """Clear all history"""
-        self.history.clear()
-        self.session_metadata.clear()
+        with self._lock:
+            self.history.clear()
+            self.session_metadata.clear()
     
     def set_metadata(self, key: str, value: Any):
         """Set session metadata"""
-        self.session_metadata[key] = value
+        with self._lock:
+            self.session_metadata[key] = value
+    
+    def get_all_metadata(self) -> Dict[str, Any]:
+        """Get a copy of all session metadata"""
+        with self._lock:
+            return dict(self.session_metadata)
     
     def get_metadata(self, key: str, default: Any = None) -> Any:
         """Get session metadata"""
         return self.session_metadata.get(key, default)
     
     def is_expired(self) -> bool:
-        """Check if session has expired"""
-        if not self.history:
-            return False
-        
-        last_turn_time = self.history[-1].timestamp
-        expiration_time = last_turn_time + timedelta(seconds=self.ttl_seconds)
-        
-        return datetime.now() > expiration_time
+        """Check if session has been idle past its TTL since its last turn or creation"""
+        with self._lock:
+            last_active_at = self.history[-1].created_at if self.history else self.created_at
+        return time.time() > last_active_at + self.ttl_seconds
@@ -5,10 +5,15 @@ Query Processing Module - Initialization
 from .validator import QueryValidator
 from .categorizer import QueryCategorizer, QueryCategory
 from .enricher import QueryEnricher
+from .keyword_engine import KeywordEngine, QueryAnalysis
+from .centroid_categorizer import CentroidCategorizer
 
 __all__ = [
     'QueryValidator',
     'QueryCategorizer',
     'QueryCategory',
-    'QueryEnricher'
+    'CentroidCategorizer',
+    'QueryEnricher',
+    'KeywordEngine',
+    'QueryAnalysis'
 ]
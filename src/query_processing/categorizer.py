@@ -2,7 +2,8 @@
 Query Categorizer - Classifies queries into legal categories
 """
 from enum import Enum
-from typing import Tuple
+from typing import Tuple, Dict, Iterable, List
+from src.query_processing.keyword_engine import KeywordEngine, QueryAnalysis
 
 class QueryCategory(Enum):
     """Legal query categories"""
@@ -39,29 +40,87 @@ class QueryCategorizer:
             QueryCategory.LEGAL_ADVICE: {
                 'should', 'can i', 'am i', 'what should', 'how to',
                 'advice', 'help', 'do', 'would', 'could', 'might',
-                'liable', 'responsible', 'what if'
+                'liable', 'responsible', 'what if', 'legal'
             }
         }
+        # Keywords match whole words, so inflected and derived forms count
+        # as a match of their base keyword
+        self.keyword_forms = {
+            'compare': ['compared', 'compares', 'comparing'],
+            'difference': ['differences'],
+            'contrast': ['contrasts', 'contrasted', 'contrasting'],
+            'similar': ['similarity', 'similarities', 'similarly'],
+            'distinguish': ['distinguished', 'distinguishes', 'distinguishing'],
+            'comparison': ['comparisons'],
+            'summarize': ['summarizes', 'summarized', 'summarizing', 'summarise',
+                          'summarises', 'summarised', 'summarising'],
+            'summary': ['summaries'],
+            'explain': ['explains', 'explained', 'explaining'],
+            'describe': ['describes', 'described', 'describing'],
+            'details': ['detail', 'detailed'],
+            'penalty': ['penalties'],
+            'punishment': ['punishments'],
+            'fine': ['fines', 'fined'],
+            'section': ['sections'],
+            'article': ['articles'],
+            'provision': ['provisions'],
+            'requirement': ['requirements'],
+            'law': ['laws', 'lawful', 'unlawful', 'lawfully', 'unlawfully'],
+            'act': ['acts', 'enacted', 'enactment'],
+            'statute': ['statutes', 'statutory'],
+            'list': ['lists', 'listed'],
+            'define': ['defines', 'defined'],
+            'precedent': ['precedents'],
+            'find': ['finds', 'finding'],
+            'search': ['searches', 'searching'],
+            'advice': ['advise', 'advised'],
+            'help': ['helps'],
+            'liable': ['liability', 'liabilities'],
+            'responsible': ['responsibility'],
+            'legal': ['illegal', 'legally', 'illegally', 'legality', 'illegality']
+        }
+        self._base_of = {form: base for base, forms in self.keyword_forms.items() for form in forms}
+        self._engine = None
+    
+    def lexicons(self) -> Dict[str, Iterable[str]]:
+        """Keyword lexicons used by the categorizer"""
+        return {f"category:{category.value}": self._with_forms(keywords)
+                for category, keywords in self.category_keywords.items()}
+    
+    def _with_forms(self, keywords: Iterable[str]) -> List[str]:
+        expanded = []
+        for keyword in keywords:
+            expanded.append(keyword)
+            expanded.extend(self.keyword_forms.get(keyword, ()))
+        return expanded
     
-    def categorize(self, query: str) -> Tuple[QueryCategory, float]:
+    def _analyze(self, query: str, analysis: QueryAnalysis = None) -> QueryAnalysis:
+        if analysis is not None:
+            return analysis
+        if self._engine is None:
+            self._engine = KeywordEngine(self.lexicons())
+        return self._engine.analyze(query)
+    
+    def _score(self, category: QueryCategory, analysis: QueryAnalysis) -> float:
+        # Distinct base keywords matched, normalised by lexicon size
+        keywords = self.category_keywords[category]
+        matched = {self._base_of.get(keyword, keyword)
+                   for keyword in analysis.keywords(f"category:{category.value}")}
+        return len(matched) / len(keywords) if keywords else 0
+    
+    def categorize(self, query: str, analysis: QueryAnalysis = None) -> Tuple[QueryCategory, float]:
         """
         Categorize query into one of the predefined categories
         
         Args:
             query: User query string
+            analysis: Optional precomputed keyword analysis of the query
             
         Returns:
             Tuple of (QueryCategory, confidence_score)
         """
-        query_lower = query.lower()
-        scores = {}
-        
-        for category, keywords in self.category_keywords.items():
-            # Count keyword matches
-            matches = sum(1 for keyword in keywords if keyword in query_lower)
-            # Normalize by keywords count
-            score = matches / len(keywords) if keywords else 0
-            scores[category] = score
+        analysis = self._analyze(query, analysis)
+        scores = {category: self._score(category, analysis) for category in self.category_keywords}
         
         # Get category with highest score
         best_category = max(scores, key=scores.get)
@@ -69,23 +128,24 @@ class QueryCategorizer:
         
         return best_category, confidence
     
-    def multi_category_detect(self, query: str, threshold: float = 0.2) -> list:
+    def multi_category_detect(self, query: str, threshold: float = 0.2,
+                              analysis: QueryAnalysis = None) -> list:
         """
         Detect multiple potential categories for a query
         
         Args:
             query: User query string
             threshold: Minimum confidence threshold
+            analysis: Optional precomputed keyword analysis of the query
             
         Returns:
             List of (QueryCategory, confidence) tuples
         """
-        query_lower = query.lower()
+        analysis = self._analyze(query, analysis)
         results = []
         
-        for category, keywords in self.category_keywords.items():
-            matches = sum(1 for keyword in keywords if keyword in query_lower)
-            score = matches / len(keywords) if keywords else 0
+        for category in self.category_keywords:
+            score = self._score(category, analysis)
             
             if score >= threshold:
                 results.append((category, score))
@@ -0,0 +1,199 @@
+"""
+Centroid Categorizer - Classifies queries by their embedding
+"""
+from typing import Dict, List, Optional, Tuple, Iterable
+import threading
+import numpy as np
+
+from src.query_processing.categorizer import QueryCategorizer, QueryCategory
+from src.query_processing.keyword_engine import QueryAnalysis
+
+# Labelled example queries; each category's centroid is the mean of their embeddings
+CATEGORY_EXAMPLES = {
+    QueryCategory.CASE_COMPARISON: [
+        "Compare the judgments in these two cases",
+        "What is the difference between murder and culpable homicide?",
+        "How does Section 420 differ from Section 406 of IPC?",
+        "Contrast the majority and dissenting opinions",
+        "Distinguish theft from criminal breach of trust",
+        "Is a lease different from a licence under Indian law?"
+    ],
+    QueryCategory.CASE_SUMMARIZATION: [
+        "Summarize the judgment in Kesavananda Bharati v. State of Kerala",
+        "Give me an overview of this ruling",
+        "Explain the facts and holding of the case",
+        "What was decided in Maneka Gandhi v. Union of India?",
+        "Describe the background of this landmark case",
+        "Brief summary of the Supreme Court decision"
+    ],
+    QueryCategory.LEGAL_DATA_RETRIEVAL: [
+        "What is the punishment under Section 302 IPC?",
+        "What does Article 21 of the Constitution say?",
+        "List the requirements for a valid contract",
+        "Define cognizable offence",
+        "What is the penalty for cheating under Section 420?",
+        "Which provision covers anticipatory bail?"
+    ],
+    QueryCategory.SIMILAR_CASE_FINDING: [
+        "Find cases similar to this one",
+        "Are there precedents on wrongful termination?",
+        "Show me related judgments on dowry deaths",
+        "Search for analogous cases on medical negligence",
+        "Which past decisions dealt with the same issue?",
+        "Look for comparable rulings on defamation"
+    ],
+    QueryCategory.LEGAL_ADVICE: [
+        "Should I file an FIR against my landlord?",
+        "Can I be held liable if my tenant damages the property?",
+        "What should I do if my employer has not paid my wages?",
+        "Am I entitled to compensation after an accident?",
+        "How to get bail for a family member?",
+        "What if I break the contract early?"
+    ]
+}
+
+
+class CentroidCategorizer:
+    """
+    Nearest-centroid classifier over query embeddings.
+    Category centroids are built once from labelled examples, so once a
+    query has been embedded its category is a single matrix-vector
+    product. Falls back to keyword categorization when no embedding
+    model is loaded.
+    """
+
+    def __init__(self, embedder=None,
+                 examples: Dict[QueryCategory, List[str]] = None,
+                 fallback: QueryCategorizer = None):
+        """
+        Initialize centroid categorizer
+
+        Args:
+            embedder: DocumentEmbedder used to embed the examples (and queries if needed)
+            examples: Labelled example queries per category
+            fallback: Keyword categorizer used when embeddings are unavailable
+        """
+        self.embedder = embedder
+        self.examples = examples or CATEGORY_EXAMPLES
+        self.fallback = fallback or QueryCategorizer()
+        self.categories: List[QueryCategory] = []
+        self.centroids: Optional[np.ndarray] = None
+        self._fit_attempted = False
+        self._lock = threading.Lock()
+
+    @property
+    def uses_embeddings(self) -> bool:
+        """Whether queries should be embedded before categorizing"""
+        return self.centroids is not None or (
+            self.embedder is not None and self.embedder.model is not None)
+
+    def lexicons(self) -> Dict[str, Iterable[str]]:
+        """Keyword lexicons of the fallback categorizer"""
+        return self.fallback.lexicons()
+
+    def fit(self, embeddings: np.ndarray = None, labels: List[QueryCategory] = None) -> bool:
+        """
+        Build category centroids
+
+        Args:
+            embeddings: Optional precomputed example embeddings (one row per example)
+            labels: Category of each row, required with embeddings
+
+        Returns:
+            True if every category has a usable centroid
+        """
+        if embeddings is None:
+            if self.embedder is None or self.embedder.model is None:
+                return False
+            labels = [category for category, texts in self.examples.items() for _ in texts]
+            texts = [text for category_texts in self.examples.values() for text in category_texts]
+            embeddings = self.embedder.embed_texts(texts)
+
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix = matrix / np.maximum(norms, 1e-8)
+        label_array = np.array([category.value for category in labels])
+
+        categories, centroids = [], []
+        for category in dict.fromkeys(labels):
+            centroid = matrix[label_array == category.value].mean(axis=0)
+            norm = float(np.linalg.norm(centroid))
+            if norm < 1e-8:
+                # Placeholder (all-zero) embeddings cannot separate categories
+                return False
+            categories.append(category)
+            centroids.append(centroid / norm)
+
+        self.categories = categories
+        self.centroids = np.vstack(centroids)
+        return True
+
+    def _ensure_fitted(self) -> bool:
+        if self.centroids is None and not self._fit_attempted:
+            with self._lock:
+                if self.centroids is None and not self._fit_attempted:
+                    self.fit()
+                    self._fit_attempted = True
+        return self.centroids is not None
+
+    def categorize(self, query: str, embedding: np.ndarray = None,
+                   analysis: QueryAnalysis = None) -> Tuple[QueryCategory, float]:
+        """
+        Categorize a query
+
+        Args:
+            query: User query string
+            embedding: Query embedding, reused if already computed
+            analysis: Optional keyword analysis for the fallback path
+
+        Returns:
+            Tuple of (QueryCategory, cosine similarity to the winning centroid)
+        """
+        if not self._ensure_fitted():
+            return self.fallback.categorize(query, analysis)
+        if embedding is None:
+            embedding = self.embedder.embed_text(query)
+
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        if norm < 1e-8 or vector.shape[0] != self.centroids.shape[1]:
+            return self.fallback.categorize(query, analysis)
+
+        similarities = self.centroids @ (vector / norm)
+        best = int(np.argmax(similarities))
+        return self.categories[best], max(float(similarities[best]), 0.0)
+
+    def categorize_batch(self, queries: List[str], embeddings: np.ndarray = None,
+                         analyses: List[QueryAnalysis] = None) -> List[Tuple[QueryCategory, float]]:
+        """
+        Categorize several queries with one matrix product
+
+        Args:
+            queries: User query strings
+            embeddings: Optional query embeddings (one row per query)
+            analyses: Optional keyword analyses for the fallback path
+
+        Returns:
+            List of (QueryCategory, confidence) tuples
+        """
+        analyses = analyses or [None] * len(queries)
+        if not queries:
+            return []
+        if not self._ensure_fitted():
+            return [self.fallback.categorize(q, a) for q, a in zip(queries, analyses)]
+        if embeddings is None:
+            embeddings = self.embedder.embed_texts(queries)
+
+        matrix = np.asarray(embeddings, dtype=np.float32).reshape(len(queries), -1)
+        norms = np.linalg.norm(matrix, axis=1)
+        similarities = (matrix / np.maximum(norms, 1e-8)[:, None]) @ self.centroids.T
+        best = np.argmax(similarities, axis=1)
+
+        results = []
+        for row, (query, analysis) in enumerate(zip(queries, analyses)):
+            if norms[row] < 1e-8:
+                results.append(self.fallback.categorize(query, analysis))
+            else:
+                results.append((self.categories[best[row]],
+                                max(float(similarities[row, best[row]]), 0.0)))
+        return results
@@ -1,76 +1,107 @@
 """
 Query Enricher - Enriches queries with context and metadata
 """
-from typing import Dict, Any
+from typing import Dict, Any, Iterable
+import re
+from src.query_processing.keyword_engine import KeywordEngine, QueryAnalysis
+
+# Section/article references (e.g., "Section 420", "Article 21")
+SECTION_PATTERN = re.compile(r'(?:section|article|sec|art)\s*\.?\s*(\d+[a-z]*)', re.IGNORECASE)
+# Case citations (e.g., "John v. Smith")
+CASE_PATTERN = re.compile(r'([A-Z][a-z]+)\s+(?:v\.|versus)\s+([A-Z][a-z]+)')
 
 class QueryEnricher:
     """Enriches queries with additional context and metadata"""
     
     def __init__(self):
-        self.jurisdiction_keywords = {
-            'indian', 'india', 'us', 'uk', 'indian penal', 'ipc',
-            'united states', 'united kingdom', 'england', 'australia',
-            'canada', 'common law', 'civil law'
+        # Jurisdiction keyword -> jurisdiction (None: recognised but not specific)
+        self.jurisdiction_map = {
+            'indian': 'India', 'india': 'India', 'indian penal': 'India', 'ipc': 'India',
+            'us': 'United States', 'united states': 'United States',
+            'uk': 'United Kingdom', 'united kingdom': 'United Kingdom', 'england': 'United Kingdom',
+            'australia': 'Australia', 'canada': 'Canada',
+            'common law': None, 'civil law': None
         }
+        self.jurisdiction_keywords = set(self.jurisdiction_map)
         
+        # Keywords match whole words, so inflected and derived forms are listed too
         self.legal_domain_keywords = {
-            'criminal': ['crime', 'criminal', 'penal', 'conviction', 'sentence'],
-            'civil': ['civil', 'tort', 'contract', 'damages', 'liability'],
-            'constitutional': ['constitutional', 'fundamental', 'rights', 'amendment'],
-            'corporate': ['corporate', 'company', 'business', 'shareholder', 'director'],
-            'intellectual_property': ['patent', 'trademark', 'copyright', 'ip'],
-            'family': ['marriage', 'divorce', 'custody', 'inheritance', 'succession'],
-            'labor': ['employment', 'labor', 'wage', 'discrimination', 'strike']
+            'criminal': ['crime', 'crimes', 'criminal', 'criminals', 'criminally', 'penal',
+                         'conviction', 'convictions', 'convicted', 'sentence', 'sentences',
+                         'sentenced', 'sentencing'],
+            'civil': ['civil', 'tort', 'torts', 'tortious', 'contract', 'contracts', 'contractual',
+                      'damages', 'liability', 'liabilities'],
+            'constitutional': ['constitutional', 'unconstitutional', 'constitutionally',
+                               'fundamental', 'rights', 'amendment', 'amendments'],
+            'corporate': ['corporate', 'company', 'companies', 'business', 'businesses',
+                          'shareholder', 'shareholders', 'shareholding', 'director', 'directors',
+                          'directorship'],
+            'intellectual_property': ['patent', 'patents', 'patented', 'trademark', 'trademarks',
+                                      'copyright', 'copyrights', 'copyrighted', 'ip'],
+            'family': ['marriage', 'marriages', 'divorce', 'divorced', 'divorces', 'custody',
+                       'inheritance', 'inheritances', 'succession'],
+            'labor': ['employment', 'unemployment', 'labor', 'labour', 'wage', 'wages',
+                      'discrimination', 'discriminations', 'strike', 'strikes']
         }
+        
+        self.legal_terms = [
+            'plaintiff', 'defendant', 'appellant', 'respondent', 'petitioner',
+            'liability', 'damages', 'injunction', 'subpoena', 'deposition',
+            'discovery', 'summary judgment', 'negligence', 'breach', 'contract',
+            'tort', 'defamation', 'slander', 'libel', 'fraud', 'misrepresentation',
+            'conviction', 'acquittal', 'appeal', 'rehearing', 'writ'
+        ]
+        self._engine = None
+    
+    def lexicons(self) -> Dict[str, Iterable[str]]:
+        """Keyword lexicons used by the enricher"""
+        lexicons = {'jurisdiction': self.jurisdiction_map, 'key_terms': self.legal_terms}
+        for domain, keywords in self.legal_domain_keywords.items():
+            lexicons[f"domain:{domain}"] = keywords
+        return lexicons
     
-    def enrich(self, query: str, session_context: Dict[str, Any] = None) -> Dict[str, Any]:
+    def enrich(self, query: str, session_context: Dict[str, Any] = None,
+               analysis: QueryAnalysis = None) -> Dict[str, Any]:
         """
         Enrich query with context and metadata
         
         Args:
             query: User query string
             session_context: Optional session context dictionary
+            analysis: Optional precomputed keyword analysis of the query
             
         Returns:
             Dictionary with enriched query information
         """
+        if analysis is None:
+            if self._engine is None:
+                self._engine = KeywordEngine(self.lexicons())
+            analysis = self._engine.analyze(query)
+        
         enriched = {
             'original_query': query,
             'query_length': len(query),
-            'jurisdiction': self._detect_jurisdiction(query),
-            'legal_domain': self._detect_legal_domain(query),
+            'jurisdiction': self._detect_jurisdiction(analysis),
+            'legal_domain': self._detect_legal_domain(analysis),
             'entities': self._extract_entities(query),
-            'key_terms': self._extract_key_terms(query),
+            'key_terms': self._extract_key_terms(analysis),
             'session_context': session_context or {}
         }
         
         return enriched
     
-    def _detect_jurisdiction(self, query: str) -> str:
-        """Detect jurisdiction from query"""
-        query_lower = query.lower()
-        for keyword in self.jurisdiction_keywords:
-            if keyword in query_lower:
-                if 'indian' in keyword or 'india' in keyword or 'ipc' in keyword:
-                    return 'India'
-                elif 'us' in keyword or 'united states' in keyword:
-                    return 'United States'
-                elif 'uk' in keyword or 'united kingdom' in keyword or 'england' in keyword:
-                    return 'United Kingdom'
-                elif 'australia' in keyword:
-                    return 'Australia'
-                elif 'canada' in keyword:
-                    return 'Canada'
+    def _detect_jurisdiction(self, analysis: QueryAnalysis) -> str:
+        """Detect jurisdiction from query (first specific mention wins)"""
+        for keyword in analysis.keywords('jurisdiction'):
+            jurisdiction = self.jurisdiction_map.get(keyword)
+            if jurisdiction:
+                return jurisdiction
         return 'General'
     
-    def _detect_legal_domain(self, query: str) -> list:
+    def _detect_legal_domain(self, analysis: QueryAnalysis) -> list:
         """Detect legal domains from query"""
-        query_lower = query.lower()
-        domains = []
-        
-        for domain, keywords in self.legal_domain_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                domains.append(domain)
+        domains = [domain for domain in self.legal_domain_keywords
+                   if analysis.has(f"domain:{domain}")]
         
         return domains if domains else ['general_legal']
     
@@ -86,35 +117,12 @@ class QueryEnricher:
             'organizations': []
         }
         
-        # Simple pattern matching for acts/sections
-        import re
-        
-        # Match section/article references (e.g., "Section 420", "Article 21")
-        section_pattern = r'(?:section|article|sec|art)\s*\.?\s*(\d+[a-z]*)'
-        entities['acts'] = re.findall(section_pattern, query, re.IGNORECASE)
-        
-        # Match case citations (e.g., "John v. Smith")
-        case_pattern = r'([A-Z][a-z]+)\s+(?:v\.|versus)\s+([A-Z][a-z]+)'
-        matches = re.findall(case_pattern, query)
-        entities['cases'] = matches
+        # Simple pattern matching for acts/sections and case citations
+        entities['acts'] = SECTION_PATTERN.findall(query)
+        entities['cases'] = CASE_PATTERN.findall(query)
         
         return entities
     
-    def _extract_key_terms(self, query: str) -> list:
+    def _extract_key_terms(self, analysis: QueryAnalysis) -> list:
         """Extract key legal terms from query"""
-        query_lower = query.lower()
-        
-        legal_terms = [
-            'plaintiff', 'defendant', 'appellant', 'respondent', 'petitioner',
-            'liability', 'damages', 'injunction', 'subpoena', 'deposition',
-            'discovery', 'summary judgment', 'negligence', 'breach', 'contract',
-            'tort', 'defamation', 'slander', 'libel', 'fraud', 'misrepresentation',
-            'conviction', 'acquittal', 'appeal', 'rehearing', 'writ'
-        ]
-        
-        found_terms = []
-        for term in legal_terms:
-            if term in query_lower:
-                found_terms.append(term)
-        
-        return found_terms
+        return list(analysis.keywords('key_terms'))
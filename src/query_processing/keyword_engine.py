@@ -0,0 +1,166 @@
+"""
+Keyword Engine - Single-pass multi-lexicon keyword matching
+"""
+from typing import Dict, List, Iterable, Tuple
+import re
+import threading
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split lower-cased text into word tokens"""
+    return _TOKEN.findall(text.lower())
+
+
+class QueryAnalysis:
+    """Keyword matches of one query, grouped by lexicon"""
+
+    __slots__ = ('query', 'query_lower', 'word_count', 'matches')
+
+    def __init__(self, query: str, word_count: int, matches: Dict[str, List[str]]):
+        self.query = query
+        self.query_lower = query.lower()
+        self.word_count = word_count
+        self.matches = matches
+
+    def keywords(self, lexicon: str) -> List[str]:
+        """Distinct keywords of a lexicon found in the query, in order of appearance"""
+        return self.matches.get(lexicon, [])
+
+    def count(self, lexicon: str) -> int:
+        """Number of distinct keywords of a lexicon found in the query"""
+        return len(self.matches.get(lexicon, ()))
+
+    def has(self, lexicon: str) -> bool:
+        """Whether any keyword of a lexicon was found"""
+        return lexicon in self.matches
+
+
+class KeywordEngine:
+    """
+    Aho-Corasick automaton over word tokens for several named lexicons.
+    Keywords (single words or phrases) only match on whole words, and a
+    query is scanned once however many lexicons and keywords there are.
+    """
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]] = None):
+        """
+        Initialize keyword engine
+
+        Args:
+            lexicons: Mapping of lexicon name to keywords
+        """
+        self._lexicons: Dict[str, List[str]] = {}
+        # (goto, fail, output, patterns, pattern lexicons), replaced as a whole
+        # so queries on other threads never see a half-built automaton
+        self._automaton = None
+        self._build_lock = threading.Lock()
+
+        for name, keywords in (lexicons or {}).items():
+            self.add_lexicon(name, keywords)
+
+    def add_lexicon(self, name: str, keywords: Iterable[str]):
+        """Register (or replace) a lexicon; the automaton is rebuilt on next use"""
+        with self._build_lock:
+            self._lexicons[name] = list(keywords)
+            self._automaton = None
+
+    def build(self):
+        """Compile all lexicons into the automaton"""
+        with self._build_lock:
+            self._automaton = self._compile()
+
+    def _compile(self) -> tuple:
+        pattern_ids: Dict[Tuple[str, ...], int] = {}
+        lexicons_of: List[List[str]] = []
+        goto: List[Dict[str, int]] = [{}]
+        fail: List[int] = [0]
+        output: List[List[int]] = [[]]
+        patterns: List[str] = []
+
+        for name, keywords in self._lexicons.items():
+            for keyword in keywords:
+                tokens = tuple(tokenize(keyword))
+                if not tokens:
+                    continue
+                pid = pattern_ids.get(tokens)
+                if pid is None:
+                    pid = pattern_ids[tokens] = len(patterns)
+                    patterns.append(keyword.lower())
+                    lexicons_of.append([])
+                    self._insert(goto, fail, output, tokens, pid)
+                if name not in lexicons_of[pid]:
+                    lexicons_of[pid].append(name)
+
+        self._link(goto, fail, output)
+        return goto, fail, output, patterns, [tuple(names) for names in lexicons_of]
+
+    @staticmethod
+    def _insert(goto: List[Dict[str, int]], fail: List[int], output: List[List[int]],
+                tokens: Tuple[str, ...], pid: int):
+        state = 0
+        for token in tokens:
+            nxt = goto[state].get(token)
+            if nxt is None:
+                nxt = len(goto)
+                goto[state][token] = nxt
+                goto.append({})
+                fail.append(0)
+                output.append([])
+            state = nxt
+        output[state].append(pid)
+
+    @staticmethod
+    def _link(goto: List[Dict[str, int]], fail: List[int], output: List[List[int]]):
+        # Breadth-first: a node's fail link is the longest proper suffix in the trie
+        queue = list(goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for token, nxt in goto[state].items():
+                queue.append(nxt)
+                fallback = fail[state]
+                while fallback and token not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(token, 0)
+                fail[nxt] = target if target != nxt else 0
+                output[nxt].extend(output[fail[nxt]])
+
+    def analyze(self, query: str) -> QueryAnalysis:
+        """
+        Match every lexicon against a query in one pass
+
+        Args:
+            query: User query string
+
+        Returns:
+            QueryAnalysis with distinct matches per lexicon
+        """
+        automaton = self._automaton
+        if automaton is None:
+            with self._build_lock:
+                if self._automaton is None:
+                    self._automaton = self._compile()
+                automaton = self._automaton
+
+        goto, fail, output, patterns, pattern_lexicons = automaton
+        tokens = tokenize(query)
+        seen = set()
+        matches: Dict[str, List[str]] = {}
+        state = 0
+
+        for token in tokens:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for pid in output[state]:
+                if pid in seen:
+                    continue
+                seen.add(pid)
+                keyword = patterns[pid]
+                for name in pattern_lexicons[pid]:
+                    matches.setdefault(name, []).append(keyword)
+
+        return QueryAnalysis(query, len(tokens), matches)
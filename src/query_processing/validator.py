@@ -1,6 +1,8 @@
 """
 Query Validator - Validates if queries are legal domain relevant
 """
+from typing import Dict, Iterable
+from src.query_processing.keyword_engine import KeywordEngine, QueryAnalysis
 
 class QueryValidator:
     """Validates user queries for legal domain relevance"""
@@ -13,15 +15,39 @@ class QueryValidator:
             'clause', 'liability', 'damages', 'defendant', 'plaintiff', 'appeal', 'verdict',
             'subpoena', 'testimony', 'evidence', 'precedent', 'jurisdiction',
             'regulation', 'compliance', 'rights', 'duty', 'obligation', 'breach',
-            'section', 'sections', 'ipc'
+            'section', 'sections', 'ipc',
+            # Keywords match whole words, so inflected and derived forms are listed too
+            'cases', 'laws', 'lawful', 'lawfully', 'unlawful', 'unlawfully', 'lawsuit',
+            'lawsuits', 'acts', 'enacted', 'enactment', 'statutes', 'statutory',
+            'judgments', 'judgement', 'judgements', 'rulings', 'legally', 'legality',
+            'illegal', 'illegally', 'illegality', 'paralegal', 'legislation', 'courts',
+            'courtroom', 'attorneys', 'lawyers', 'contracts', 'contractual', 'agreements',
+            'torts', 'tortious', 'extortion', 'torture', 'crimes', 'criminals', 'criminally',
+            'penal', 'clauses', 'liabilities', 'liable', 'defendants', 'plaintiffs',
+            'appeals', 'appealed', 'verdicts', 'subpoenas', 'testimonies', 'evidences',
+            'precedents', 'jurisdictions', 'regulations', 'regulatory', 'copyrights',
+            'duties', 'obligations', 'breaches', 'breached'
         }
-        
-    def is_valid(self, query: str) -> bool:
+        self._engine = None
+    
+    def lexicons(self) -> Dict[str, Iterable[str]]:
+        """Keyword lexicons used by the validator"""
+        return {'legal': self.legal_keywords}
+    
+    def _analyze(self, query: str, analysis: QueryAnalysis = None) -> QueryAnalysis:
+        if analysis is not None:
+            return analysis
+        if self._engine is None:
+            self._engine = KeywordEngine(self.lexicons())
+        return self._engine.analyze(query)
+    
+    def is_valid(self, query: str, analysis: QueryAnalysis = None) -> bool:
         """
         Check if query is legal domain relevant
         
         Args:
             query: User query string
+            analysis: Optional precomputed keyword analysis of the query
             
         Returns:
             bool: True if valid legal query, False otherwise
@@ -29,18 +55,18 @@ class QueryValidator:
         if not query or len(query.strip()) < 5:
             return False
 
-        query_lower = query.lower()
-        legal_score = sum(1 for keyword in self.legal_keywords if keyword in query_lower)
+        legal_score = self._analyze(query, analysis).count('legal')
 
         # Require at least one legal keyword or a long-form query
         return legal_score >= 1 or len(query) > 50
     
-    def get_validity_score(self, query: str) -> float:
+    def get_validity_score(self, query: str, analysis: QueryAnalysis = None) -> float:
         """
         Get confidence score for query validity (0-1)
         
         Args:
             query: User query string
+            analysis: Optional precomputed keyword analysis of the query
             
         Returns:
             float: Validity score between 0 and 1
@@ -48,13 +74,12 @@ class QueryValidator:
         if not query or len(query.strip()) < 5:
             return 0.0
             
-        query_lower = query.lower()
-        words = query_lower.split()
-        legal_score = sum(1 for keyword in self.legal_keywords if keyword in query_lower)
+        analysis = self._analyze(query, analysis)
+        legal_score = analysis.count('legal')
         
         # Calculate based on keyword density
-        if len(words) == 0:
+        if analysis.word_count == 0:
             return 0.0
             
-        score = min(legal_score / len(words), 1.0)
+        score = min(legal_score / analysis.word_count, 1.0)
         return score
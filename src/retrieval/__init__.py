@@ -5,9 +5,11 @@ Retrieval Module - Initialization
 from .faiss_retriever import FAISSRetriever
 from .bm25_retriever import BM25Retriever
 from .hybrid_retriever import HybridRetriever
+from .citation_index import CitationIndex
 
 __all__ = [
     'FAISSRetriever',
     'BM25Retriever',
-    'HybridRetriever'
+    'HybridRetriever',
+    'CitationIndex'
 ]
@@ -1,32 +1,50 @@
 """
 BM25 Retriever - Lexical matching using BM25 algorithm
 """
-from typing import List, Tuple, Optional
-from collections import defaultdict
-import math
+from typing import List, Tuple, Optional, Sequence, Dict
+from collections import Counter
+from pathlib import Path
+import json
+import numpy as np
+from src.data_pipeline.metadata_store import ChunkMetadataStore
 
 class BM25Retriever:
     """
     BM25-based retriever for lexical matching.
     Uses term frequency and document frequency for ranking.
+    
+    The index is an inverted file in flat arrays (CSR: per term, a slice
+    of document ids and term frequencies), so a search only touches the
+    postings of the query terms, and a saved index can be memory-mapped
+    and shared between processes.
     """
     
-    def __init__(self, k1: float = 1.5, b: float = 0.75):
+    def __init__(self, k1: float = 1.5, b: float = 0.75,
+                 metadata_store: ChunkMetadataStore = None):
         """
         Initialize BM25 Retriever
         
         Args:
             k1: Term frequency saturation parameter
             b: Length normalization parameter
+            metadata_store: Optional shared metadata table (row id == index position)
         """
         self.k1 = k1
         self.b = b
-        self.doc_store = {}
-        self.idf_scores = {}
+        self.metadata_store = metadata_store if metadata_store is not None else ChunkMetadataStore()
+        self.documents: Sequence[str] = []
         self.doc_length_avg = 0
-        self.vocabulary = defaultdict(int)  # Token frequency in corpus
+        self._reset_index()
+    
+    def _reset_index(self):
+        self.term_ids: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float64)
+        self.postings_ptr = np.zeros(1, dtype=np.int64)   # term -> slice of postings
+        self.postings_docs = np.zeros(0, dtype=np.int32)
+        self.postings_tf = np.zeros(0, dtype=np.int32)
+        self.doc_lengths = np.zeros(0, dtype=np.int32)
     
-    def add_documents(self, documents: List[str], metadata: List[dict] = None):
+    def add_documents(self, documents: Sequence[str], metadata: List[dict] = None):
         """
         Add documents for BM25 indexing
         
@@ -34,29 +52,36 @@ class BM25Retriever:
             documents: List of document texts
             metadata: Optional metadata for each document
         """
-        self.doc_store.clear()
-        self.vocabulary.clear()
-        self.idf_scores.clear()
+        self._reset_index()
+        if metadata is not None:
+            self.metadata_store = ChunkMetadataStore()
+            self.metadata_store.extend(metadata)
+        self.documents = documents
         
-        # Store documents and calculate statistics
-        total_length = 0
+        # Term frequencies per document, as (term id, doc id, tf) triples
+        terms, docs, tfs = [], [], []
+        doc_lengths = np.zeros(len(documents), dtype=np.int32)
         for idx, doc in enumerate(documents):
             tokens = self._tokenize(doc)
-            self.doc_store[idx] = {
-                'text': doc,
-                'tokens': tokens,
-                'length': len(tokens),
-                'metadata': metadata[idx] if metadata and idx < len(metadata) else {}
-            }
-            total_length += len(tokens)
-            
-            # Update vocabulary
-            for token in set(tokens):
-                self.vocabulary[token] += 1
+            doc_lengths[idx] = len(tokens)
+            for token, count in Counter(tokens).items():
+                terms.append(self.term_ids.setdefault(token, len(self.term_ids)))
+                docs.append(idx)
+                tfs.append(count)
+        
+        # Group postings by term (stable, so each term's doc ids stay ascending)
+        terms = np.asarray(terms, dtype=np.int64)
+        order = np.argsort(terms, kind='stable')
+        self.postings_docs = np.asarray(docs, dtype=np.int32)[order]
+        self.postings_tf = np.asarray(tfs, dtype=np.int32)[order]
+        self.postings_ptr = np.concatenate(
+            [[0], np.cumsum(np.bincount(terms, minlength=len(self.term_ids)))]
+        ).astype(np.int64)
+        self.doc_lengths = doc_lengths
         
         # Calculate average document length
-        if self.doc_store:
-            self.doc_length_avg = total_length / len(self.doc_store)
+        if len(documents):
+            self.doc_length_avg = float(doc_lengths.sum()) / len(documents)
         
         # Calculate IDF scores
         self._calculate_idf()
@@ -67,39 +92,30 @@ class BM25Retriever:
     
     def _calculate_idf(self):
         """Calculate IDF (Inverse Document Frequency) for all terms"""
-        num_docs = len(self.doc_store)
+        num_docs = len(self.documents)
+        doc_freq = np.diff(self.postings_ptr).astype(np.float64)
         
-        for token in self.vocabulary:
-            doc_freq = sum(1 for doc in self.doc_store.values() 
-                          if token in doc['tokens'])
-            
-            # IDF formula: log(N / df + 1)
-            idf = math.log((num_docs - doc_freq + 0.5) / (doc_freq + 0.5) + 1.0)
-            self.idf_scores[token] = idf
+        # IDF formula: log(N / df + 1)
+        self.idf = np.log((num_docs - doc_freq + 0.5) / (doc_freq + 0.5) + 1.0)
     
-    def _get_bm25_score(self, tokens: List[str], doc_idx: int) -> float:
-        """Calculate BM25 score for a document"""
-        doc = self.doc_store[doc_idx]
-        doc_tokens = doc['tokens']
-        doc_length = doc['length']
-        
-        score = 0.0
+    def _get_bm25_scores(self, tokens: List[str]) -> np.ndarray:
+        """Calculate BM25 scores of every document for a tokenized query"""
+        scores = np.zeros(len(self.documents), dtype=np.float64)
         for token in tokens:
-            if token not in self.idf_scores:
+            term = self.term_ids.get(token)
+            if term is None:
                 continue
             
-            # Term frequency in document
-            term_freq = doc_tokens.count(token)
+            start, end = self.postings_ptr[term], self.postings_ptr[term + 1]
+            docs = self.postings_docs[start:end]
+            term_freq = self.postings_tf[start:end].astype(np.float64)
             
             # BM25 formula
-            idf = self.idf_scores[token]
-            normalized_tf = (term_freq * (self.k1 + 1)) / (
-                term_freq + self.k1 * (1 - self.b + self.b * (doc_length / self.doc_length_avg))
-            )
-            
-            score += idf * normalized_tf
+            length_norm = 1 - self.b + self.b * (self.doc_lengths[docs].astype(np.float64)
+                                                 / self.doc_length_avg)
+            scores[docs] += self.idf[term] * (term_freq * (self.k1 + 1)) / (term_freq + self.k1 * length_norm)
         
-        return score
+        return scores
     
     def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
         """
@@ -108,38 +124,104 @@ class BM25Retriever:
         Args:
             query: Query text
             k: Number of results to return
-            
+        
         Returns:
             List of (document, score) tuples
         """
-        if not self.doc_store:
-            return []
+        return [(self.documents[doc_idx], score)
+                for doc_idx, score in self.search_ids(query, k)]
+    
+    def search_ids(self, query: str, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Search using BM25 algorithm, returning index positions
         
-        query_tokens = self._tokenize(query)
-        scores = {}
+        Args:
+            query: Query text
+            k: Number of results to return
         
-        # Calculate BM25 score for each document (include zeros to allow top-k)
-        for doc_idx in self.doc_store:
-            score = self._get_bm25_score(query_tokens, doc_idx)
-            scores[doc_idx] = score
+        Returns:
+            List of (document_index, score) tuples
+        """
+        num_docs = len(self.documents)
+        if not num_docs or k <= 0:
+            return []
         
-        # Sort and return top-k
-        sorted_results = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+        # Score every document (zeros included, to allow top-k)
+        scores = self._get_bm25_scores(self._tokenize(query))
         
-        results = []
-        for doc_idx, score in sorted_results:
-            doc_text = self.doc_store[doc_idx]['text']
-            results.append((doc_text, float(score)))
+        # Top-k by score; ties go to the earlier document
+        if k < num_docs:
+            kth = np.partition(scores, num_docs - k)[num_docs - k]
+            above = np.flatnonzero(scores > kth)
+            ties = np.flatnonzero(scores == kth)[:k - len(above)]
+            candidates = np.concatenate([above, ties])
+        else:
+            candidates = np.arange(num_docs)
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))]
         
-        return results
+        return [(int(doc_idx), float(scores[doc_idx])) for doc_idx in ranked]
+    
+    def get_metadata(self, idx: int) -> dict:
+        """Get metadata for an indexed document"""
+        if idx < len(self.metadata_store):
+            return self.metadata_store.get(idx)
+        return {}
     
     def get_document_count(self) -> int:
         """Get number of indexed documents"""
-        return len(self.doc_store)
+        return len(self.documents)
+    
+    def save(self, directory: str):
+        """
+        Write the index arrays (documents are not included)
+        
+        Args:
+            directory: Target directory (created if missing)
+        """
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "idf.npy", self.idf)
+        np.save(path / "postings_ptr.npy", self.postings_ptr)
+        np.save(path / "postings_docs.npy", self.postings_docs)
+        np.save(path / "postings_tf.npy", self.postings_tf)
+        np.save(path / "doc_lengths.npy", self.doc_lengths)
+        header = {'k1': self.k1, 'b': self.b, 'doc_length_avg': self.doc_length_avg,
+                  'terms': list(self.term_ids)}
+        (path / "header.json").write_text(json.dumps(header), encoding='utf-8')
+    
+    @classmethod
+    def load(cls, directory: str, documents: Sequence[str], mmap: bool = True,
+             metadata_store: ChunkMetadataStore = None) -> "BM25Retriever":
+        """
+        Read an index written by save()
+        
+        Args:
+            directory: Directory containing the index arrays
+            documents: The indexed document texts, in index order
+            mmap: Memory-map the arrays instead of reading them
+            metadata_store: Optional shared metadata table
+        
+        Returns:
+            Loaded BM25Retriever
+        """
+        path = Path(directory)
+        header = json.loads((path / "header.json").read_text(encoding='utf-8'))
+        retriever = cls(k1=header['k1'], b=header['b'], metadata_store=metadata_store)
+        mmap_mode = 'r' if mmap else None
+        retriever.idf = np.load(path / "idf.npy", mmap_mode=mmap_mode)
+        retriever.postings_ptr = np.load(path / "postings_ptr.npy", mmap_mode=mmap_mode)
+        retriever.postings_docs = np.load(path / "postings_docs.npy", mmap_mode=mmap_mode)
+        retriever.postings_tf = np.load(path / "postings_tf.npy", mmap_mode=mmap_mode)
+        retriever.doc_lengths = np.load(path / "doc_lengths.npy", mmap_mode=mmap_mode)
+        retriever.term_ids = {term: idx for idx, term in enumerate(header['terms'])}
+        retriever.doc_length_avg = header['doc_length_avg']
+        retriever.documents = documents
+        if len(documents) != len(retriever.doc_lengths):
+            raise ValueError("Documents do not match the saved BM25 index")
+        return retriever
     
     def reset(self):
         """Clear all data"""
-        self.doc_store.clear()
-        self.idf_scores.clear()
-        self.vocabulary.clear()
+        self.documents = []
         self.doc_length_avg = 0
+        self._reset_index()
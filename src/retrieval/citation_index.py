@@ -0,0 +1,175 @@
+"""
+Citation Index - Direct lookup of cited sections and articles
+"""
+from typing import Dict, List, Optional, Tuple
+import re
+
+from src.data_pipeline import ChunkMetadataStore
+
+# Common ways an act is written in queries -> act code used in document ids
+DEFAULT_ACT_ALIASES = {
+    'ipc': 'IPC', 'indian penal code': 'IPC', 'penal code': 'IPC',
+    'crpc': 'CRPC', 'cr.p.c': 'CRPC', 'criminal procedure code': 'CRPC',
+    'code of criminal procedure': 'CRPC',
+    'cpc': 'CPC', 'code of civil procedure': 'CPC', 'civil procedure code': 'CPC',
+    'constitution': 'COI', 'constitution of india': 'COI', 'indian constitution': 'COI',
+    'contract act': 'ICA', 'indian contract act': 'ICA',
+    'evidence act': 'IEA', 'indian evidence act': 'IEA',
+    'it act': 'ITA', 'information technology act': 'ITA',
+    'transfer of property act': 'TPA', 'tpa': 'TPA',
+    'industrial disputes act': 'IL',
+    'bns': 'BNS', 'bharatiya nyaya sanhita': 'BNS'
+}
+
+_DOC_ID = re.compile(r'^([A-Z]+)_(\d+[A-Z]*)$')
+_TITLE = re.compile(r'^(.+?)\s+-\s+(?:section|article)\s+\d+', re.IGNORECASE)
+# A bare "s" must be followed by a dot or space and must not follow an
+# apostrophe, so "What's 3 years" and "tenant's 5 rights" are not citations
+_NUMBERED = re.compile(r"(?<!['’])\b(section|sec|s(?=[.\s])|article|art)s?\.?\s*(\d+[a-z]?)\b",
+                       re.IGNORECASE)
+
+# Max characters between a section number and the act it belongs to
+_ACT_WINDOW = 40
+
+
+class CitationIndex:
+    """
+    Maps normalised citations such as IPC_420 or COI_21 to the chunk rows
+    of that provision. Built from document ids in the chunk metadata, so a
+    query citing a section resolves to its chunks with a dictionary lookup.
+    """
+
+    def __init__(self, act_aliases: Dict[str, str] = None):
+        """
+        Initialize citation index
+
+        Args:
+            act_aliases: Act name or abbreviation -> act code (extends the defaults)
+        """
+        self.act_aliases = dict(DEFAULT_ACT_ALIASES)
+        self.act_aliases.update(act_aliases or {})
+        self.metadata_store: Optional[ChunkMetadataStore] = None
+        self._rows: Dict[str, List[int]] = {}
+        self._acts_by_number: Dict[str, set] = {}
+        self._act_pattern = None
+
+    @classmethod
+    def from_metadata(cls, store: ChunkMetadataStore,
+                      act_aliases: Dict[str, str] = None) -> "CitationIndex":
+        """Build an index over the rows of a metadata store"""
+        index = cls(act_aliases)
+        index.build(store)
+        return index
+
+    def build(self, store: ChunkMetadataStore):
+        """
+        Index every chunk whose document id looks like ACT_NUMBER
+
+        Args:
+            store: Chunk metadata shared with the retriever
+        """
+        rows: Dict[str, List[int]] = {}
+        acts_by_number: Dict[str, set] = {}
+
+        for row in range(len(store)):
+            doc_id = store.get_field(row, 'id')
+            match = _DOC_ID.match(doc_id.upper()) if doc_id else None
+            if not match:
+                continue
+            code, number = match.groups()
+            rows.setdefault(f"{code}_{number}", []).append(row)
+            acts_by_number.setdefault(number, set()).add(code)
+
+            # Learn the act's full name from titles like "Indian Penal Code - Section 420"
+            title = store.get_field(row, 'title')
+            title_match = _TITLE.match(title) if title else None
+            if title_match:
+                self.act_aliases.setdefault(title_match.group(1).lower(), code)
+
+        self.metadata_store = store
+        self._rows = rows
+        self._acts_by_number = acts_by_number
+        self._compile()
+
+    def _compile(self):
+        aliases = set(self.act_aliases) | {code.lower() for code in self.act_aliases.values()}
+        alternation = "|".join(re.escape(alias) for alias in sorted(aliases, key=len, reverse=True))
+        # Lookarounds instead of \b so that "IPC_420" still splits into act and number
+        self._act_pattern = re.compile(
+            rf"(?<![a-z0-9])({alternation})(?![a-z])"
+            r"(?:[\s_.-]*(?:section|sec|s)?\.?\s*(\d+[a-z]?)\b)?",
+            re.IGNORECASE
+        )
+
+    def _code_of(self, alias: str) -> str:
+        alias = alias.lower()
+        return self.act_aliases.get(alias) or alias.upper()
+
+    def extract(self, query: str) -> List[str]:
+        """
+        Extract normalised citations from a query
+
+        Handles "Section 420 IPC", "Section 420 of the Indian Penal Code",
+        "IPC 420", "IPC_420" and "Article 21" (Constitution by default).
+
+        Args:
+            query: User query string
+
+        Returns:
+            Citation keys in order of appearance, e.g. ['IPC_420']
+        """
+        if self._act_pattern is None:
+            self._compile()
+
+        acts: List[Tuple[int, int, str]] = []
+        citations: List[Tuple[int, str]] = []
+        for match in self._act_pattern.finditer(query):
+            code = self._code_of(match.group(1))
+            acts.append((match.start(), match.end(), code))
+            if match.group(2):
+                citations.append((match.start(), f"{code}_{match.group(2).upper()}"))
+
+        for match in _NUMBERED.finditer(query):
+            number = match.group(2).upper()
+            code = self._nearest_act(match.start(), match.end(), acts)
+            if code is None:
+                if match.group(1).lower().startswith('art'):
+                    code = 'COI'
+                elif len(self._acts_by_number.get(number, ())) == 1:
+                    code = next(iter(self._acts_by_number[number]))
+                else:
+                    continue
+            citations.append((match.start(), f"{code}_{number}"))
+
+        citations.sort()
+        return list(dict.fromkeys(key for _, key in citations))
+
+    @staticmethod
+    def _nearest_act(start: int, end: int, acts: List[Tuple[int, int, str]]) -> Optional[str]:
+        best, best_distance = None, _ACT_WINDOW + 1
+        for act_start, act_end, code in acts:
+            distance = act_start - end if act_start >= end else start - act_end
+            if 0 <= distance < best_distance:
+                best, best_distance = code, distance
+        return best
+
+    def lookup(self, citations: List[str]) -> List[int]:
+        """
+        Get chunk rows for citation keys
+
+        Args:
+            citations: Normalised citation keys
+
+        Returns:
+            Chunk rows, grouped by citation in the given order
+        """
+        rows = []
+        for key in citations:
+            rows.extend(self._rows.get(key, ()))
+        return rows
+
+    def __contains__(self, citation: str) -> bool:
+        return citation in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
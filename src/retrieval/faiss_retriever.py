@@ -1,8 +1,9 @@
 """
 FAISS Retriever - Semantic similarity search using FAISS
 """
-from typing import List, Tuple, Optional
+from typing import List, Tuple, Optional, Sequence
 import numpy as np
+from src.data_pipeline.metadata_store import ChunkMetadataStore
 
 class FAISSRetriever:
     """
@@ -10,19 +11,21 @@ class FAISSRetriever:
     Uses dense embeddings for fast nearest neighbor search.
     """
     
-    def __init__(self, dimension: int = 384, metric: str = "L2"):
+    def __init__(self, dimension: int = 384, metric: str = "L2",
+                 metadata_store: ChunkMetadataStore = None):
         """
         Initialize FAISS Retriever
         
         Args:
             dimension: Embedding dimension
             metric: Distance metric ("L2" or "IP")
+            metadata_store: Optional shared metadata table (row id == index position)
         """
         self.dimension = dimension
         self.metric = metric
         self.faiss_index = None
-        self.doc_store = {}  # Maps index to document
-        self.embeddings = []
+        self.documents: List[str] = []  # Index position -> document text
+        self.metadata_store = metadata_store if metadata_store is not None else ChunkMetadataStore()
         
         # Initialize FAISS index (lazy loading)
         self._initialize_index()
@@ -51,20 +54,18 @@ class FAISSRetriever:
         if len(documents) != len(embeddings):
             raise ValueError("Documents and embeddings must have same length")
         
-        embeddings_array = np.array(embeddings, dtype=np.float32)
+        embeddings_array = np.asarray(embeddings, dtype=np.float32)
         
-        # Add to FAISS index
+        # Add to FAISS index (the index keeps its own copy of the vectors)
         self.faiss_index.add(embeddings_array)
-        self.embeddings.extend(embeddings)
-        
-        # Store documents and metadata
-        start_idx = len(self.doc_store)
-        for idx, (doc, meta) in enumerate(zip(documents, metadata or [{}] * len(documents))):
-            self.doc_store[start_idx + idx] = {
-                'text': doc,
-                'metadata': meta,
-                'embedding_idx': start_idx + idx
-            }
+        
+        # Store documents; metadata goes to the shared table unless already there
+        start_idx = len(self.documents)
+        self.documents.extend(documents)
+        if metadata is not None:
+            while len(self.metadata_store) < start_idx:
+                self.metadata_store.append({})
+            self.metadata_store.extend(metadata)
     
     def search(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
         """
@@ -77,6 +78,20 @@ class FAISSRetriever:
         Returns:
             List of (document, similarity_score) tuples
         """
+        return [(self.documents[idx], score)
+                for idx, score in self.search_ids(query_embedding, k)]
+    
+    def search_ids(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Search for similar documents, returning index positions
+        
+        Args:
+            query_embedding: Query embedding vector
+            k: Number of results to return
+            
+        Returns:
+            List of (document_index, similarity_score) tuples
+        """
         if self.faiss_index.ntotal == 0:
             return []
         
@@ -88,24 +103,107 @@ class FAISSRetriever:
         
         results = []
         for idx, distance in zip(indices[0], distances[0]):
-            if idx in self.doc_store:
-                doc_info = self.doc_store[idx]
+            if 0 <= idx < len(self.documents):
                 # Convert distance to similarity (higher is better)
                 if self.metric == "L2":
                     similarity = 1 / (1 + distance)
                 else:
                     similarity = distance
                 
-                results.append((doc_info['text'], float(similarity)))
+                results.append((int(idx), float(similarity)))
         
         return results
     
+    def search_ids_batch(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[int, float]]]:
+        """
+        Search for several queries with one index call
+        
+        Args:
+            query_embeddings: Query embeddings (one row per query)
+            k: Number of results per query
+            
+        Returns:
+            One list of (document_index, similarity_score) tuples per query
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.dimension)
+        if self.faiss_index.ntotal == 0:
+            return [[] for _ in range(len(queries))]
+        
+        distances, indices = self.faiss_index.search(queries, min(k, self.faiss_index.ntotal))
+        if self.metric == "L2":
+            distances = 1 / (1 + distances)
+        
+        return [
+            [(int(idx), float(similarity)) for idx, similarity in zip(row_ids, row_scores)
+             if 0 <= idx < len(self.documents)]
+            for row_ids, row_scores in zip(indices, distances)
+        ]
+    
+    def get_metadata(self, idx: int) -> dict:
+        """Get metadata for an indexed document"""
+        if idx < len(self.metadata_store):
+            return self.metadata_store.get(idx)
+        return {}
+    
     def get_document_count(self) -> int:
         """Get number of indexed documents"""
         return self.faiss_index.ntotal
     
+    def vectors(self) -> np.ndarray:
+        """
+        Read-only view of the indexed vectors (one row per document), without a copy.
+        The view keeps the index alive; it must not outlive further add_documents calls.
+        """
+        if self.faiss_index.ntotal == 0:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.asarray(_IndexVectors(self.faiss_index))
+    
+    def save(self, path: str):
+        """Write the FAISS index to a file (documents are not included)"""
+        import faiss
+        faiss.write_index(self.faiss_index, str(path))
+    
+    @classmethod
+    def load(cls, path: str, documents: Sequence[str], mmap: bool = True,
+             metric: str = "L2", metadata_store: ChunkMetadataStore = None) -> "FAISSRetriever":
+        """
+        Read an index written by save()
+        
+        Args:
+            path: Index file
+            documents: The indexed document texts, in index order
+            mmap: Memory-map the vectors instead of reading them, so processes
+                loading the same file share one copy in the page cache
+            metric: Distance metric the index was built with
+            metadata_store: Optional shared metadata table
+            
+        Returns:
+            Loaded FAISSRetriever
+        """
+        import faiss
+        index = faiss.read_index(str(path), faiss.IO_FLAG_MMAP_IFC if mmap else 0)
+        if index.ntotal != len(documents):
+            raise ValueError("Documents do not match the saved FAISS index")
+        retriever = cls(dimension=index.d, metric=metric, metadata_store=metadata_store)
+        retriever.faiss_index = index
+        retriever.documents = documents
+        return retriever
+    
     def reset(self):
         """Clear all stored data"""
         self._initialize_index()
-        self.doc_store.clear()
-        self.embeddings.clear()
+        self.documents = []
+        self.metadata_store = ChunkMetadataStore()
+
+
+class _IndexVectors:
+    """Exposes a flat FAISS index's vector storage to numpy, holding a reference to the index"""
+    
+    def __init__(self, index):
+        self.index = index
+        self.__array_interface__ = {
+            'data': (int(index.get_xb()), True),  # read-only
+            'shape': (index.ntotal, index.d),
+            'typestr': '<f4',
+            'version': 3
+        }
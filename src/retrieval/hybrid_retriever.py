@@ -1,10 +1,12 @@
 """
 Hybrid Retriever - Combines FAISS and BM25 for optimal retrieval
 """
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Sequence
+from pathlib import Path
 import numpy as np
 from .faiss_retriever import FAISSRetriever
 from .bm25_retriever import BM25Retriever
+from src.data_pipeline.metadata_store import ChunkMetadataStore
 
 class HybridRetriever:
     """
@@ -13,7 +15,8 @@ class HybridRetriever:
     """
     
     def __init__(self, embedding_dim: int = 384, 
-                 faiss_weight: float = 0.6, bm25_weight: float = 0.4):
+                 faiss_weight: float = 0.6, bm25_weight: float = 0.4,
+                 metadata_store: ChunkMetadataStore = None):
         """
         Initialize Hybrid Retriever
         
@@ -21,9 +24,12 @@ class HybridRetriever:
             embedding_dim: Dimension of embeddings
             faiss_weight: Weight for FAISS results (0-1)
             bm25_weight: Weight for BM25 results (0-1)
+            metadata_store: Optional shared metadata table (row id == index position)
         """
-        self.faiss_retriever = FAISSRetriever(dimension=embedding_dim)
-        self.bm25_retriever = BM25Retriever()
+        self.metadata_store = metadata_store if metadata_store is not None else ChunkMetadataStore()
+        self.faiss_retriever = FAISSRetriever(dimension=embedding_dim,
+                                              metadata_store=self.metadata_store)
+        self.bm25_retriever = BM25Retriever(metadata_store=self.metadata_store)
         
         # Normalize weights
         total = faiss_weight + bm25_weight
@@ -40,11 +46,13 @@ class HybridRetriever:
         Args:
             documents: List of document texts
             embeddings: List of embedding vectors
-            metadata: Optional metadata
+            metadata: Optional metadata (omit if already in the shared metadata store)
         """
         self.documents = documents
-        self.faiss_retriever.add_documents(documents, embeddings, metadata)
-        self.bm25_retriever.add_documents(documents, metadata)
+        if metadata is not None:
+            self.metadata_store.extend(metadata)
+        self.faiss_retriever.add_documents(documents, embeddings)
+        self.bm25_retriever.add_documents(documents)
     
     def search(self, query: str, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
         """
@@ -58,30 +66,75 @@ class HybridRetriever:
         Returns:
             List of (document, combined_score) tuples
         """
+        return [(self.documents[idx], score)
+                for idx, score in self.search_ids(query, query_embedding, k)]
+    
+    def search_ids(self, query: str, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[int, float]]:
+        """
+        Hybrid search returning index positions of the matched documents
+        
+        Args:
+            query: Query text
+            query_embedding: Query embedding vector
+            k: Number of results to return
+            
+        Returns:
+            List of (document_index, combined_score) tuples
+        """
         # Get results from both retrievers
-        faiss_results = self.faiss_retriever.search(query_embedding, k)
-        bm25_results = self.bm25_retriever.search(query, k)
+        faiss_results = self.faiss_retriever.search_ids(query_embedding, k)
+        bm25_results = self.bm25_retriever.search_ids(query, k)
+        return self._combine(faiss_results, bm25_results, k)
+    
+    def search_ids_batch(self, queries: List[str], query_embeddings: Optional[np.ndarray],
+                         k: int = 5) -> List[List[Tuple[int, float]]]:
+        """
+        Hybrid search for several queries; the dense part is one FAISS call
         
+        Args:
+            queries: Query texts
+            query_embeddings: Query embeddings (one row per query), or None to
+                search lexically only
+            k: Number of results per query
+            
+        Returns:
+            One list of (document_index, combined_score) tuples per query
+        """
+        if query_embeddings is None:
+            faiss_batches = [[] for _ in queries]
+        else:
+            faiss_batches = self.faiss_retriever.search_ids_batch(query_embeddings, k)
+        return [self._combine(faiss_results, self.bm25_retriever.search_ids(query, k), k)
+                for query, faiss_results in zip(queries, faiss_batches)]
+    
+    def _combine(self, faiss_results: List[Tuple[int, float]],
+                 bm25_results: List[Tuple[int, float]], k: int) -> List[Tuple[int, float]]:
         # Combine scores
-        combined_scores: Dict[str, float] = {}
+        combined_scores: Dict[int, float] = {}
         
         # Add FAISS scores
-        for doc, score in faiss_results:
+        for idx, score in faiss_results:
             # Normalize FAISS score to 0-1 range
             normalized_score = score
-            combined_scores[doc] = combined_scores.get(doc, 0) + self.faiss_weight * normalized_score
+            combined_scores[idx] = combined_scores.get(idx, 0) + self.faiss_weight * normalized_score
         
         # Add BM25 scores
-        for doc, score in bm25_results:
+        for idx, score in bm25_results:
             # Normalize BM25 score (use min-max normalization if needed)
             # For simplicity, assume scores are already normalized
-            combined_scores[doc] = combined_scores.get(doc, 0) + self.bm25_weight * score
+            combined_scores[idx] = combined_scores.get(idx, 0) + self.bm25_weight * score
         
         # Sort by combined score
         sorted_results = sorted(combined_scores.items(), key=lambda x: x[1], reverse=True)[:k]
         
         return sorted_results
     
+    def get_metadata(self, idx: int) -> dict:
+        """Get metadata for an indexed document"""
+        if idx < len(self.metadata_store):
+            return self.metadata_store.get(idx)
+        return {}
+    
     def re_rank(self, documents: List[str], query: str, 
                 query_embedding: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
         """
@@ -115,3 +168,43 @@ class HybridRetriever:
     def get_document_count(self) -> int:
         """Get number of indexed documents"""
         return self.faiss_retriever.get_document_count()
+    
+    def save(self, directory: str):
+        """
+        Write both indexes (documents and metadata are not included)
+        
+        Args:
+            directory: Target directory (created if missing)
+        """
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+        self.faiss_retriever.save(path / "faiss.index")
+        self.bm25_retriever.save(path / "bm25")
+    
+    @classmethod
+    def load(cls, directory: str, documents: Sequence[str], mmap: bool = True,
+             faiss_weight: float = 0.6, bm25_weight: float = 0.4,
+             metadata_store: ChunkMetadataStore = None) -> "HybridRetriever":
+        """
+        Read indexes written by save()
+        
+        Args:
+            directory: Directory containing the indexes
+            documents: The indexed document texts, in index order
+            mmap: Memory-map the index data instead of reading it
+            faiss_weight: Weight for FAISS results (0-1)
+            bm25_weight: Weight for BM25 results (0-1)
+            metadata_store: Optional shared metadata table
+            
+        Returns:
+            Loaded HybridRetriever
+        """
+        path = Path(directory)
+        retriever = cls(faiss_weight=faiss_weight, bm25_weight=bm25_weight,
+                        metadata_store=metadata_store)
+        retriever.faiss_retriever = FAISSRetriever.load(path / "faiss.index", documents, mmap=mmap,
+                                                        metadata_store=retriever.metadata_store)
+        retriever.bm25_retriever = BM25Retriever.load(path / "bm25", documents, mmap=mmap,
+                                                      metadata_store=retriever.metadata_store)
+        retriever.documents = documents
+        return retriever
@@ -2,12 +2,22 @@
 Utilities Module - Initialization
 """
 
-from .logger import setup_logger, CustomException, InvalidQueryException, RetrievalException, LLMException
+from .logger import setup_logger, CustomException, InvalidQueryException, RetrievalException, LLMException, SessionBackendException
+from .memory import process_memory
+from .json_codec import dumps, dumps_str, JSON_BACKEND
+from .compression import choose_encoding, compress
 
 __all__ = [
     'setup_logger',
     'CustomException',
     'InvalidQueryException',
     'RetrievalException',
-    'LLMException'
+    'LLMException',
+    'SessionBackendException',
+    'process_memory',
+    'dumps',
+    'dumps_str',
+    'JSON_BACKEND',
+    'choose_encoding',
+    'compress'
 ]
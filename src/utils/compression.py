@@ -0,0 +1,61 @@
+"""
+Compression - Content-Encoding negotiation for API responses
+"""
+from typing import Optional
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Only gzip is offered
+    brotli = None
+
+# Smaller bodies fit in one packet anyway; compressing them only costs CPU
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+def choose_encoding(accept_encoding: Optional[str], size: int) -> Optional[str]:
+    """
+    Pick the Content-Encoding for a response body
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header
+        size: Body size in bytes
+
+    Returns:
+        'br', 'gzip', or None to send the body as is
+    """
+    if not accept_encoding or size < MIN_COMPRESS_SIZE:
+        return None
+
+    accepted, refused = set(), set()
+    for item in accept_encoding.lower().split(','):
+        coding, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(coding)
+        else:
+            refused.add(coding)
+
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    # "*" only stands for codings the header does not refuse by name
+    if 'gzip' in accepted or ('*' in accepted and 'gzip' not in refused):
+        return 'gzip'
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with an encoding returned by choose_encoding()"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
@@ -0,0 +1,51 @@
+"""
+JSON Codec - Response encoding, with orjson when it is installed
+"""
+from typing import Any
+import json
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # Falls back to the standard library encoder
+    orjson = None
+
+JSON_BACKEND = 'orjson' if orjson is not None else 'json'
+
+if orjson is not None:
+    # Datetimes go through default=str like they do with json.dumps
+    _ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                       | orjson.OPT_PASSTHROUGH_DATETIME)
+
+
+def _default(obj: Any) -> Any:
+    # numpy values as numbers, like orjson's OPT_SERIALIZE_NUMPY
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Encode a response as compact UTF-8 JSON
+
+    numpy values become numbers; anything else JSON cannot represent is
+    stringified, like json.dumps(default=str).
+
+    Args:
+        obj: Object to encode
+
+    Returns:
+        Encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_str(obj: Any) -> str:
+    """dumps() as text, for SSE and NDJSON lines"""
+    return dumps(obj).decode('utf-8')
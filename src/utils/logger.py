@@ -18,6 +18,13 @@ class RetrievalException(CustomException):
 
 class LLMException(CustomException):
     """Raised when LLM operation fails"""
+    
+    def __init__(self, message: str = "", code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code  # HTTP status from the provider, if any
+
+class SessionBackendException(CustomException):
+    """Raised when the session backend cannot be reached or errors"""
     pass
 
 def setup_logger(name: str, level: int = logging.INFO) -> logging.Logger:
@@ -0,0 +1,43 @@
+"""
+Memory Utilities - Resident vs shared memory of a process
+"""
+from pathlib import Path
+from typing import Dict, Optional
+import os
+
+_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, float]:
+    """
+    Memory of a process in MB, split into what it shares and what it owns
+
+    Reads /proc/<pid>/smaps_rollup (Linux 4.14+). Copy-on-write pages a
+    forked worker has not written yet count as shared.
+
+    Args:
+        pid: Process id (this process if None)
+
+    Returns:
+        Dict with rss, pss (rss with shared pages divided among their
+        sharers), shared and private; empty where /proc is unavailable
+    """
+    path = Path(f"/proc/{pid or os.getpid()}/smaps_rollup")
+    try:
+        lines = path.read_text().splitlines()
+    except OSError:
+        return {}
+
+    kb = {}
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name in _FIELDS:
+            kb[name] = int(value.split()[0])
+    if not kb:
+        return {}
+    return {
+        'rss_mb': round(kb.get('Rss', 0) / 1024, 1),
+        'pss_mb': round(kb.get('Pss', 0) / 1024, 1),
+        'shared_mb': round((kb.get('Shared_Clean', 0) + kb.get('Shared_Dirty', 0)) / 1024, 1),
+        'private_mb': round((kb.get('Private_Clean', 0) + kb.get('Private_Dirty', 0)) / 1024, 1)
+    }
@@ -142,6 +142,44 @@ if 'chat_history' not in st.session_state:
 if 'documents_ingested' not in st.session_state:
     st.session_state.documents_ingested = False
 
+
+def stream_bot_response(query: str) -> Dict[str, Any]:
+    """
+    Stream the bot's answer into the page as it is generated
+    
+    Returns:
+        Final response dictionary (same shape as LegalAdvisorBot.query)
+    """
+    events = st.session_state.bot.query_stream(query, session_id=st.session_state.session_id)
+    
+    # Only retrieval runs under the spinner; tokens render as they arrive
+    with st.spinner("🔍 Searching legal documents..."):
+        first_event = next(events)
+    if first_event['event'] == 'error':
+        return first_event['data']
+    
+    placeholder = st.empty()
+    text = ""
+    result = first_event['data']
+    for event in events:
+        if event['event'] == 'preview':
+            # Quoted sections to read while the full answer is generated
+            placeholder.markdown(f"""
+            <div class="response-box">
+                <b>Bot:</b> {event['data']['text']}▌
+            </div>
+            """, unsafe_allow_html=True)
+        elif event['event'] == 'token':
+            text += event['data']['text']
+            placeholder.markdown(f"""
+            <div class="response-box">
+                <b>Bot:</b> {text}▌
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            result = event['data']
+    return result
+
 # ============================================================================
 # SIDEBAR - CONFIGURATION & CONTROLS
 # ============================================================================
@@ -400,35 +438,31 @@ with tab1:
             })
             
             # Get response
-            with st.spinner("🔍 Searching and generating response..."):
-                try:
-                    response = st.session_state.bot.query(
-                        user_query,
-                        session_id=st.session_state.session_id
-                    )
-                    
-                    # Extract metadata
-                    metadata = {
-                        'category': response.get('category', 'Unknown'),
-                        'confidence': response.get('category_confidence', 0),
-                        'retrieved_count': response.get('retrieved_count', 0),
-                        'sources': response.get('sources', [])
-                    }
-                    
-                    # Add bot response to history
-                    st.session_state.chat_history.append({
-                        'role': 'assistant',
-                        'content': response.get('response', 'No response generated'),
-                        'metadata': metadata
-                    })
-                    
-                    logger.info(f"Query processed: {user_query[:50]}...")
-                    st.rerun()
-                    
-                except Exception as e:
-                    st.error(f"❌ Error processing query: {str(e)}")
-                    logger.error(f"Error processing query: {e}")
-                    st.session_state.chat_history.pop()  # Remove failed query
+            try:
+                response = stream_bot_response(user_query)
+                
+                # Extract metadata
+                metadata = {
+                    'category': response.get('category', 'Unknown'),
+                    'confidence': response.get('category_confidence', 0),
+                    'retrieved_count': response.get('retrieved_count', 0),
+                    'sources': response.get('sources', [])
+                }
+                
+                # Add bot response to history
+                st.session_state.chat_history.append({
+                    'role': 'assistant',
+                    'content': response.get('response', 'No response generated'),
+                    'metadata': metadata
+                })
+                
+                logger.info(f"Query processed: {user_query[:50]}...")
+                st.rerun()
+                
+            except Exception as e:
+                st.error(f"❌ Error processing query: {str(e)}")
+                logger.error(f"Error processing query: {e}")
+                st.session_state.chat_history.pop()  # Remove failed query
         
         # ========================================================================
         # EXAMPLE QUERIES
@@ -451,31 +485,27 @@ with tab1:
                         'content': query
                     })
                     
-                    with st.spinner("🔍 Searching and generating response..."):
-                        try:
-                            response = st.session_state.bot.query(
-                                query,
-                                session_id=st.session_state.session_id
-                            )
-                            
-                            metadata = {
-                                'category': response.get('category', 'Unknown'),
-                                'confidence': response.get('category_confidence', 0),
-                                'retrieved_count': response.get('retrieved_count', 0),
-                                'sources': response.get('sources', [])
-                            }
-                            
-                            st.session_state.chat_history.append({
-                                'role': 'assistant',
-                                'content': response.get('response', 'No response generated'),
-                                'metadata': metadata
-                            })
-                            
-                            st.rerun()
-                            
-                        except Exception as e:
-                            st.error(f"❌ Error: {str(e)}")
-                            st.session_state.chat_history.pop()
+                    try:
+                        response = stream_bot_response(query)
+                        
+                        metadata = {
+                            'category': response.get('category', 'Unknown'),
+                            'confidence': response.get('category_confidence', 0),
+                            'retrieved_count': response.get('retrieved_count', 0),
+                            'sources': response.get('sources', [])
+                        }
+                        
+                        st.session_state.chat_history.append({
+                            'role': 'assistant',
+                            'content': response.get('response', 'No response generated'),
+                            'metadata': metadata
+                        })
+                        
+                        st.rerun()
+                        
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
+                        st.session_state.chat_history.pop()
 
 if has_legal_database:
     with tab2:
@@ -0,0 +1,663 @@
+"""
+Unit Tests - Core Pipeline
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import asyncio
+import tempfile
+import threading
+import time
+import unittest
+from src.core import (RAGPipeline, IngestJobManager, JobStage, ContextAssembler, SingleFlight,
+                      GenerationJobManager, GenerationStage, MappedTexts, build_payload)
+from concurrent.futures import CancelledError
+from src.data_pipeline import ChunkMetadataStore, DocumentChunker
+from src.utils import LLMException, InvalidQueryException
+
+
+def wait_for(job, timeout=5.0):
+    """Poll a job until it finishes"""
+    deadline = time.time() + timeout
+    while not job.is_finished and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+class TestIngestJobManager(unittest.TestCase):
+    """Test background ingest jobs"""
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_job_reports_progress(self):
+        """Test job runs in background and records progress"""
+        def ingest(documents, metadata_list, progress_callback=None):
+            for idx, _ in enumerate(documents):
+                progress_callback(JobStage.EMBEDDING, idx + 1, (idx + 1) * 2)
+
+        self.manager = IngestJobManager(ingest)
+        job = wait_for(self.manager.submit(["doc1", "doc2", "doc3"]))
+
+        status = job.to_dict()
+        self.assertEqual(status['stage'], JobStage.COMPLETED)
+        self.assertEqual(status['documents_processed'], 3)
+        self.assertEqual(status['chunks_processed'], 6)
+        self.assertIs(self.manager.get(job.job_id), job)
+
+    def test_job_failure_captured(self):
+        """Test ingest errors are reported on the job"""
+        def ingest(documents, metadata_list, progress_callback=None):
+            raise ValueError("bad document")
+
+        self.manager = IngestJobManager(ingest)
+        job = wait_for(self.manager.submit(["doc1"]))
+
+        self.assertEqual(job.stage, JobStage.FAILED)
+        self.assertIn("bad document", job.to_dict()['errors'])
+
+
+class TestGenerationJobManager(unittest.TestCase):
+    """Test background generation jobs"""
+
+    def setUp(self):
+        self.manager = GenerationJobManager(max_workers=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_partial_answer_and_replay(self):
+        """Test polls see partial text and late subscribers replay it"""
+        release = threading.Event()
+
+        def events():
+            yield {'event': 'token', 'data': {'text': "Answer "}}
+            release.wait(5)
+            yield {'event': 'token', 'data': {'text': "1"}}
+            yield {'event': 'done', 'data': {'response': "Answer 1"}}
+
+        job = self.manager.submit(events())
+        deadline = time.time() + 5
+        while job.stage != GenerationStage.GENERATING and time.time() < deadline:
+            time.sleep(0.005)
+        self.assertEqual(job.to_dict()['response'], "Answer ")
+
+        release.set()
+        followed = list(job.events())
+
+        self.assertEqual([e['event'] for e in followed], ['token', 'token', 'done'])
+        self.assertEqual(job.to_dict()['stage'], GenerationStage.COMPLETED)
+        self.assertEqual(job.to_dict()['result'], {'response': "Answer 1"})
+        self.assertIs(self.manager.get(job.job_id), job)
+
+    def test_failure_captured(self):
+        """Test an error event or exception fails the job"""
+        def events():
+            yield {'event': 'token', 'data': {'text': "Partial"}}
+            raise LLMException("provider down")
+
+        job = wait_for(self.manager.submit(events()))
+
+        self.assertEqual(job.stage, GenerationStage.FAILED)
+        self.assertEqual(list(job.events())[-1]['data']['error_message'], "provider down")
+
+
+class TestContextAssembler(unittest.TestCase):
+    """Test context merging, deduplication and budgeting"""
+
+    def setUp(self):
+        document = ("Section 420 deals with cheating. Whoever cheats shall be punished. "
+                    "The term may extend to seven years. The offender shall also be liable to fine. "
+                    "The offence is cognizable and non-bailable.")
+        chunks = DocumentChunker(chunk_size=70, overlap=40).chunk_with_offsets(document)
+        self.document = document
+        self.documents = [chunk for chunk, _, _ in chunks] + ["Unrelated chunk of another act."]
+        self.store = ChunkMetadataStore()
+        for chunk_id, (chunk, start, end) in enumerate(chunks):
+            self.store.append({'doc_id': 0, 'chunk_id': chunk_id, 'char_start': start,
+                               'char_end': end, 'id': 'IPC_420'})
+        self.store.append({'doc_id': 1, 'chunk_id': 0, 'char_start': 0, 'char_end': 31})
+
+    def test_overlapping_chunks_merged(self):
+        """Test neighbouring chunks become one span with the overlap kept once"""
+        rows = range(len(self.documents) - 1)
+        naive = "\n\n".join(self.documents[row] for row in rows)
+        assembler = ContextAssembler(label_sources=True)
+        context = assembler.assemble([(row, 0.5) for row in rows], self.documents, self.store)
+
+        self.assertEqual(context.text, "[IPC_420]\n" + self.document)
+        self.assertLess(len(context.text), len(naive))
+        self.assertEqual(sorted(context.blocks[0].rows), list(rows))
+
+    def test_duplicates_dropped(self):
+        """Test repeated text without metadata is included once"""
+        documents = ["Same text here.", "Same text here.", "Other text."]
+        context = ContextAssembler().assemble([(0, 0.9), (1, 0.8), (2, 0.7)], documents)
+
+        self.assertEqual(context.text, "Same text here.\n\nOther text.")
+        self.assertEqual(context.dropped_rows, [1])
+
+    def test_budget_packs_by_score(self):
+        """Test blocks are packed best first and the rest dropped"""
+        last = len(self.documents) - 1
+        assembler = ContextAssembler(max_tokens=12)
+        context = assembler.assemble([(last, 0.9), (0, 0.4)], self.documents, self.store)
+
+        self.assertEqual(context.text, self.documents[last])
+        self.assertLessEqual(context.tokens, 12)
+        self.assertEqual(context.dropped_rows, [0])
+
+        truncated = ContextAssembler(max_tokens=8).assemble([(0, 0.9)], self.documents, self.store)
+        self.assertTrue(truncated.truncated)
+        self.assertLessEqual(truncated.tokens, 8)
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test in-flight coalescing primitive"""
+
+    def test_abandoned_flight(self):
+        """Test followers are told when the leader gives up, and the key is freed"""
+        flights = SingleFlight()
+        future, leader = flights.begin("k")
+        follower_future, follower_leads = flights.begin("k")
+        flights.cancel("k", future)
+
+        self.assertTrue(leader)
+        self.assertFalse(follower_leads)
+        with self.assertRaises(CancelledError):
+            follower_future.result()
+        self.assertEqual(flights.do("k", lambda: 42), (42, True))
+
+
+class StubGenerator:
+    """Deterministic stand-in for the LLM generator"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_with_context(self, query, context, query_type="qa", deadline=None):
+        self.calls += 1
+        return f"Answer {self.calls}"
+
+    def generate_stream_with_context(self, query, context, query_type="qa", deadline=None):
+        self.calls += 1
+        yield "Answer "
+        yield str(self.calls)
+
+    async def agenerate_with_context(self, query, context, query_type="qa", deadline=None):
+        return self.generate_with_context(query, context, query_type, deadline)
+
+
+class BlockingGenerator(StubGenerator):
+    """Generator that holds every call until released"""
+
+    def __init__(self, error=None):
+        super().__init__()
+        self.release = threading.Event()
+        self.error = error
+        self.attempts = 0
+
+    def generate_with_context(self, query, context, query_type="qa", deadline=None):
+        self.attempts += 1
+        self.release.wait(5)
+        if self.error:
+            raise self.error
+        return super().generate_with_context(query, context, query_type)
+
+
+class AsyncBlockingGenerator(StubGenerator):
+    """Generator whose async calls wait on an asyncio event"""
+
+    def __init__(self):
+        super().__init__()
+        self.release = asyncio.Event()
+
+    async def agenerate_with_context(self, query, context, query_type="qa", deadline=None):
+        await self.release.wait()
+        return self.generate_with_context(query, context, query_type)
+
+
+class TestRAGPipeline(unittest.TestCase):
+    """Test pipeline caching behaviour"""
+
+    def setUp(self):
+        try:
+            self.pipeline = RAGPipeline()
+        except ImportError:
+            self.skipTest("FAISS not installed")
+        self.pipeline.generator = StubGenerator()
+        self.documents = [
+            "Section 420 deals with cheating and dishonestly inducing delivery of property.",
+            "Section 302 prescribes punishment for murder."
+        ]
+        self.metadata = [{'id': 'IPC_420'}, {'id': 'IPC_302'}]
+        self.pipeline.ingest_documents(self.documents, self.metadata)
+
+    def cache_all(self):
+        for key, value in list(self.pipeline.ltm.response_cache.items()):
+            self.pipeline.ltm.response_cache.put(key, {**value, 'confidence': 1.0})
+
+    def test_normalised_query_hits_cache(self):
+        """Test repeated query with different casing is served from cache"""
+        self.pipeline.process_query("What is Section 420 law?")
+        self.cache_all()
+        result = self.pipeline.process_query("what is section 420 law")
+
+        self.assertEqual(result['cache_hit'], 'exact')
+        self.assertEqual(self.pipeline.generator.calls, 1)
+
+    def test_cached_sources_are_references(self):
+        """Test the cache keeps chunk keys and a hit resolves them from the index"""
+        first = self.pipeline.process_query("What is Section 420 law?")
+        self.cache_all()
+        [(_, cached)] = list(self.pipeline.ltm.response_cache.items())
+        result = self.pipeline.process_query("What is Section 420 law?")
+
+        self.assertEqual([key for key, _ in cached['sources']],
+                         [ref['chunk_key'] for ref in first['source_refs']])
+        self.assertEqual(result['cache_hit'], 'exact')
+        self.assertEqual(result['sources'], first['sources'])
+        self.assertEqual(result['source_refs'], first['source_refs'])
+
+    def test_payload_sends_references(self):
+        """Test API payloads carry source references, and texts only on request"""
+        result = self.pipeline.process_query("What is Section 420 law?")
+        lean = build_payload(result)
+        full = build_payload(result, include_text=True, include_enriched_query=True)
+
+        self.assertEqual(lean['sources'][0]['id'], 'IPC_420')
+        self.assertNotIn('text', lean['sources'][0])
+        self.assertNotIn('enriched_query', lean)
+        self.assertEqual([source['text'] for source in full['sources']],
+                         [doc for doc, _ in result['sources']])
+        self.assertEqual(full['enriched_query'], result['enriched_query'])
+        error = {'query': "q", 'error': True}
+        self.assertIs(build_payload(error), error)
+
+    def test_reingest_invalidates_changed_sources(self):
+        """Test re-ingest drops answers whose source chunks changed"""
+        self.pipeline.process_query("What is Section 420 law?")
+        self.cache_all()
+
+        changed = ["Section 420 was amended by the new criminal code.", self.documents[1]]
+        self.pipeline.ingest_documents(changed, self.metadata)
+        result = self.pipeline.process_query("What is Section 420 law?")
+
+        self.assertIsNone(result['cache_hit'])
+        self.assertEqual(self.pipeline.generator.calls, 2)
+
+    def test_answer_from_replaced_index_not_cached(self):
+        """Test an answer finishing after a re-ingest is returned but not cached"""
+        self.pipeline.generator = BlockingGenerator()
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(
+            self.pipeline.process_query("What is Section 420 law?")))
+        thread.start()
+        deadline = time.time() + 5
+        while self.pipeline.generator.attempts == 0 and time.time() < deadline:
+            time.sleep(0.005)
+
+        changed = ["Section 420 was amended by the new criminal code.", self.documents[1]]
+        self.pipeline.ingest_documents(changed, self.metadata)
+        self.pipeline.generator.release.set()
+        thread.join()
+
+        self.assertEqual(result['response'], "Answer 1")
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 0)
+
+    def test_saved_index_loads_mapped(self):
+        """Test a pipeline serving a memory-mapped snapshot answers like the original"""
+        expected = self.pipeline.retrieve("What is the law on punishment for murder?")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.pipeline.save_index(tmp)
+            other = RAGPipeline()
+            other.generator = StubGenerator()
+            other.load_index(tmp, mmap=True)
+            result = other.retrieve("What is the law on punishment for murder?")
+
+            self.assertIsInstance(other.documents, MappedTexts)
+            self.assertEqual(list(other.documents), self.documents)
+            self.assertEqual(result['sources'], expected['sources'])
+            self.assertEqual(other.citation_index.lookup(['IPC_420']), [0])
+            other.sessions.close()
+            del other, result
+
+    def test_resave_keeps_loaded_snapshot_readable(self):
+        """Test rebuilding a snapshot in place leaves workers mapping the old one intact"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self.pipeline.save_index(tmp)
+            other = RAGPipeline()
+            other.generator = StubGenerator()
+            other.load_index(tmp, mmap=True)
+            old = other.snapshot
+            expected = other.retrieve("What is the law on punishment for murder?")['sources']
+
+            self.pipeline.ingest_documents(["A much shorter corpus."], [{'id': 'X_1'}])
+            self.pipeline.save_index(tmp)
+
+            self.assertEqual(list(old.documents), self.documents)
+            self.assertEqual(other.retrieve("What is the law on punishment for murder?")['sources'],
+                             expected)
+            self.assertEqual(sorted(p.name for p in Path(tmp).parent.glob(f".{Path(tmp).name}.*")), [])
+
+            other.load_index(tmp, mmap=True)
+            self.assertEqual(list(other.documents), ["A much shorter corpus."])
+            other.sessions.close()
+            del other, old
+
+    def test_citation_fast_path(self):
+        """Test exact citations bypass embedding and hybrid search"""
+        def fail(*args, **kwargs):
+            raise AssertionError("dense retrieval should be skipped")
+        self.pipeline.embedder.embed_text = fail
+        self.pipeline.embedder.embed_texts = fail
+        self.pipeline.retriever.search_ids = fail
+        self.pipeline.retriever.search_ids_batch = fail
+
+        result = self.pipeline.process_query("What does Section 420 IPC say?")
+
+        self.assertTrue(result['citation_lookup'])
+        self.assertEqual(result['enriched_query']['entities']['citations'], ['IPC_420'])
+        self.assertEqual([doc for doc, _ in result['sources']], [self.documents[0]])
+
+    def test_stream_events(self):
+        """Test retrieval is sent first, then tokens, then the full result"""
+        events = list(self.pipeline.process_query_stream("What is Section 302 law?", session_id="s1"))
+
+        self.assertEqual([e['event'] for e in events], ['retrieval', 'preview', 'token', 'token', 'done'])
+        self.assertTrue(events[0]['data']['sources'])
+        self.assertIn("[IPC_302]", events[1]['data']['text'])
+        self.assertIsNone(events[0]['data']['response'])
+        self.assertEqual(events[-1]['data']['response'], "Answer 1")
+        self.assertEqual(len(self.pipeline.get_session_history("s1")), 1)
+
+    def test_abandoned_stream_is_not_stored(self):
+        """Test memory is only written once the stream completes"""
+        stream = self.pipeline.process_query_stream("What is Section 302 law?", session_id="s1")
+        next(stream)
+        next(stream)
+        stream.close()
+
+        self.assertEqual(self.pipeline.get_session_history("s1"), [])
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 0)
+
+    def test_history_is_per_session(self):
+        """Test turns are recorded in the calling session only"""
+        self.pipeline.process_query("What is Section 420 law?", session_id="s1")
+        self.pipeline.process_query("What is Section 302 law?", session_id="s2")
+
+        history = self.pipeline.get_session_history("s1")
+        self.assertEqual([turn['query'] for turn in history], ["What is Section 420 law?"])
+        self.assertEqual(len(self.pipeline.stm.history), 0)
+
+    def test_duplicate_chunks_sent_once(self):
+        """Test the same text ingested twice reaches the prompt once"""
+        self.pipeline.ingest_documents(self.documents * 2, self.metadata + [{'id': 'IPC_420_copy'},
+                                                                            {'id': 'IPC_302_copy'}])
+        result = self.pipeline.process_query("What is the law on murder and cheating?")
+
+        texts = [doc for doc, _ in result['sources']]
+        self.assertEqual(sorted(texts), sorted(self.documents))
+        self.assertLessEqual(result['context_tokens'], self.pipeline.context_assembler.max_tokens)
+
+    def run_concurrently(self, query, count):
+        results = [None] * count
+
+        def ask(i):
+            try:
+                results[i] = self.pipeline.process_query(query, session_id=f"s{i}")
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 5
+        while self.pipeline.single_flight.stats()['followers'] < count - 1 and time.time() < deadline:
+            time.sleep(0.005)
+        self.pipeline.generator.release.set()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_identical_queries_coalesced(self):
+        """Test concurrent identical queries share one LLM call"""
+        self.pipeline.generator = BlockingGenerator()
+        results = self.run_concurrently("What is Section 302 law?", 4)
+
+        self.assertEqual(self.pipeline.generator.calls, 1)
+        self.assertEqual({r['response'] for r in results}, {"Answer 1"})
+        self.assertEqual(sorted(str(r['cache_hit']) for r in results),
+                         ['None', 'coalesced', 'coalesced', 'coalesced'])
+        self.assertEqual(len(self.pipeline.get_session_history("s3")), 1)
+        self.assertEqual(len(self.pipeline.single_flight), 0)
+
+    def test_coalesced_failure_shared(self):
+        """Test followers share the leader's failure and fall back without retrying"""
+        self.pipeline.generator = BlockingGenerator(error=LLMException("provider down"))
+        results = self.run_concurrently("What is Section 302 law?", 3)
+
+        self.assertEqual([r['degraded'] for r in results], ['llm_unavailable'] * 3)
+        self.assertEqual(self.pipeline.generator.attempts, 1)
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 0)
+
+    def test_batch_results_in_order(self):
+        """Test a batch embeds once and answers every query in input order"""
+        embed_texts = self.pipeline.embedder.embed_texts
+        batches = []
+        self.pipeline.embedder.embed_texts = lambda texts, **kwargs: batches.append(texts) or embed_texts(texts)
+        queries = ["What is the law on cheating?", "What is the weather today?",
+                   "What does Section 420 IPC say?", "What is the bail procedure law?"]
+
+        results = list(self.pipeline.process_query_batch(queries, session_id="s1"))
+
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(sorted(batches[0]), sorted([queries[0], queries[3]]))
+        self.assertIsInstance(results[1], InvalidQueryException)
+        self.assertEqual([r['query'] for r in results if isinstance(r, dict)],
+                         [queries[0], queries[2], queries[3]])
+        self.assertTrue(results[2]['citation_lookup'])
+        self.assertEqual(self.pipeline.generator.calls, 3)
+        self.assertEqual(len(self.pipeline.get_session_history("s1")), 3)
+
+    def test_batch_duplicates_coalesced(self):
+        """Test identical queries in one batch share a generation"""
+        self.pipeline.generator = BlockingGenerator()
+        results = []
+        worker = threading.Thread(target=lambda: results.extend(
+            self.pipeline.process_query_batch(["What is Section 302 law?"] * 3)))
+        worker.start()
+        deadline = time.time() + 5
+        while self.pipeline.single_flight.stats()['followers'] < 2 and time.time() < deadline:
+            time.sleep(0.005)
+        self.pipeline.generator.release.set()
+        worker.join()
+
+        self.assertEqual(self.pipeline.generator.calls, 1)
+        self.assertEqual([r['response'] for r in results], ["Answer 1"] * 3)
+
+    def test_async_query(self):
+        """Test the async path answers and records like process_query"""
+        result = asyncio.run(self.pipeline.aprocess_query("What is the law on cheating?", session_id="s1"))
+
+        self.assertEqual(result['response'], "Answer 1")
+        self.assertTrue(result['sources'])
+        self.assertEqual(len(self.pipeline.get_session_history("s1")), 1)
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 1)
+
+    def test_async_queries_coalesced(self):
+        """Test concurrent async identical queries share one LLM call"""
+        async def run():
+            self.pipeline.generator = AsyncBlockingGenerator()
+            tasks = [asyncio.create_task(self.pipeline.aprocess_query("What is Section 302 law?"))
+                     for _ in range(4)]
+            deadline = time.time() + 5
+            while self.pipeline.single_flight.stats()['followers'] < 3 and time.time() < deadline:
+                await asyncio.sleep(0.005)
+            self.pipeline.generator.release.set()
+            return await asyncio.gather(*tasks)
+
+        results = asyncio.run(run())
+
+        self.assertEqual(self.pipeline.generator.calls, 1)
+        self.assertEqual({r['response'] for r in results}, {"Answer 1"})
+        self.assertEqual(sorted(str(r['cache_hit']) for r in results),
+                         ['None', 'coalesced', 'coalesced', 'coalesced'])
+
+    def test_retrieve_only(self):
+        """Test retrieval-only mode returns sources without generating"""
+        result = self.pipeline.retrieve("What is the law on cheating?", session_id="s1")
+
+        self.assertIsNone(result['response'])
+        self.assertTrue(result['sources'])
+        self.assertEqual(self.pipeline.generator.calls, 0)
+        self.assertEqual(self.pipeline.get_session_history("s1"), [])
+
+    def test_two_phase_generation(self):
+        """Test the answer is generated in the background after retrieval"""
+        manager = GenerationJobManager()
+        self.addCleanup(manager.shutdown)
+        events = self.pipeline.process_query_stream("What is Section 302 law?", session_id="s1")
+        retrieval = next(events)
+
+        job = wait_for(manager.submit(events))
+
+        self.assertEqual(retrieval['event'], 'retrieval')
+        self.assertTrue(retrieval['data']['sources'])
+        self.assertEqual(job.to_dict()['response'], "Answer 1")
+        self.assertEqual(len(self.pipeline.get_session_history("s1")), 1)
+
+    def test_exhausted_budget_degrades(self):
+        """Test a query out of time skips embedding and the LLM but lists sections"""
+        result = self.pipeline.process_query("What is the law on cheating?", session_id="s1", budget=0)
+
+        self.assertTrue(result['degraded'])
+        self.assertEqual(result['skipped_stages'], ['embedding', 'generation'])
+        self.assertEqual(self.pipeline.generator.calls, 0)
+        self.assertTrue(result['sources'])
+        self.assertIn("IPC_420", result['response'])
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 0)
+        self.assertEqual(len(self.pipeline.get_session_history("s1")), 1)
+
+    def test_generation_deadline_degrades(self):
+        """Test an LLM call cut off by the deadline degrades instead of failing"""
+        def slow(query, context, query_type="qa", deadline=None):
+            time.sleep(max(0.0, deadline - time.monotonic()))
+            raise LLMException("LLM deadline exceeded")
+        self.pipeline.generator.generate_with_context = slow
+        self.pipeline.min_generation_budget = 0
+
+        result = self.pipeline.process_query("What is Section 302 law?", budget=0.05)
+
+        self.assertTrue(result['degraded'])
+        self.assertEqual(result['skipped_stages'], ['generation'])
+        self.assertEqual(len(self.pipeline.single_flight), 0)
+
+    def test_stream_degrades(self):
+        """Test a stream out of time sends the sections as its only token"""
+        events = list(self.pipeline.process_query_stream("What is Section 302 law?", budget=0))
+
+        self.assertEqual([e['event'] for e in events], ['retrieval', 'token', 'done'])
+        self.assertTrue(events[-1]['data']['degraded'])
+        self.assertEqual(events[1]['data']['text'], events[-1]['data']['response'])
+
+    def test_llm_failure_falls_back(self):
+        """Test a failed generation answers from the sections and is not cached"""
+        def unavailable(*args, **kwargs):
+            raise LLMException("LLM provider unavailable (circuit open)")
+        self.pipeline.generator.generate_with_context = unavailable
+
+        result = self.pipeline.process_query("What is the law on cheating?")
+
+        self.assertEqual(result['degraded'], 'llm_unavailable')
+        self.assertIn("dishonestly inducing delivery of property. [IPC_420]", result['response'])
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 0)
+
+    def test_llm_failure_is_not_cached(self):
+        """Test a failed generation raises and leaves memory untouched without fallback"""
+        def unavailable(*args, **kwargs):
+            raise LLMException("LLM provider unavailable (circuit open)")
+        self.pipeline.generator.generate_with_context = unavailable
+        self.pipeline.llm_fallback = False
+
+        with self.assertRaises(LLMException):
+            self.pipeline.process_query("What is Section 302 law?", session_id="s1")
+
+        self.assertEqual(self.pipeline.ltm.get_response_cache_size(), 0)
+        self.assertEqual(self.pipeline.get_session_history("s1"), [])
+
+
+class TestConcurrentPipeline(unittest.TestCase):
+    """Stress chat and ingest running at the same time"""
+
+    corpus_a = ["Section 420 deals with cheating and dishonestly inducing delivery of property.",
+                "Section 302 prescribes punishment for murder."]
+    corpus_b = ["Section 420 was amended by the new criminal code to cover online fraud.",
+                "Section 302 now reads as Section 101 of the new criminal code."]
+    metadata = [{'id': 'IPC_420'}, {'id': 'IPC_302'}]
+    queries = ["What is Section 420 IPC?", "What is the law on cheating?",
+               "What is the punishment for murder law?"]
+
+    def setUp(self):
+        try:
+            self.pipeline = RAGPipeline()
+        except ImportError:
+            self.skipTest("FAISS not installed")
+        self.pipeline.generator = StubGenerator()
+        self.pipeline.ingest_documents(self.corpus_a, self.metadata)
+
+    def test_chat_during_ingest(self):
+        """Test queries see one whole index and no stale answer stays cached"""
+        errors = []
+        stop = threading.Event()
+
+        def chat(worker):
+            try:
+                for i in range(40):
+                    query = self.queries[i % len(self.queries)]
+                    if i % 4 == 3:
+                        result = list(self.pipeline.process_query_stream(query, f"s{worker}"))[-1]['data']
+                    else:
+                        result = self.pipeline.process_query(query, session_id=f"s{worker}")
+                    if result['cache_hit'] is None:
+                        texts = {doc for doc, _ in result['sources']}
+                        if not (texts <= set(self.corpus_a) or texts <= set(self.corpus_b)):
+                            errors.append(f"mixed sources: {texts}")
+                    self.pipeline.get_session_history(f"s{worker}")
+            except Exception as e:
+                errors.append(repr(e))
+
+        def ingest():
+            try:
+                corpora = [self.corpus_b, self.corpus_a]
+                i = 0
+                while not stop.is_set():
+                    self.pipeline.ingest_documents(corpora[i % 2], self.metadata)
+                    self.pipeline.get_pipeline_stats()
+                    i += 1
+            except Exception as e:
+                errors.append(repr(e))
+
+        ingester = threading.Thread(target=ingest)
+        workers = [threading.Thread(target=chat, args=(w,)) for w in range(8)]
+        ingester.start()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        stop.set()
+        ingester.join()
+
+        self.assertEqual(errors, [])
+        self.assertGreater(self.pipeline.snapshot.version, 1)
+        live_chunks = self.pipeline.snapshot.live_chunks
+        for _, cached in self.pipeline.ltm.response_cache.items():
+            for chunk_key, fingerprint in cached['source_chunks'].items():
+                self.assertEqual(live_chunks.get(chunk_key), fingerprint)
+        self.assertEqual(len(self.pipeline.get_session_history("s0")), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
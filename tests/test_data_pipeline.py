@@ -0,0 +1,58 @@
+"""
+Unit Tests - Data Pipeline
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import unittest
+from src.data_pipeline import DocumentChunker, ChunkMetadataStore
+
+
+class TestChunkMetadataStore(unittest.TestCase):
+    """Test columnar metadata store"""
+
+    def setUp(self):
+        self.store = ChunkMetadataStore()
+        self.store.append({'id': 'IPC_420', 'title': 'Indian Penal Code - Section 420',
+                           'category': 'Criminal Law', 'jurisdiction': 'India', 'year': 1860,
+                           'doc_id': 0, 'chunk_id': 0}, key='IPC_420_chunk_0')
+        self.store.append({'id': 'ICA_1', 'category': 'Contract Law', 'jurisdiction': 'India',
+                           'source': 'Case Law Database', 'notes': ['amended']})
+
+    def test_round_trip(self):
+        """Test rows materialise with their original values"""
+        row = self.store.get_by_key('IPC_420_chunk_0')
+        self.assertEqual(row['title'], 'Indian Penal Code - Section 420')
+        self.assertEqual(row['year'], 1860)
+        self.assertIn('stored_at', row)
+
+        other = self.store.get(1)
+        self.assertEqual(other['source'], 'Case Law Database')
+        self.assertEqual(other['notes'], ['amended'])
+        self.assertNotIn('year', other)
+
+    def test_columns_and_masks(self):
+        """Test vectorised access to columns"""
+        self.assertEqual(list(self.store.mask(category='Criminal Law')), [True, False])
+        self.assertEqual(list(self.store.mask(jurisdiction='India')), [True, True])
+        self.assertEqual(self.store.column('year')[0], 1860)
+        self.assertEqual(len(self.store.categorical_columns['jurisdiction'].categories), 1)
+
+
+class TestDocumentChunker(unittest.TestCase):
+    """Test document chunker"""
+
+    def test_chunk_offsets(self):
+        """Test chunk offsets point back into the document"""
+        chunker = DocumentChunker(chunk_size=60, overlap=20)
+        document = ("Whoever cheats shall be punished. The term may extend to seven years. "
+                    "The offender shall also be liable to fine. Attempts are punishable.")
+
+        for chunk, start, end in chunker.chunk_with_offsets(document):
+            self.assertGreaterEqual(start, 0)
+            self.assertEqual(document[start:end], chunk)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,369 @@
+"""
+Unit Tests - LLM Client
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import threading
+import time
+import unittest
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.llm import (HTTPConnectionPool, ResponseGenerator, LLMExecutor, CircuitBreaker,
+                     LLMConfig, GeminiBackend, OpenAICompatibleBackend, ExtractiveAnswerGenerator)
+from src.llm.stub_server import StubLLMServer, StubConfig, parse_distribution
+from src.utils import LLMException
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Keep-alive handler that reports which connection served the request"""
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        reply = b"%d:%s" % (self.client_address[1], body)
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+        # Simulate an idle timeout: drop the connection without announcing it
+        self.close_connection = body == b"bye"
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHTTPConnectionPool(unittest.TestCase):
+    """Test keep-alive connection pool"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), EchoHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.pool = HTTPConnectionPool(f"http://{host}:{port}/v1", max_connections=2, timeout=5)
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reused(self):
+        """Test sequential requests share one connection"""
+        ports = {self.pool.request('POST', '/chat', body=b"q").body.split(b":")[0]
+                 for _ in range(5)}
+        self.assertEqual(len(ports), 1)
+        self.assertEqual(self.pool.stats()['connections_created'], 1)
+
+    def test_stale_connection_retried(self):
+        """Test a connection closed while idle is replaced transparently"""
+        self.pool.request('POST', '/chat', body=b"bye")
+        response = self.pool.request('POST', '/chat', body=b"again")
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.body.endswith(b"again"))
+        self.assertEqual(self.pool.stats()['connections_created'], 2)
+
+    def test_pool_is_bounded(self):
+        """Test callers time out when every connection is checked out"""
+        with self.pool.stream('POST', '/chat', body=b"a"):
+            with self.pool.stream('POST', '/chat', body=b"b"):
+                with self.assertRaises(TimeoutError):
+                    self.pool.request('POST', '/chat', body=b"c", timeout=0.05)
+
+
+class ProviderError(Exception):
+    """Error carrying an HTTP-style status code, like google.api_core errors"""
+
+    def __init__(self, code):
+        super().__init__(f"status {code}")
+        self.code = code
+
+
+class TestLLMExecutor(unittest.TestCase):
+    """Test retries, deadlines, concurrency limit and circuit breaker"""
+
+    def setUp(self):
+        self.executor = LLMExecutor(max_concurrency=2, max_retries=2, timeout=1.0,
+                                    base_delay=0.001, max_delay=0.01,
+                                    breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+
+    def tearDown(self):
+        self.executor.close()
+
+    def test_transient_errors_retried(self):
+        """Test throttling errors are retried until success"""
+        outcomes = [ProviderError(429), ProviderError(503), "answer"]
+
+        def call(timeout):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        self.assertEqual(self.executor.run(call), "answer")
+        self.assertEqual(self.executor.stats()['retries'], 2)
+
+    def test_client_errors_fail_fast_and_typed(self):
+        """Test bad requests are not retried and surface as LLMException"""
+        calls = []
+
+        def call(timeout):
+            calls.append(timeout)
+            raise ProviderError(400)
+
+        with self.assertRaises(LLMException):
+            self.executor.run(call)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(self.executor.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_circuit_opens(self):
+        """Test repeated provider failures open the circuit and reject calls"""
+        calls = []
+
+        def call(timeout):
+            calls.append(timeout)
+            raise ProviderError(503)
+
+        with self.assertRaises(LLMException):
+            self.executor.run(call)
+        with self.assertRaises(LLMException):
+            self.executor.run(call)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.executor.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.executor.stats()['rejected'], 1)
+
+    def test_deadline_bounds_attempts(self):
+        """Test a slow call is cut off at the caller's deadline"""
+        start = time.monotonic()
+        with self.assertRaises(LLMException):
+            self.executor.run(lambda timeout: time.sleep(0.5), deadline=start + 0.1)
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_concurrency_limit(self):
+        """Test no more than max_concurrency calls run at once"""
+        lock = threading.Lock()
+        active, peak = [0], [0]
+
+        def call(timeout):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.02)
+            with lock:
+                active[0] -= 1
+            return "ok"
+
+        threads = [threading.Thread(target=self.executor.run, args=(call,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak[0], 2)
+
+    def test_stream_retries_before_first_chunk(self):
+        """Test opening a stream is retried and the slot is released after it"""
+        attempts = []
+
+        def open_stream(timeout):
+            attempts.append(timeout)
+            if len(attempts) == 1:
+                raise ConnectionResetError("reset")
+            return iter(["a", "b"])
+
+        self.assertEqual(list(self.executor.stream(open_stream)), ["a", "b"])
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(self.executor.run(lambda timeout: "next"), "next")
+
+    def test_timed_out_calls_keep_their_slots(self):
+        """Test a call that outlives its timeout holds its slot until it returns"""
+        executor = LLMExecutor(max_concurrency=2, max_retries=0, timeout=0.2)
+        self.addCleanup(executor.close)
+        errors = []
+
+        def slow(timeout):
+            time.sleep(0.5)
+            return "late"
+
+        def run_slow():
+            try:
+                executor.run(slow)
+            except LLMException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=run_slow) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 2)
+
+        # Both slots are busy until the slow calls return; then the next call
+        # runs with its full timeout instead of timing out queued behind them
+        start = time.monotonic()
+        self.assertEqual(executor.run(lambda timeout: "ok"), "ok")
+        self.assertGreater(time.monotonic() - start, 0.2)
+
+    def test_stream_closed_after_executor(self):
+        """Test ending a stream after close() does not fail"""
+        stream = self.executor.stream(lambda timeout: iter(["a", "b"]))
+        self.assertEqual(next(stream), "a")
+        self.executor.close()
+        stream.close()
+
+
+class FakeModel:
+    def __init__(self, name, generation_config=None):
+        self.generation_config = generation_config
+        self.calls = []
+
+    def generate_content(self, prompt, stream=False, request_options=None):
+        self.calls.append(request_options)
+        return type('Response', (), {'text': f"answer to {prompt}"})()
+
+
+class FakeClient:
+    def __init__(self):
+        self.models = []
+
+    def GenerativeModel(self, name, generation_config=None):
+        model = FakeModel(name, generation_config)
+        self.models.append(model)
+        return model
+
+
+class TestResponseGenerator(unittest.TestCase):
+    """Test model handle reuse"""
+
+    def test_model_built_once(self):
+        """Test one model handle serves every call with a per-call timeout"""
+        client = FakeClient()
+        generator = ResponseGenerator(GeminiBackend(LLMConfig(), client=client))
+        generator.executor.timeout = 12.5
+
+        threads = [threading.Thread(target=generator.generate, args=(f"q{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(client.models), 1)
+        model = client.models[0]
+        self.assertEqual(len(model.calls), 8)
+        self.assertEqual(model.calls[0], {'timeout': 12.5})
+        self.assertEqual(model.generation_config['top_k'], generator.config.top_k)
+
+
+class TestOpenAICompatibleBackend(unittest.TestCase):
+    """Test the HTTP backend against the local stub server"""
+
+    def start_stub(self, **options):
+        server = StubLLMServer(config=StubConfig(**options)).start()
+        self.addCleanup(server.stop)
+        config = LLMConfig()
+        config.base_url = server.base_url
+        config.model = 'stub'
+        backend = OpenAICompatibleBackend(config)
+        self.addCleanup(backend.close)
+        generator = ResponseGenerator(backend)
+        generator.executor.base_delay = generator.executor.max_delay = 0.001
+        self.addCleanup(generator.executor.close)
+        return server, generator
+
+    def test_generate_and_stream_agree(self):
+        """Test deterministic completions, streamed or not, over one connection"""
+        server, generator = self.start_stub(output_tokens="fixed:12")
+        answer = generator.generate("What is Section 420 IPC?")
+
+        self.assertEqual(len(answer.split()), 12)
+        self.assertEqual(generator.generate("What is Section 420 IPC?"), answer)
+        self.assertEqual("".join(generator.generate_stream("What is Section 420 IPC?")), answer)
+        self.assertEqual(generator.backend.pool.stats()['connections_created'], 1)
+
+    def test_server_errors_retried_then_typed(self):
+        """Test 503s are retried and end in LLMException with the status"""
+        server, generator = self.start_stub(error_rate=1.0)
+        with self.assertRaises(LLMException) as caught:
+            generator.generate("What is Section 420 IPC?")
+
+        self.assertEqual(caught.exception.code, 503)
+        self.assertEqual(server.requests_served, generator.config.max_retries + 1)
+
+    def test_distribution_specs(self):
+        """Test latency distribution parsing"""
+        import random
+        rng = random.Random(0)
+        self.assertEqual(parse_distribution("fixed:0.25")(rng), 0.25)
+        self.assertTrue(0.1 <= parse_distribution("uniform:0.1,0.2")(rng) <= 0.2)
+        self.assertGreater(parse_distribution("lognormal:0.4,0.5")(rng), 0)
+        with self.assertRaises(ValueError):
+            parse_distribution("gamma:1")
+
+
+class KeywordEmbedder:
+    """Embeds texts as counts of a few fixed words"""
+
+    model = 'keywords'
+    words = ('cheat', 'murder', 'bail', 'fine')
+
+    def __init__(self):
+        self.calls = 0
+
+    def embed_texts(self, texts):
+        self.calls += 1
+        return [np.array([text.lower().count(w) for w in self.words], dtype=float) for text in texts]
+
+
+class TestExtractiveAnswerGenerator(unittest.TestCase):
+    """Test local extractive answers"""
+
+    sources = [
+        ("Section 420 covers fraud. Whoever cheats shall be punished with imprisonment. "
+         "The offence is non-bailable.", 0.9),
+        ("Section 302 covers murder. Whoever commits murder shall be punished with death.", 0.5)
+    ]
+
+    def test_cites_best_sentences(self):
+        """Test the most relevant sentences are quoted with their section"""
+        generator = ExtractiveAnswerGenerator(max_sentences=2)
+        answer = generator.generate("What is the punishment for murder?", self.sources, ['IPC_420', 'IPC_302'])
+
+        self.assertIn("- Whoever commits murder shall be punished with death. [IPC_302]", answer)
+        self.assertEqual(answer.count("\n- "), 2)
+
+    def test_scores_with_query_embedding(self):
+        """Test sentences are ranked by embedding and embedded once per chunk"""
+        embedder = KeywordEmbedder()
+        generator = ExtractiveAnswerGenerator(embedder, max_sentences=1)
+        query_embedding = np.array([1.0, 0.0, 0.0, 0.0])
+
+        for _ in range(3):
+            selected = generator.select("anything", self.sources, query_embedding)
+
+        self.assertEqual(selected, [(0, "Whoever cheats shall be punished with imprisonment.")])
+        self.assertEqual(embedder.calls, 2)
+
+    def test_no_query_embedding_skips_sentence_embeddings(self):
+        """Test sentences are scored by term overlap, not embedded, without a query embedding"""
+        embedder = KeywordEmbedder()
+        generator = ExtractiveAnswerGenerator(embedder, max_sentences=1)
+
+        selected = generator.select("Is murder punished with death?", self.sources)
+
+        self.assertEqual(selected, [(1, "Whoever commits murder shall be punished with death.")])
+        self.assertEqual(embedder.calls, 0)
+
+        # The sentence split is reused when an embedding arrives later
+        generator.select("anything", self.sources, np.array([1.0, 0.0, 0.0, 0.0]))
+        self.assertEqual(embedder.calls, 2)
+
+    def test_no_sources(self):
+        """Test an empty retrieval gives the standard no-results answer"""
+        answer = ExtractiveAnswerGenerator().generate("What is bail?", [])
+        self.assertEqual(answer, "No relevant legal documents found for your query.")
+
+
+if __name__ == '__main__':
+    unittest.main()
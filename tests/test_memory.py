@@ -5,8 +5,18 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import json
+import os
+import sqlite3
+import tempfile
+import time
 import unittest
-from src.memory import ShortTermMemory, LongTermMemory
+from unittest import mock
+import numpy as np
+import pytest
+from src.memory import long_term_memory
+from src.memory import (ShortTermMemory, LongTermMemory, ResponseCache, SemanticCache, SessionStore,
+                        build_cache_key)
 
 
 class TestShortTermMemory(unittest.TestCase):
@@ -35,6 +45,87 @@ class TestShortTermMemory(unittest.TestCase):
         context = self.memory.get_context()
         self.assertIn("Q1", context)
         self.assertIn("A1", context)
+    
+    def test_context_lookback(self):
+        """Test only the most recent turns are included"""
+        for i in range(5):
+            self.memory.add_turn(f"Q{i}", f"A{i}")
+        
+        context = self.memory.get_context(lookback=2)
+        self.assertNotIn("Q2", context)
+        self.assertIn("Q3", context)
+        self.assertIn("A4", context)
+
+
+class TestSessionStore(unittest.TestCase):
+    """Test per-session memory store"""
+    
+    def test_sessions_are_isolated(self):
+        """Test turns are recorded per session"""
+        store = SessionStore(sweep_interval=0)
+        store.add_turn("s1", "Q1", "A1")
+        store.add_turn("s2", "Q2", "A2")
+        
+        self.assertEqual([t['query'] for t in store.get_history("s1")], ["Q1"])
+        self.assertEqual([t['query'] for t in store.get_history("s2")], ["Q2"])
+        self.assertEqual(store.get_history("unknown"), [])
+    
+    def test_lru_eviction(self):
+        """Test least recently used session is evicted at capacity"""
+        store = SessionStore(max_sessions=2, sweep_interval=0)
+        store.get("s1")
+        store.get("s2")
+        store.get("s1")
+        store.get("s3")
+        
+        self.assertIn("s1", store)
+        self.assertNotIn("s2", store)
+        self.assertEqual(store.stats()['evictions'], 1)
+    
+    def test_sweep_expired(self):
+        """Test idle sessions are swept"""
+        store = SessionStore(ttl_seconds=60, sweep_interval=0)
+        store.add_turn("old", "Q", "A")
+        store.add_turn("new", "Q", "A")
+        store.get("old").history[-1].created_at -= 120
+        
+        self.assertEqual(store.sweep(), 1)
+        self.assertNotIn("old", store)
+        self.assertIn("new", store)
+    
+    def test_expired_session_not_revived(self):
+        """Test an expired session that was not swept yet starts afresh"""
+        store = SessionStore(ttl_seconds=60, sweep_interval=0)
+        store.add_turn("s1", "Q", "A")
+        store.get("s1").history[-1].created_at -= 120
+        
+        self.assertEqual(store.get_history("s1"), [])
+        self.assertNotIn("s1", store)
+        self.assertEqual(len(store.get("s1").history), 0)
+        self.assertEqual(store.stats()['expirations'], 1)
+    
+    def test_sweep_expired_without_turns(self):
+        """Test sessions that never got a turn expire from their creation"""
+        store = SessionStore(ttl_seconds=60, sweep_interval=0)
+        store.set_metadata("idle", "created_at", "2024-01-01T00:00:00")
+        store.get("fresh")
+        store.get("idle").created_at -= 120
+        
+        self.assertEqual(store.sweep(), 1)
+        self.assertNotIn("idle", store)
+        self.assertIn("fresh", store)
+    
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork not available")
+    def test_sweeper_restarted_after_fork(self):
+        """Test a forked worker gets its own sweeper thread"""
+        store = SessionStore(sweep_interval=60)
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if store._sweeper.is_alive() else 1)
+        _, status = os.waitpid(pid, 0)
+        store.close()
+        
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
 
 
 class TestLongTermMemory(unittest.TestCase):
@@ -70,6 +161,256 @@ class TestLongTermMemory(unittest.TestCase):
         self.assertIsNotNone(retrieved)
         self.assertEqual(retrieved['source'], 'Case Law Database')
 
+    def test_clear_old_cache(self):
+        """Test clearing cached responses by age"""
+        self.memory.store_response("old", "Old response")
+        self.memory.response_cache.put(
+            "old", self.memory.retrieve_response("old"),
+            stored_at=time.time() - 40 * 24 * 3600
+        )
+        self.memory.store_response("new", "New response")
+        
+        self.memory.clear_old_cache(days=30)
+        self.assertIsNone(self.memory.retrieve_response("old"))
+        self.assertIsNotNone(self.memory.retrieve_response("new"))
+
+    
+    def test_invalidate_changed_chunks(self):
+        """Test only responses citing changed chunks are invalidated"""
+        self.memory.store_response("q1", "A1", source_chunks={'IPC_420_chunk_0': 'aaa'})
+        self.memory.store_response("q2", "A2", source_chunks={'IPC_302_chunk_0': 'bbb'})
+        
+        invalidated = self.memory.invalidate_changed_chunks({
+            'IPC_420_chunk_0': 'changed',
+            'IPC_302_chunk_0': 'bbb'
+        })
+        
+        self.assertEqual(invalidated, 1)
+        self.assertIsNone(self.memory.retrieve_response("q1"))
+        self.assertIsNotNone(self.memory.retrieve_response("q2"))
+        self.assertNotIn('IPC_420_chunk_0', self.memory.chunk_references)
+
+    def assert_snapshot_round_trip(self) -> str:
+        """Save and restore a snapshot, returning the serializer it used"""
+        embeddings = np.random.rand(3, 384).astype(np.float32)
+        self.memory.store_embeddings(['c0', 'c1', 'c2'], embeddings)
+        self.memory.store_response("q1", "A1", [["c0", 0.9]], 0.9,
+                                   source_chunks={'c0': 'aaa'})
+        self.memory.store_document_metadata("c0", {'title': 'Section 420', 'year': 1860})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.memory.save(tmp)
+            serializer = json.loads((Path(tmp) / "manifest.json").read_text())['serializer']
+            restored = LongTermMemory()
+            restored.load(tmp)
+
+            np.testing.assert_array_equal(restored.retrieve_embedding('c1'), embeddings[1])
+            self.assertEqual(restored.retrieve_response("q1")['response'], "A1")
+            self.assertEqual(restored.retrieve_response("q1")['sources'], [["c0", 0.9]])
+            self.assertEqual(restored.get_document_metadata("c0")['year'], 1860)
+            self.assertIn('q1', restored.chunk_references['c0'])
+            del restored
+        return serializer
+
+    def test_snapshot_round_trip(self):
+        """Test snapshot restores embeddings, responses and metadata"""
+        self.assert_snapshot_round_trip()
+
+    def test_msgpack_snapshot_round_trip(self):
+        """Test the msgpack state file round-trips"""
+        pytest.importorskip("msgpack")
+        self.assertEqual(self.assert_snapshot_round_trip(), 'msgpack')
+
+    def test_json_snapshot_round_trip(self):
+        """Test the JSON fallback used without msgpack round-trips"""
+        with mock.patch.object(long_term_memory, 'msgpack', None):
+            self.assertEqual(self.assert_snapshot_round_trip(), 'json')
+
+
+class LockedOnce:
+    """SQLite connection whose first write fails as if another process held the lock"""
+    
+    def __init__(self, db):
+        self.db = db
+        self.failures = 1
+    
+    def executemany(self, *args):
+        if self.failures:
+            self.failures -= 1
+            raise sqlite3.OperationalError("database is locked")
+        return self.db.executemany(*args)
+    
+    def __enter__(self):
+        return self.db.__enter__()
+    
+    def __exit__(self, *exc):
+        return self.db.__exit__(*exc)
+    
+    def __getattr__(self, name):
+        return getattr(self.db, name)
+
+
+class TestResponseCache(unittest.TestCase):
+    """Test bounded response cache"""
+    
+    def test_lru_eviction(self):
+        """Test least recently used entry is evicted first"""
+        cache = ResponseCache(max_entries=2)
+        cache.put("a", {'response': 'A'})
+        cache.put("b", {'response': 'B'})
+        cache.get("a")
+        cache.put("c", {'response': 'C'})
+        
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertEqual(len(cache), 2)
+    
+    def test_byte_budget(self):
+        """Test byte budget bounds memory"""
+        cache = ResponseCache(max_bytes=1000)
+        for i in range(50):
+            cache.put(f"key_{i}", {'response': 'x' * 100})
+        
+        self.assertLessEqual(cache.total_bytes, 1000)
+        self.assertIn("key_49", cache)
+    
+    def test_oversize_replacement_drops_old_value(self):
+        """Test a value too big to cache does not leave the previous one served"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "cache.db")
+            cache = ResponseCache(max_bytes=200, db_path=db_path)
+            cache.put("q1", {'response': 'Old'})
+            cache.flush()
+            cache.put("q1", {'response': 'x' * 500})
+            
+            self.assertIsNone(cache.get("q1"))
+            self.assertEqual(cache.total_bytes, 0)
+            cache.close()
+            
+            restored = ResponseCache(db_path=db_path)
+            self.assertIsNone(restored.get("q1"))
+            restored.close()
+    
+    def test_byte_budget_counts_utf8_bytes(self):
+        """Test entry sizes are UTF-8 bytes, not characters"""
+        cache = ResponseCache()
+        value = {'response': 'धारा 420 के तहत धोखाधड़ी'}
+        cache.put("प्रश्न", value)
+        
+        payload = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+        self.assertEqual(cache.total_bytes, len(payload.encode('utf-8')) + len("प्रश्न".encode('utf-8')))
+        
+        cache = ResponseCache(max_bytes=1000)
+        for i in range(50):
+            cache.put(f"key_{i}", {'response': 'धारा' * 25})
+        self.assertLessEqual(cache.total_bytes, 1000)
+        self.assertEqual(len(cache), 3)
+    
+    def test_ttl_expiry(self):
+        """Test expired entries are not served"""
+        cache = ResponseCache(ttl_seconds=60)
+        cache.put("stale", {'response': 'S'}, stored_at=time.time() - 120)
+        cache.put("fresh", {'response': 'F'})
+        
+        self.assertIsNone(cache.get("stale"))
+        self.assertEqual(cache.purge_expired(), 0)
+        self.assertEqual(cache.get("fresh")['response'], 'F')
+    
+    def test_cache_key_normalisation(self):
+        """Test cache keys ignore case, spacing and trailing punctuation"""
+        key = build_cache_key("What is  Section 420?", "legal_data_retrieval", "v1")
+        self.assertEqual(key, build_cache_key("what is section 420", "legal_data_retrieval", "v1"))
+        self.assertNotEqual(key, build_cache_key("what is section 420", "legal_advice", "v1"))
+        self.assertNotEqual(key, build_cache_key("what is section 420", "legal_data_retrieval", "v2"))
+    
+    def test_sqlite_persistence(self):
+        """Test cache contents survive a restart"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "cache.db")
+            cache = ResponseCache(db_path=db_path)
+            cache.put("q1", {'response': 'Persisted'})
+            cache.close()
+            
+            restored = ResponseCache(db_path=db_path)
+            self.assertEqual(restored.get("q1")['response'], 'Persisted')
+            restored.close()
+    
+    def test_failed_flush_is_retried(self):
+        """Test writes survive a locked database and the flusher keeps running"""
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "cache.db")
+            cache = ResponseCache(db_path=db_path, flush_interval=0.01)
+            cache._db = LockedOnce(cache._db)
+            cache.put("q1", {'response': 'Persisted'})
+            
+            deadline = time.time() + 5
+            while cache._pending and time.time() < deadline:
+                time.sleep(0.01)
+            
+            self.assertEqual(cache._db.failures, 0)
+            self.assertTrue(cache._flusher.is_alive())
+            with sqlite3.connect(db_path) as db:
+                rows = db.execute("SELECT key FROM response_cache").fetchall()
+            self.assertEqual(rows, [("q1",)])
+            cache.close()
+
+
+class TestSemanticCache(unittest.TestCase):
+    """Test semantic response cache"""
+    
+    def setUp(self):
+        self.memory = LongTermMemory(embedding_dim=8, semantic_threshold=0.9)
+        self.embedding = np.array([1.0, 0.5, 0, 0, 0, 0, 0, 0.2])
+    
+    def test_paraphrase_hit(self):
+        """Test near-identical embedding returns the cached answer"""
+        self.memory.store_response("hash_a", "Section 420 covers cheating",
+                                   confidence=0.9, query_embedding=self.embedding,
+                                   category="legal_data_retrieval")
+        
+        similar = self.memory.retrieve_similar_response(
+            self.embedding + 0.01, "legal_data_retrieval")
+        self.assertIsNotNone(similar)
+        self.assertEqual(similar['response'], "Section 420 covers cheating")
+        self.assertGreater(similar['similarity'], 0.9)
+    
+    def test_category_mismatch(self):
+        """Test category must match for a hit"""
+        self.memory.store_response("hash_a", "Answer", query_embedding=self.embedding,
+                                   category="legal_advice")
+        self.assertIsNone(self.memory.retrieve_similar_response(self.embedding, "case_comparison"))
+    
+    def test_index_version_mismatch(self):
+        """Test answers built from another index version are not served, also after a reload"""
+        self.memory.store_response("hash_a", "Answer", query_embedding=self.embedding,
+                                   category="legal_advice", index_version="v1")
+        
+        self.assertIsNone(self.memory.retrieve_similar_response(
+            self.embedding, "legal_advice", index_version="v2"))
+        self.assertEqual(self.memory.retrieve_similar_response(
+            self.embedding, "legal_advice", index_version="v1")['response'], "Answer")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            self.memory.save(tmp)
+            restored = LongTermMemory(embedding_dim=8, semantic_threshold=0.9)
+            restored.load(tmp)
+        self.assertIsNone(restored.retrieve_similar_response(
+            self.embedding, "legal_advice", index_version="v2"))
+        self.assertIsNotNone(restored.retrieve_similar_response(
+            self.embedding, "legal_advice", index_version="v1"))
+    
+    def test_eviction_removes_vector(self):
+        """Test evicted responses leave the semantic index"""
+        self.memory.store_response("hash_a", "Answer", query_embedding=self.embedding)
+        self.memory.response_cache.delete("hash_a")
+        self.assertEqual(len(self.memory.semantic_cache), 0)
+    
+    def test_zero_embedding_ignored(self):
+        """Test placeholder embeddings are not indexed"""
+        cache = SemanticCache(dimension=8)
+        self.assertFalse(cache.add("k", np.zeros(8)))
+        self.assertIsNone(cache.lookup(np.zeros(8)))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -5,8 +5,57 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import threading
 import unittest
-from src.query_processing import QueryValidator, QueryCategorizer, QueryCategory
+import numpy as np
+from src.query_processing import (QueryValidator, QueryCategorizer, QueryCategory, QueryEnricher,
+                                  KeywordEngine, CentroidCategorizer)
+from src.query_processing.keyword_engine import tokenize
+
+# Queries the original substring-matching validator accepted; whole-word
+# matching must keep accepting them
+BASELINE_ACCEPTED = [
+    "What are the laws on theft?",
+    "Is it illegal to record calls?",
+    "What is a lawsuit?",
+    "crimes against women",
+    "Explain legally binding contracts",
+    "Can I file a lawsuit?",
+    "Is this lawful?",
+    "Is it unlawful to fire me?",
+    "Which acts apply here?",
+    "Show similar cases",
+    "List landmark judgments",
+    "Supreme Court rulings",
+    "Which courts hear this?",
+    "Do I need attorneys?",
+    "Find good lawyers",
+    "Contractual obligations",
+    "Breach of agreements",
+    "What torts exist?",
+    "Who are criminals?",
+    "Criminally liable?",
+    "Civil liabilities",
+    "Appeals process",
+    "Appealed verdicts",
+    "Serving subpoenas",
+    "Binding precedents",
+    "Overlapping jurisdictions",
+    "Safety regulations",
+    "Breached clauses",
+    "Statutes of limitation",
+    "Enacted in 2023?",
+    "Extortion threats",
+    "Custodial torture",
+    "Legality of strikes",
+    "Illegally parked?",
+    "Criminal penalties",
+    "Copyrights for books",
+    "Courtroom etiquette",
+    "Paralegal jobs",
+    "Evidences needed",
+    "Obligations of sellers",
+]
 
 
 class TestQueryValidator(unittest.TestCase):
@@ -31,6 +80,11 @@ class TestQueryValidator(unittest.TestCase):
         # This should not be valid for legal domain
         self.assertFalse(self.validator.is_valid(query))
     
+    def test_inflected_forms_accepted(self):
+        """Test plurals and derived forms of legal keywords still validate"""
+        rejected = [query for query in BASELINE_ACCEPTED if not self.validator.is_valid(query)]
+        self.assertEqual(rejected, [])
+    
     def test_validity_score(self):
         """Test validity score"""
         query = "What is the law on contract breach?"
@@ -67,6 +121,139 @@ class TestQueryCategorizer(unittest.TestCase):
         query = "Should I file a case in this situation?"
         category, _ = self.categorizer.categorize(query)
         self.assertEqual(category, QueryCategory.LEGAL_ADVICE)
+    
+    def test_inflected_forms(self):
+        """Test plurals and derived forms count as their base keyword"""
+        category, score = self.categorizer.categorize("What sections deal with murder?")
+        self.assertEqual(category, QueryCategory.LEGAL_DATA_RETRIEVAL)
+        self.assertGreater(score, 0)
+        
+        category, score = self.categorizer.categorize("Is dowry illegal?")
+        self.assertEqual(category, QueryCategory.LEGAL_ADVICE)
+        self.assertGreater(score, 0)
+        
+        # Forms of one keyword are still a single match
+        _, one = self.categorizer.categorize("Which section applies?")
+        _, both = self.categorizer.categorize("Which section and sections apply?")
+        self.assertEqual(one, both)
+
+
+class TestKeywordEngine(unittest.TestCase):
+    """Test single-pass keyword engine"""
+    
+    def setUp(self):
+        self.engine = KeywordEngine({
+            'legal': ['act', 'law', 'contract'],
+            'terms': ['summary', 'summary judgment', 'contract']
+        })
+    
+    def test_whole_word_matches(self):
+        """Test keywords do not match inside other words"""
+        analysis = self.engine.analyze("The contractor acted under the law")
+        self.assertEqual(analysis.keywords('legal'), ['law'])
+        self.assertFalse(analysis.has('terms'))
+    
+    def test_overlapping_phrases_and_shared_keywords(self):
+        """Test phrases, their prefixes and keywords in several lexicons"""
+        analysis = self.engine.analyze("Is summary judgment possible for a contract, contract law?")
+        self.assertEqual(analysis.keywords('terms'), ['summary', 'summary judgment', 'contract'])
+        self.assertEqual(analysis.count('legal'), 2)
+        self.assertEqual(analysis.word_count, 9)
+    
+    def test_concurrent_first_use(self):
+        """Test queries racing the lazy build all see a complete automaton"""
+        lexicons = {f"lexicon_{i}": [f"word{i}_{j}" for j in range(200)] for i in range(10)}
+        errors = []
+        
+        for _ in range(5):
+            engine = KeywordEngine(lexicons)
+            barrier = threading.Barrier(8)
+            
+            def analyze():
+                barrier.wait()
+                try:
+                    if engine.analyze("word3_7 and word9_199").count('lexicon_3') != 1:
+                        errors.append("missing match")
+                except Exception as e:
+                    errors.append(repr(e))
+            
+            threads = [threading.Thread(target=analyze) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        
+        self.assertEqual(errors, [])
+
+
+class TestQueryEnricher(unittest.TestCase):
+    """Test query enricher"""
+    
+    def setUp(self):
+        self.enricher = QueryEnricher()
+    
+    def test_jurisdiction(self):
+        """Test jurisdiction detection uses whole words"""
+        self.assertEqual(self.enricher.enrich("Company law in Australia")['jurisdiction'], 'Australia')
+        self.assertEqual(self.enricher.enrich("Business contract dispute")['jurisdiction'], 'General')
+        self.assertEqual(self.enricher.enrich("Section 420 IPC")['jurisdiction'], 'India')
+    
+    def test_entities_and_terms(self):
+        """Test section references and key terms"""
+        enriched = self.enricher.enrich("Is fraud under Section 420 a breach?")
+        self.assertEqual(enriched['entities']['acts'], ['420'])
+        self.assertEqual(enriched['key_terms'], ['fraud', 'breach'])
+    
+    def test_domain_inflected_forms(self):
+        """Test legal domains are detected from inflected forms"""
+        enriched = self.enricher.enrich("He was sentenced to 7 years for crimes of theft")
+        self.assertEqual(enriched['legal_domain'], ['criminal'])
+        self.assertEqual(self.enricher.enrich("Unpaid wages and strikes")['legal_domain'], ['labor'])
+
+
+
+class BagOfWordsEmbedder:
+    """Deterministic stand-in for the sentence embedding model"""
+
+    model = object()
+
+    def embed_text(self, text):
+        vector = np.zeros(64)
+        for token in tokenize(text):
+            vector[sum(map(ord, token)) % 64] += 1
+        return vector
+
+    def embed_texts(self, texts):
+        return [self.embed_text(text) for text in texts]
+
+
+class TestCentroidCategorizer(unittest.TestCase):
+    """Test embedding-based categorizer"""
+    
+    def setUp(self):
+        self.categorizer = CentroidCategorizer(BagOfWordsEmbedder())
+    
+    def test_nearest_centroid(self):
+        """Test queries are assigned to the closest category"""
+        category, confidence = self.categorizer.categorize("What is the punishment under Section 302?")
+        self.assertEqual(category, QueryCategory.LEGAL_DATA_RETRIEVAL)
+        self.assertGreater(confidence, 0.0)
+    
+    def test_batch_matches_single(self):
+        """Test batch mode agrees with single queries"""
+        queries = ["Find similar cases on negligence", "Summarize the judgment of this case"]
+        batch = self.categorizer.categorize_batch(queries)
+        for (category, confidence), query in zip(batch, queries):
+            single_category, single_confidence = self.categorizer.categorize(query)
+            self.assertEqual(category, single_category)
+            self.assertAlmostEqual(confidence, single_confidence, places=5)
+    
+    def test_fallback_without_model(self):
+        """Test keyword categorization is used when no model is loaded"""
+        categorizer = CentroidCategorizer(embedder=None)
+        query = "Compare Case A versus Case B"
+        self.assertEqual(categorizer.categorize(query), QueryCategorizer().categorize(query))
+        self.assertFalse(categorizer.uses_embeddings)
 
 
 if __name__ == '__main__':
@@ -5,9 +5,11 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+import tempfile
 import unittest
 import numpy as np
-from src.retrieval import FAISSRetriever, BM25Retriever, HybridRetriever
+from src.retrieval import FAISSRetriever, BM25Retriever, HybridRetriever, CitationIndex
+from src.data_pipeline import ChunkMetadataStore
 
 
 class TestFAISSRetriever(unittest.TestCase):
@@ -63,6 +65,19 @@ class TestBM25Retriever(unittest.TestCase):
         self.assertGreater(len(results), 0)
         self.assertEqual(len(results), 2)
 
+    def test_save_load_roundtrip(self):
+        """Test a memory-mapped index ranks and scores like the built one"""
+        docs = ["Section 420 deals with cheating", "Contract law is important",
+                "Cheating under section 415 and section 420", "Bail is the rule"]
+        self.retriever.add_documents(docs)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            self.retriever.save(tmp)
+            loaded = BM25Retriever.load(tmp, docs, mmap=True)
+            for query in ["section 420 cheating", "bail", "unknown words"]:
+                self.assertEqual(loaded.search_ids(query, k=3), self.retriever.search_ids(query, k=3))
+            del loaded
+
 
 class TestHybridRetriever(unittest.TestCase):
     """Test hybrid retriever"""
@@ -84,6 +99,66 @@ class TestHybridRetriever(unittest.TestCase):
         results = self.retriever.search("Section 420", query_embedding, k=2)
         self.assertEqual(len(results), 2)
 
+    def test_batch_search_matches_single(self):
+        """Test batched search returns what per-query search does"""
+        docs = ["Section 420 IPC", "Contract law basics", "Bail under CrPC"]
+        self.retriever.add_documents(docs, [np.random.randn(384) for _ in docs])
+        queries = ["Section 420", "contract", "bail"]
+        query_embeddings = np.random.randn(3, 384).astype('float32')
+        
+        batched = self.retriever.search_ids_batch(queries, query_embeddings, k=2)
+        
+        self.assertEqual(len(batched), 3)
+        for query, embedding, hits in zip(queries, query_embeddings, batched):
+            single = self.retriever.search_ids(query, embedding, k=2)
+            self.assertEqual([row for row, _ in hits], [row for row, _ in single])
+            np.testing.assert_allclose([s for _, s in hits], [s for _, s in single], rtol=1e-5)
+
+
+
+class TestCitationIndex(unittest.TestCase):
+    """Test exact citation lookup"""
+    
+    def setUp(self):
+        store = ChunkMetadataStore()
+        for doc_id, title in [('IPC_302', 'Indian Penal Code - Section 302'),
+                              ('IPC_420', 'Indian Penal Code - Section 420'),
+                              ('IPC_420', 'Indian Penal Code - Section 420'),
+                              ('COI_21', 'Constitution of India - Article 21'),
+                              ('CRPC_154', 'Criminal Procedure Code - Section 154')]:
+            store.append({'id': doc_id, 'title': title})
+        self.index = CitationIndex.from_metadata(store)
+    
+    def test_citation_forms(self):
+        """Test common ways of citing a provision are normalised"""
+        self.assertEqual(self.index.extract("What is Section 420 IPC?"), ['IPC_420'])
+        self.assertEqual(self.index.extract("section 420 of the Indian Penal Code"), ['IPC_420'])
+        self.assertEqual(self.index.extract("IPC 420 vs IPC_302"), ['IPC_420', 'IPC_302'])
+        self.assertEqual(self.index.extract("Explain Article 21"), ['COI_21'])
+        self.assertEqual(self.index.extract("Is an FIR under Section 154 mandatory?"), ['CRPC_154'])
+        self.assertEqual(self.index.extract("What is the law on theft?"), [])
+        self.assertEqual(self.index.extract("Punishment under s. 302"), ['IPC_302'])
+        self.assertEqual(self.index.extract("s 154 CrPC"), ['CRPC_154'])
+    
+    def test_possessives_are_not_citations(self):
+        """Test "'s" followed by a number is not read as a section"""
+        store = ChunkMetadataStore()
+        for doc_id in ['IEA_3', 'TPA_5', 'IEA_10', 'CPC_2']:
+            store.append({'id': doc_id, 'title': ''})
+        index = CitationIndex.from_metadata(store)
+        
+        for query in ["What's 3 years imprisonment under the law?",
+                      "Tenant's 5 rights",
+                      "employer's 10 day notice",
+                      "it’s 2 parties"]:
+            self.assertEqual(index.extract(query), [], query)
+        self.assertEqual(index.extract("Tenant rights under s. 5"), ['TPA_5'])
+    
+    def test_lookup_returns_all_chunks(self):
+        """Test every chunk of a cited section is returned"""
+        self.assertEqual(self.index.lookup(['IPC_420', 'COI_21']), [1, 2, 3])
+        self.assertEqual(self.index.lookup(['IPC_999']), [])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,220 @@
+"""
+Unit Tests - Session Backends
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import os
+import socket
+import socketserver
+import threading
+import time
+import unittest
+from src.memory import RedisSessionBackend, SessionStore, create_session_backend
+from src.utils import SessionBackendException
+
+
+class StandInRespServer(socketserver.ThreadingTCPServer):
+    """Tiny in-memory server speaking enough RESP for the session backend"""
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RespHandler)
+        self.data = {}
+        self.ttls = {}
+        self.lock = threading.Lock()
+        self.connections = []
+        self.drop_after = 0  # commands to apply and then drop the connection without replying
+
+
+class RespHandler(socketserver.StreamRequestHandler):
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        self.server.connections.append(self.connection)
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            with self.server.lock:
+                reply = self.encode(self.execute(command))
+                if self.server.drop_after:
+                    self.server.drop_after -= 1
+                    return
+            self.wfile.write(reply)
+
+    def encode(self, value):
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, int):
+            return b":%d\r\n" % value
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if isinstance(value, str):
+            return b"+%s\r\n" % value.encode()
+        return b"*%d\r\n" % len(value) + b"".join(self.encode(v) for v in value)
+
+    def execute(self, cmd):
+        name, args, data = cmd[0].upper(), cmd[1:], self.server.data
+        if name == b"RPUSH":
+            data.setdefault(args[0], []).extend(args[1:])
+            return len(data[args[0]])
+        if name == b"LTRIM":
+            items = data.get(args[0], [])
+            start, stop = int(args[1]), int(args[2])
+            stop = len(items) if stop == -1 else stop + 1
+            data[args[0]] = items[start:stop]
+            return "OK"
+        if name == b"LRANGE":
+            items = data.get(args[0], [])
+            stop = int(args[2])
+            return items[int(args[1]):None if stop == -1 else stop + 1]
+        if name == b"HSET":
+            data.setdefault(args[0], {})[args[1]] = args[2]
+            return 1
+        if name == b"HGETALL":
+            return [v for pair in data.get(args[0], {}).items() for v in pair]
+        if name == b"EXPIRE":
+            self.server.ttls[args[0]] = int(args[1])
+            return int(args[0] in data)
+        if name == b"EXISTS":
+            return sum(1 for key in args if key in data)
+        if name == b"DEL":
+            return sum(1 for key in args if data.pop(key, None) is not None)
+        if name == b"ZADD":
+            data.setdefault(args[0], {})[args[2]] = float(args[1])
+            return 1
+        if name == b"ZREM":
+            return int(data.get(args[0], {}).pop(args[1], None) is not None)
+        if name == b"ZREMRANGEBYSCORE":
+            members = data.get(args[0], {})
+            expired = [m for m, score in members.items() if score <= float(args[2])]
+            for member in expired:
+                del members[member]
+            return len(expired)
+        if name == b"ZCARD":
+            return len(data.get(args[0], {}))
+        return None
+
+
+class TestRedisSessionBackend(unittest.TestCase):
+    """Test Redis-protocol session backend against a stand-in server"""
+
+    def setUp(self):
+        self.server = StandInRespServer()
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.backend = RedisSessionBackend(f"redis://{host}:{port}/0", max_turns=3)
+
+    def tearDown(self):
+        self.backend.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_turns_round_trip(self):
+        """Test turns are capped, ordered and shared across clients"""
+        for i in range(5):
+            self.backend.add_turn("s1", f"Q{i}", f"A{i}", "qa")
+
+        host, port = self.server.server_address
+        other_worker = create_session_backend(f"redis://{host}:{port}/0", max_turns=3)
+        history = other_worker.get_history("s1")
+        other_worker.close()
+
+        self.assertEqual([turn['query'] for turn in history], ["Q2", "Q3", "Q4"])
+        self.assertEqual(history[0]['category'], "qa")
+        self.assertIn('timestamp', history[0])
+
+    def test_turn_write_is_one_round_trip(self):
+        """Test a turn's commands are pipelined together"""
+        calls = []
+        pipeline = self.backend.client.pipeline
+        self.backend.client.pipeline = lambda commands: calls.append(commands) or pipeline(commands)
+
+        self.backend.add_turn("s1", "Q", "A")
+        self.backend.get_session("s1")
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual([cmd[0] for cmd in calls[0]],
+                         ["RPUSH", "LTRIM", "HSET", "EXPIRE", "EXPIRE", "ZADD"])
+
+    def test_metadata_and_delete(self):
+        """Test session metadata, existence and deletion"""
+        self.backend.set_metadata("s1", "created_at", "2024-01-01T00:00:00")
+
+        self.assertIn("s1", self.backend)
+        self.assertEqual(self.backend.get_metadata("s1"), {"created_at": "2024-01-01T00:00:00"})
+        self.assertEqual(self.backend.stats()['active_sessions'], 1)
+        self.assertTrue(self.backend.delete("s1"))
+        self.assertNotIn("s1", self.backend)
+        self.assertEqual(self.backend.stats()['active_sessions'], 0)
+
+    def test_active_sessions_counted_without_scan(self):
+        """Test the live session count comes from the activity set and drops idle sessions"""
+        self.backend.add_turn("s1", "Q", "A")
+        self.backend.add_turn("s2", "Q", "A")
+        self.backend.add_turn("s1", "Q", "A")
+        self.assertEqual(self.backend.stats()['active_sessions'], 2)
+
+        self.server.data[self.backend._active_key.encode()][b"s2"] -= self.backend.ttl_seconds + 1
+        self.assertEqual(self.backend.stats()['active_sessions'], 1)
+
+    def test_closed_connection_replaced(self):
+        """Test a connection the server closed while idle is reopened before sending"""
+        self.backend.add_turn("s1", "Q1", "A1")
+        for connection in self.server.connections:
+            connection.shutdown(socket.SHUT_RDWR)
+        time.sleep(0.05)
+
+        self.backend.add_turn("s1", "Q2", "A2")
+        self.assertEqual([turn['query'] for turn in self.backend.get_history("s1")], ["Q1", "Q2"])
+
+    def test_batch_not_replayed_after_send(self):
+        """Test a connection lost after sending a turn does not record it twice"""
+        self.server.drop_after = 1
+
+        with self.assertRaises(SessionBackendException):
+            self.backend.add_turn("s1", "Q", "A")
+        self.assertEqual(len(self.backend.get_history("s1")), 1)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), "fork not available")
+    def test_forked_worker_opens_own_connection(self):
+        """Test a forked worker does not reuse the parent's socket"""
+        self.backend.add_turn("s1", "Q", "A")
+        parent_socket = self.backend.client._sock
+        pid = os.fork()
+        if pid == 0:
+            fresh = self.backend.client._sock is None
+            os._exit(0 if fresh and len(self.backend.get_history("s1")) == 1 else 1)
+        _, status = os.waitpid(pid, 0)
+
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        self.assertIs(self.backend.client._sock, parent_socket)
+        self.assertEqual(len(self.backend.get_history("s1")), 1)
+
+
+class TestCreateSessionBackend(unittest.TestCase):
+    """Test backend selection"""
+
+    def test_defaults_to_in_process(self):
+        """Test no URL gives the in-process store"""
+        backend = create_session_backend(None, max_turns=4)
+        self.assertIsInstance(backend, SessionStore)
+        self.assertEqual(backend.stm_max_size, 4)
+        backend.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Unit Tests - Utilities
+"""
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import gzip
+import json
+import unittest
+from datetime import datetime
+import numpy as np
+from src.utils import dumps, choose_encoding, compress
+from src.utils.compression import MIN_COMPRESS_SIZE
+
+
+class TestJSONCodec(unittest.TestCase):
+    """Test response JSON encoding"""
+    
+    def test_matches_stdlib(self):
+        """Test output decodes to what json.dumps(default=str) gives"""
+        payload = {
+            'text': "Section 420 — cheating",
+            'score': 0.87,
+            'rows': [1, 2],
+            'nested': {'ok': True, 'none': None},
+            'when': datetime(2024, 1, 2, 3, 4, 5)
+        }
+        expected = json.loads(json.dumps(payload, default=str))
+        
+        self.assertEqual(json.loads(dumps(payload)), expected)
+    
+    def test_numpy_values(self):
+        """Test numpy scalars and arrays encode as numbers"""
+        decoded = json.loads(dumps({'score': np.float64(0.5), 'row': np.int64(3),
+                                    'vector': np.array([1.0, 2.0])}))
+        
+        self.assertEqual(decoded, {'score': 0.5, 'row': 3, 'vector': [1.0, 2.0]})
+
+
+class TestCompression(unittest.TestCase):
+    """Test Content-Encoding negotiation"""
+    
+    def test_negotiation(self):
+        """Test gzip is chosen when accepted and refused when q=0"""
+        size = MIN_COMPRESS_SIZE
+        
+        self.assertEqual(choose_encoding("gzip, deflate", size), 'gzip')
+        self.assertEqual(choose_encoding("*", size), 'gzip')
+        self.assertIsNone(choose_encoding("gzip;q=0, identity", size))
+        self.assertIsNone(choose_encoding("gzip;q=0, *", size))
+        self.assertIsNone(choose_encoding("*, gzip;q=0", size))
+        self.assertIsNone(choose_encoding("deflate", size))
+        self.assertIsNone(choose_encoding(None, size))
+    
+    def test_small_bodies_not_compressed(self):
+        """Test bodies under the threshold are sent as is"""
+        self.assertIsNone(choose_encoding("gzip", MIN_COMPRESS_SIZE - 1))
+    
+    def test_gzip_roundtrip(self):
+        """Test compressed bodies decompress to the original"""
+        body = dumps({'sources': [{'id': f"IPC_{i}"} for i in range(200)]})
+        
+        self.assertEqual(gzip.decompress(compress(body, 'gzip')), body)
+
+
+if __name__ == '__main__':
+    unittest.main()